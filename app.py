@@ -1,6 +1,12 @@
-from flask import Flask
+import time
+from flask import Flask, g, request
 from flask_cors import CORS
 from routes.api import api_bp
+from services.circuit_breaker import get_breaker_states
+from services.query_log import record_query
+from services.snapshot import load_snapshot
+from utils import metrics
+from utils.http_cache import cache_response
 import config
 
 
@@ -16,9 +22,61 @@ def create_app():
     # Register blueprints
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # Time every route; streamed responses are timed until their first byte
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get("request_started")
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            size = None if response.is_streamed or response.direct_passthrough else response.calculate_content_length()
+            metrics.record_request(route, request.method, response.status_code, time.perf_counter() - started, size)
+        return response
+    
+    # Log served protein lookups so the warm-up job can find the popular ones
+    @app.after_request
+    def log_protein_query(response):
+        protein_name = (request.view_args or {}).get("protein_name")
+        if protein_name and response.status_code < 400:
+            record_query(protein_name)
+        return response
+    
+    # ETag/304, Cache-Control and compression; registered last so it runs first
+    # and the hooks above see the response as sent
+    @app.after_request
+    def apply_http_caching(response):
+        if response.is_streamed or response.direct_passthrough:
+            return response
+        status, body = cache_response(
+            request.method,
+            request.url_rule.rule if request.url_rule else "",
+            response.status_code,
+            response.get_data(),
+            response.mimetype,
+            response.headers,
+            request.headers.get("If-None-Match", ""),
+            request.headers.get("Accept-Encoding", "")
+        )
+        response.status_code = status
+        response.set_data(body)
+        return response
+    
+    # Precomputed data for popular proteins (python -m services.warmup --snapshot)
+    load_snapshot()
+    
     @app.route('/')
     def health_check():
-        return {"status": "healthy", "message": "AminoVerse API is running"}
+        upstreams = get_breaker_states()
+        # Still answering, but with cached or partial data for any upstream whose breaker is open
+        degraded = [name for name, state in upstreams.items() if state["state"] != "closed"]
+        return {
+            "status": "degraded" if degraded else "healthy",
+            "message": "AminoVerse API is running",
+            "upstreams": upstreams
+        }
     
     return app
 
@@ -0,0 +1,187 @@
+"""
+Async serving mode for the API.
+
+The slow upstream endpoints are served by async handlers that await
+UniProt, AlphaFold, ChEMBL and Gemini through one shared httpx client, so a
+single process can hold hundreds of in-flight requests. Every other route
+falls through to the Flask app, which is still what Vercel deploys.
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import time
+import traceback
+from contextlib import asynccontextmanager
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+# The module-level Flask app, so create_app() (and its snapshot load) runs once
+from app import app as flask_app
+from services import http_client
+from services.protein_resolver import async_resolve_protein
+from services.uniprot_service import async_get_protein_function
+from services.alphafold_service import async_get_structure_data
+from services.structure_service import get_structure_detail_data, DETAIL_LEVELS
+from services.chembl_service import async_get_drug_associations, get_drug_table
+from services.gemini_service import async_generate_protein_analysis, stream_protein_analysis
+from services.protein_aggregator import async_get_full_protein_data
+from services.query_log import record_query
+from utils.response_formatter import format_sse_event
+from utils import metrics
+from utils.http_cache import cache_response, mark_degraded
+
+
+def error_response(e):
+    error_details = traceback.format_exc()
+    print(f"Error processing request: {str(e)}\n{error_details}")
+    return JSONResponse({"error": str(e), "details": error_details}, status_code=500)
+
+
+async def get_protein_info(request):
+    protein_name = request.path_params["protein_name"]
+    try:
+        function_data = await async_get_protein_function(protein_name)
+        response = {"protein": protein_name, "function": function_data}
+        return mark_degraded(JSONResponse(response), response)
+    except Exception as e:
+        return error_response(e)
+
+
+async def get_protein_structure_data(request):
+    protein_name = request.path_params["protein_name"]
+    try:
+        detail = request.query_params.get("detail", "full").lower()
+        if detail not in DETAIL_LEVELS:
+            return JSONResponse({"error": f"Invalid 'detail' value, expected one of: {', '.join(DETAIL_LEVELS)}"}, status_code=400)
+
+        resolved = await async_resolve_protein(protein_name)
+        if resolved.get("error"):
+            return JSONResponse({"error": "Could not find protein in UniProt"}, status_code=404)
+
+        uniprot_id = resolved["accession"]
+        response = {"protein_name": protein_name, "uniprot_id": uniprot_id}
+        if detail == "full":
+            response.update(await async_get_structure_data(uniprot_id))
+        else:
+            # Parsing and filtering is CPU work, so it runs on the thread pool
+            response.update(await run_in_threadpool(get_structure_detail_data, uniprot_id, detail))
+        return mark_degraded(JSONResponse(response), response)
+    except Exception as e:
+        return error_response(e)
+
+
+async def get_protein_drug_data(request):
+    protein_name = request.path_params["protein_name"]
+    try:
+        if request.query_params.get("mode") == "aggregate":
+            limit = request.query_params.get("limit")
+            drug_data = await run_in_threadpool(
+                get_drug_table,
+                protein_name,
+                cursor=request.query_params.get("cursor"),
+                limit=int(limit) if limit and limit.isdigit() else None
+            )
+            status = 400 if drug_data.get("error") == "Invalid cursor" else 200
+            response = {"protein_name": protein_name, "drug_associations": drug_data}
+            return mark_degraded(JSONResponse(response, status_code=status), response)
+
+        drug_data = await async_get_drug_associations(protein_name)
+        response = {"protein_name": protein_name, "drug_associations": drug_data}
+        return mark_degraded(JSONResponse(response), response)
+    except Exception as e:
+        return error_response(e)
+
+
+async def get_protein_analysis(request):
+    protein_name = request.path_params["protein_name"]
+    try:
+        resolved = await async_resolve_protein(protein_name)
+        if resolved.get("error"):
+            return JSONResponse({"error": "Could not find protein in UniProt"}, status_code=404)
+
+        uniprot_id = resolved["accession"]
+        protein_name = resolved["entry"].protein_name or protein_name
+
+        if request.query_params.get("stream", "").lower() in ("1", "true", "yes"):
+            def generate():
+                yield format_sse_event({"protein_name": protein_name, "uniprot_id": uniprot_id}, event="meta")
+                try:
+                    for text in stream_protein_analysis(protein_name, uniprot_id):
+                        yield format_sse_event({"text": text}, event="chunk")
+                except Exception as e:
+                    print(f"Error while streaming response: {str(e)}")
+                    yield format_sse_event({"error": str(e)}, event="error")
+                yield format_sse_event({}, event="done")
+
+            # Starlette iterates a sync generator on its thread pool
+            return StreamingResponse(
+                generate(),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
+        analysis = await async_generate_protein_analysis(protein_name, uniprot_id)
+        response = {"protein_name": protein_name, "uniprot_id": uniprot_id, "analysis": analysis}
+        return mark_degraded(JSONResponse(response), response)
+    except Exception as e:
+        return error_response(e)
+
+
+async def get_full_protein(request):
+    protein_name = request.path_params["protein_name"]
+    try:
+        response = await async_get_full_protein_data(protein_name)
+        if response.get("error"):
+            return JSONResponse(response, status_code=404)
+        return mark_degraded(JSONResponse(response), response)
+    except Exception as e:
+        return error_response(e)
+
+
+def timed_route(path, endpoint):
+    """Route whose handler applies the same HTTP caching, request metrics and query log as the Flask app."""
+    async def handler(request):
+        started = time.perf_counter()
+        response = await endpoint(request)
+        if not isinstance(response, StreamingResponse):
+            # Hashing and compressing a large structure would stall the event loop
+            status, body = await run_in_threadpool(
+                cache_response, request.method, path, response.status_code, response.body, response.media_type, response.headers,
+                request.headers.get("if-none-match", ""), request.headers.get("accept-encoding", "")
+            )
+            response.status_code = status
+            response.body = body
+            if status == 304:
+                del response.headers["content-length"]
+            else:
+                response.headers["content-length"] = str(len(body))
+        size = None if isinstance(response, StreamingResponse) else len(response.body)
+        metrics.record_request(path, request.method, response.status_code, time.perf_counter() - started, size)
+        if response.status_code < 400:
+            record_query(request.path_params["protein_name"])
+        return response
+    return Route(path, handler)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await http_client.close_async_client()
+
+
+app = Starlette(
+    routes=[
+        timed_route("/api/protein/{protein_name}", get_protein_info),
+        timed_route("/api/protein/{protein_name}/structure", get_protein_structure_data),
+        timed_route("/api/protein/{protein_name}/drugs", get_protein_drug_data),
+        timed_route("/api/protein/{protein_name}/analysis", get_protein_analysis),
+        timed_route("/api/protein/{protein_name}/full", get_full_protein),
+        # Everything else (suggest, batch, structure.bin, refine-query, ...) is served by Flask
+        Mount("/", WSGIMiddleware(flask_app))
+    ],
+    lifespan=lifespan
+)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
@@ -0,0 +1,57 @@
+"""
+Compare two benchmark result files written by benchmarks/run.py.
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import argparse
+import json
+
+METRICS = (
+    ("req/s", lambda r: r["throughput_rps"], True),
+    ("p50 ms", lambda r: r["latency_ms"]["p50"], False),
+    ("p95 ms", lambda r: r["latency_ms"]["p95"], False),
+    ("p99 ms", lambda r: r["latency_ms"]["p99"], False),
+    ("errors", lambda r: r["errors"], False),
+    ("rss MB", lambda r: r["rss_mb_after"], False)
+)
+
+
+def change(before, after, higher_is_better):
+    """Percentage change, marked + when it is an improvement."""
+    if before in (None, 0) or after is None:
+        return "n/a"
+    percent = (after - before) / before * 100
+    better = percent > 0 if higher_is_better else percent < 0
+    return f"{percent:+.1f}%{' +' if better and abs(percent) >= 1 else ''}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+
+    print(f"before: {before.get('label') or args.before} ({before['started_at']})")
+    print(f"after:  {after.get('label') or args.after} ({after['started_at']})")
+    for key in ("requests", "concurrency", "proteins", "latency", "error_rate"):
+        if before["settings"].get(key) != after["settings"].get(key):
+            print(f"warning: runs differ in {key} ({before['settings'].get(key)} vs {after['settings'].get(key)})")
+
+    print(f"{'endpoint':<18}{'metric':<9}{'before':>12}{'after':>12}{'change':>12}")
+    for name, result in after["endpoints"].items():
+        previous = before["endpoints"].get(name)
+        if previous is None:
+            print(f"{name:<18}(not in before)")
+            continue
+        for label, value, higher_is_better in METRICS:
+            old, new = value(previous), value(result)
+            print(f"{name:<18}{label:<9}{str(old):>12}{str(new):>12}{change(old, new, higher_is_better):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Measure cold-start import time and memory of the API entry point.
+
+Imports the module (app by default, which is what Vercel loads) in fresh
+interpreters with `python -X importtime`, then reports the median total
+import time, peak RSS and the slowest modules by cumulative time.
+
+    python -m benchmarks.import_time --runs 5 --top 15
+    python -m benchmarks.import_time --module asgi --output benchmarks/results/import-asgi.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child after the import, so the RSS covers exactly the import
+CHILD = """
+import resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print("RESULT", elapsed, peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024)
+"""
+
+
+def parse_importtime(stderr):
+    """Map each module to (self us, cumulative us) from -X importtime output; the first import wins."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        name = name.strip()
+        if name not in modules:
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(module):
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(module=module)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    line = next(line for line in result.stdout.splitlines() if line.startswith("RESULT"))
+    _, elapsed, rss = line.split()
+    return float(elapsed), float(rss), parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold-start import time and memory.")
+    parser.add_argument("--module", default="app", help="Module to import (app or asgi)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to average over")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--output", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    elapsed = statistics.median(run[0] for run in runs)
+    rss = statistics.median(run[1] for run in runs)
+
+    # Median cumulative time per module across runs
+    names = set().union(*(run[2] for run in runs))
+    cumulative = {
+        name: statistics.median(run[2][name][1] for run in runs if name in run[2])
+        for name in names
+    }
+    slowest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    heavy = {name: name in names for name in ("google.generativeai", "grpc", "numpy", "httpx", "starlette")}
+
+    print(f"import {args.module}: {elapsed * 1000:.0f} ms, peak RSS {rss:.1f} MB (median of {args.runs})")
+    print("loaded at startup: " + ", ".join(f"{name} {'yes' if loaded else 'no'}" for name, loaded in heavy.items()))
+    print(f"{'cumulative ms':>14}  module")
+    for name, microseconds in slowest:
+        print(f"{microseconds / 1000:>14.1f}  {name}")
+
+    if args.output:
+        directory = os.path.dirname(os.path.abspath(args.output))
+        os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "module": args.module,
+                "runs": args.runs,
+                "python": sys.version.split()[0],
+                "import_ms": round(elapsed * 1000, 1),
+                "peak_rss_mb": round(rss, 1),
+                "modules_loaded": len(names),
+                "heavy_modules_loaded": heavy,
+                "slowest": [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in slowest]
+            }, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
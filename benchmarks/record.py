@@ -0,0 +1,82 @@
+"""
+Record live UniProt, AlphaFold and ChEMBL responses as stub fixtures.
+
+    python -m benchmarks.record TP53 BRCA1 EGFR
+
+Adds the UniProt entries to fixtures/uniprot.json and writes each protein's
+AlphaFold metadata and model and its ChEMBL target search and activities
+under fixtures/alphafold and fixtures/chembl. Gemini is never recorded.
+"""
+import argparse
+import json
+import os
+
+import requests
+
+from benchmarks.stubs import FIXTURES_DIR, _fixture_name
+from models.uniprot_record import UniProtRecord
+
+UNIPROT_URL = "https://rest.uniprot.org/uniprotkb/search"
+ALPHAFOLD_URL = "https://alphafold.ebi.ac.uk/api/prediction"
+CHEMBL_URL = "https://www.ebi.ac.uk/chembl/api/data"
+
+
+def write_json(data, *parts):
+    path = os.path.join(FIXTURES_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def record(gene, entries, activity_limit):
+    params = {"query": f"gene_exact:{gene} AND organism_id:9606", "format": "json", "size": 1,
+              "fields": UniProtRecord.ENTRY_FIELDS}
+    results = requests.get(UNIPROT_URL, params=params, timeout=30).json().get("results", [])
+    if not results:
+        print(f"{gene}: not found in UniProt")
+        return
+    entry = results[0]
+    accession = entry["primaryAccession"]
+    entries[accession] = entry
+
+    response = requests.get(f"{ALPHAFOLD_URL}/{accession}", timeout=30)
+    if response.ok:
+        metadata = response.json()
+        write_json(metadata, "alphafold", f"{_fixture_name(accession)}.json")
+        pdb = requests.get(metadata[0]["pdbUrl"], timeout=60)
+        pdb.raise_for_status()
+        with open(os.path.join(FIXTURES_DIR, "alphafold", f"{_fixture_name(accession)}.pdb"), "w", encoding="utf-8") as f:
+            f.write(pdb.text)
+
+    targets = requests.get(f"{CHEMBL_URL}/target/search", params={"q": gene, "format": "json", "limit": 5}, timeout=30).json()
+    write_json(targets, "chembl", f"target_{_fixture_name(gene.upper())}.json")
+    for target in targets.get("targets", [])[:1]:
+        target_id = target["target_chembl_id"]
+        activities = requests.get(
+            f"{CHEMBL_URL}/activity.json",
+            params={"target_chembl_id": target_id, "limit": activity_limit},
+            timeout=60
+        ).json()
+        write_json({"activities": activities.get("activities", [])}, "chembl", f"activity_{_fixture_name(target_id)}.json")
+    print(f"{gene}: recorded {accession}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record live upstream responses as benchmark fixtures.")
+    parser.add_argument("genes", nargs="+", help="Human gene symbols to record")
+    parser.add_argument("--activities", type=int, default=1000, help="ChEMBL activities to record per target")
+    args = parser.parse_args()
+
+    uniprot_path = os.path.join(FIXTURES_DIR, "uniprot.json")
+    with open(uniprot_path, encoding="utf-8") as f:
+        entries = {entry["primaryAccession"]: entry for entry in json.load(f)["results"]}
+    for gene in args.genes:
+        try:
+            record(gene.upper(), entries, args.activities)
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            print(f"{gene}: could not record ({e})")
+    write_json({"results": list(entries.values())}, "uniprot.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Load-test the API against local stub upstreams.
+
+Starts the stubs in a subprocess, points the service at them through the
+*_BASE_URL settings, serves the Flask app on a threaded local server and
+drives each endpoint with a pool of keep-alive clients. Throughput,
+p50/p95/p99 latency and process memory are reported per endpoint and saved
+as JSON for benchmarks/compare.py.
+
+    python -m benchmarks.run --requests 500 --concurrency 32 --label baseline
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from benchmarks.stubs import FIXTURES_DIR, add_stub_arguments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# name -> (method, path template); {name} is filled from the protein pool
+ENDPOINTS = {
+    "protein": ("GET", "/api/protein/{name}"),
+    "structure": ("GET", "/api/protein/{name}/structure?detail=ca"),
+    "structure_full": ("GET", "/api/protein/{name}/structure"),
+    "drugs": ("GET", "/api/protein/{name}/drugs"),
+    "drugs_aggregate": ("GET", "/api/protein/{name}/drugs?mode=aggregate"),
+    "analysis": ("GET", "/api/protein/{name}/analysis"),
+    "analysis_stream": ("GET", "/api/protein/{name}/analysis?stream=1"),
+    "full": ("GET", "/api/protein/{name}/full"),
+    "batch": ("POST", "/api/proteins/batch")
+}
+DEFAULT_ENDPOINTS = ("protein", "structure", "drugs", "drugs_aggregate", "analysis", "full", "batch")
+
+
+def protein_pool(size):
+    """Recorded gene symbols first, then synthetic ones the UniProt stub makes up."""
+    with open(os.path.join(FIXTURES_DIR, "uniprot.json"), encoding="utf-8") as f:
+        recorded = [entry["genes"][0]["geneName"]["value"] for entry in json.load(f)["results"]]
+    synthetic = (f"BM{i}" for i in itertools.count(1))
+    return list(itertools.islice(itertools.chain(recorded, synthetic), size))
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def start_stub_process(args):
+    """Run the stubs in their own process so they do not compete with the service for the GIL."""
+    command = [sys.executable, "-m", "benchmarks.stubs",
+               "--latency", str(args.latency), "--gemini-latency", str(args.gemini_latency),
+               "--jitter", str(args.jitter), "--error-rate", str(args.error_rate),
+               "--residues", str(args.residues), "--activities", str(args.activities),
+               "--gemini-chars", str(args.gemini_chars)]
+    if args.seed is not None:
+        command += ["--seed", str(args.seed)]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line:
+        process.kill()
+        raise RuntimeError("Stub upstreams failed to start")
+    return process, json.loads(line)
+
+
+def start_service(environment, store_dir):
+    """Import the app against the stubs and serve it on a free local port."""
+    os.environ.update(environment)
+    os.environ["GEMINI_API_KEY"] = "benchmark"
+    os.environ["STRUCTURE_STORE_DIR"] = store_dir
+    os.environ.setdefault("LLM_CACHE_BACKEND", "memory")
+    # Keep synthetic queries out of the real query log and real snapshots out of the numbers
+    os.environ["QUERY_LOG_PATH"] = ""
+    os.environ["SNAPSHOT_PATH"] = ""
+
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # No per-request access log
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="benchmark-app", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_endpoint(base_url, name, proteins, args):
+    """Send args.requests requests to one endpoint from args.concurrency clients."""
+    method, template = ENDPOINTS[name]
+    names = itertools.cycle(proteins)
+    names_lock = threading.Lock()
+    local = threading.local()
+
+    def one_request(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        with names_lock:
+            protein = next(names)
+            batch = [next(names) for _ in range(args.batch_size)] if name == "batch" else None
+        started = time.perf_counter()
+        try:
+            if batch is not None:
+                response = session.post(base_url + template, json={"proteins": batch}, timeout=args.timeout)
+            else:
+                response = session.request(method, base_url + template.format(name=protein), timeout=args.timeout)
+            size = len(response.content)
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            size, status = 0, None
+        return time.perf_counter() - started, status, size
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        samples = list(pool.map(one_request, range(args.requests)))
+    wall = time.perf_counter() - started
+    rss_after = rss_mb()
+
+    latencies = sorted(elapsed for elapsed, _, _ in samples)
+    statuses = {}
+    for _, status, _ in samples:
+        key = str(status) if status is not None else "error"
+        statuses[key] = statuses.get(key, 0) + 1
+    errors = sum(count for key, count in statuses.items() if key == "error" or int(key) >= 500)
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "statuses": statuses,
+        "duration_s": round(wall, 3),
+        "throughput_rps": round(len(samples) / wall, 2) if wall else None,
+        "latency_ms": {
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1]) if latencies else None
+        },
+        "response_bytes_mean": round(sum(size for _, _, size in samples) / len(samples)) if samples else 0,
+        "rss_mb_before": round(rss_before, 1) if rss_before is not None else None,
+        "rss_mb_after": round(rss_after, 1) if rss_after is not None else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+def print_summary(results):
+    print(f"{'endpoint':<18}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'rss MB':>9}")
+    for name, result in results["endpoints"].items():
+        latency = result["latency_ms"]
+        print(f"{name:<18}{result['throughput_rps']:>9}{latency['p50']:>10}{latency['p95']:>10}"
+              f"{latency['p99']:>10}{result['errors']:>8}{str(result['rss_mb_after']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API against local stub upstreams.")
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help=f"Comma-separated endpoints to run, from: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--proteins", type=int, default=50, help="Distinct proteins requested (fewer means more cache hits)")
+    parser.add_argument("--batch-size", type=int, default=20, help="Proteins per /api/proteins/batch request")
+    parser.add_argument("--timeout", type=float, default=60, help="Client timeout per request in seconds")
+    parser.add_argument("--label", default="", help="Name stored with the results and used in the file name")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/<time>[-<label>].json)")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+
+    stub_process, environment = start_stub_process(args)
+    store_dir = tempfile.mkdtemp(prefix="aminoverse-bench-")
+    try:
+        server, base_url = start_service(environment, store_dir)
+        proteins = protein_pool(args.proteins)
+        started_at = datetime.now(timezone.utc)
+        results = {
+            "label": args.label,
+            "started_at": started_at.isoformat(),
+            "settings": {key: value for key, value in vars(args).items() if key != "output"},
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count()
+            },
+            "endpoints": {}
+        }
+        for name in names:
+            print(f"Running {name}...", flush=True)
+            results["endpoints"][name] = run_endpoint(base_url, name, proteins, args)
+        server.shutdown()
+    finally:
+        stub_process.terminate()
+        stub_process.wait()
+
+    output = args.output
+    if not output:
+        suffix = f"-{args.label}" if args.label else ""
+        output = os.path.join(RESULTS_DIR, f"{started_at.strftime('%Y%m%dT%H%M%S')}{suffix}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print_summary(results)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
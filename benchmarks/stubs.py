@@ -0,0 +1,371 @@
+"""
+Local stand-ins for the UniProt, AlphaFold, ChEMBL and Gemini APIs.
+
+Each upstream gets its own HTTP server (so the circuit breakers and
+per-upstream metrics still tell them apart) that replays responses from
+benchmarks/fixtures and synthesizes anything that was not recorded: any
+gene-symbol-like query resolves to a made-up human protein, every accession
+has an AlphaFold model, and every target has ChEMBL activities. Latency and
+errors are injected per request, and GETs carry ETags for conditional requests.
+
+    python -m benchmarks.stubs --latency 0.05 --error-rate 0.01
+
+prints the base URLs as one JSON line and serves until interrupted.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit, urlencode
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+GENE_SYMBOL_RE = re.compile(r"^[A-Z][A-Z0-9-]{1,14}$")
+ACCESSION_RE = re.compile(r"^([OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9]([A-Z][A-Z0-9]{2}[0-9]){1,2})$")
+RESIDUES = ("ALA", "ARG", "ASN", "ASP", "CYS", "GLN", "GLU", "GLY", "HIS", "ILE",
+            "LEU", "LYS", "MET", "PHE", "PRO", "SER", "THR", "TRP", "TYR", "VAL")
+BACKBONE = (("N", "N"), ("CA", "C"), ("C", "C"), ("O", "O"), ("CB", "C"))
+
+
+def _digest(text):
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:12], 16)
+
+
+def _load_fixture(*parts):
+    path = os.path.join(FIXTURES_DIR, *parts)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read() if path.endswith(".pdb") else json.load(f)
+
+
+def _fixture_name(text):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", text)
+
+
+class StubOptions:
+    """Latency, error injection and payload sizes shared by every stub."""
+
+    def __init__(self, latency=0.05, gemini_latency=0.5, jitter=0.2, error_rate=0.0,
+                 residues=400, activities=500, gemini_chars=2000, seed=None):
+        self.latency = latency
+        self.gemini_latency = gemini_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.residues = residues
+        self.activities = activities
+        self.gemini_chars = gemini_chars
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, mean):
+        with self._lock:
+            value = self.random.gauss(mean, mean * self.jitter) if mean > 0 else 0
+        time.sleep(max(0.0, value))
+
+    def should_fail(self):
+        with self._lock:
+            return self.random.random() < self.error_rate
+
+
+class UniProtData:
+    """Recorded UniProt entries, plus a synthetic human entry for any other gene symbol."""
+
+    def __init__(self):
+        recorded = _load_fixture("uniprot.json") or {"results": []}
+        self.entries = recorded["results"]
+        self.by_accession = {e["primaryAccession"]: e for e in self.entries}
+        self.by_gene = {}
+        for entry in self.entries:
+            for gene in entry.get("genes", []):
+                names = [gene.get("geneName", {}).get("value")] + [s["value"] for s in gene.get("synonyms", [])]
+                for name in filter(None, names):
+                    self.by_gene.setdefault(name.upper(), entry)
+        self._lock = threading.Lock()
+
+    def synthetic(self, gene):
+        accession = f"Q{_digest(gene) % 100000:05d}"
+        with self._lock:
+            if gene not in self.by_gene:
+                entry = {
+                    "entryType": "UniProtKB reviewed (Swiss-Prot)",
+                    "primaryAccession": accession,
+                    "uniProtkbId": f"{gene}_HUMAN",
+                    "organism": {"scientificName": "Homo sapiens", "commonName": "Human", "taxonId": 9606},
+                    "proteinDescription": {"recommendedName": {"fullName": {"value": f"Benchmark protein {gene}"}}},
+                    "genes": [{"geneName": {"value": gene}}],
+                    "comments": [{"commentType": "FUNCTION", "texts": [{"value": f"Synthetic entry for {gene}."}]}]
+                }
+                self.by_gene[gene] = entry
+                self.by_accession.setdefault(accession, entry)
+            return self.by_gene[gene]
+
+    def lookup(self, term):
+        term = term.strip().strip('"').upper()
+        if ACCESSION_RE.match(term):
+            return self.by_accession.get(term)
+        if term in self.by_gene:
+            return self.by_gene[term]
+        for entry in self.entries:
+            name = entry["proteinDescription"]["recommendedName"]["fullName"]["value"]
+            if term in name.upper():
+                return entry
+        return self.synthetic(term) if GENE_SYMBOL_RE.match(term) else None
+
+    def search(self, query):
+        """Answer the query shapes uniprot_service sends (single, fielded and OR'ed)."""
+        query = re.sub(r"\s+AND\s+organism_id:\d+", "", query).strip("() ")
+        terms = [part.split(":", 1)[-1] for part in re.split(r"\s+OR\s+", query)]
+        results = []
+        for term in terms:
+            entry = self.lookup(term)
+            if entry is not None and entry not in results:
+                results.append(entry)
+        return results
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    upstream = None
+    options = None
+    base_url = ""
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+        # Like the real APIs, answer conditional GETs for unchanged content with 304
+        etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+        if status == 200 and self.command == "GET" and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if status == 200:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_request(self):
+        parts = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        # Read the body up front so the keep-alive connection stays usable even for injected errors
+        self.body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.options.delay(self.options.gemini_latency if self.upstream == "gemini" else self.options.latency)
+        if self.options.should_fail():
+            self.send_body(503, {"error": "Injected failure"})
+            return
+        getattr(self, f"route_{self.upstream}")(parts.path, params)
+
+    do_GET = handle_request
+    do_POST = handle_request
+
+    def route_uniprot(self, path, params):
+        if path == "/uniprotkb/search":
+            results = self.server.data.search(params.get("query", ""))[:int(params.get("size", 25))]
+            self.send_body(200, {"results": results})
+            return
+        match = re.match(r"^/uniprotkb/([A-Z0-9-]+?)(\.json)?$", path)
+        entry = self.server.data.by_accession.get(match.group(1).split("-")[0]) if match else None
+        if entry is None:
+            self.send_body(404, {"messages": ["Resource not found"]})
+        else:
+            self.send_body(200, entry)
+
+    def route_alphafold(self, path, params):
+        match = re.match(r"^/api/prediction/([A-Z0-9]+)$", path)
+        if match:
+            accession = match.group(1)
+            recorded = _load_fixture("alphafold", f"{_fixture_name(accession)}.json")
+            if recorded is not None:
+                for model in recorded:
+                    model["pdbUrl"] = f"{self.base_url}/files/{os.path.basename(urlsplit(model['pdbUrl']).path)}"
+                self.send_body(200, recorded)
+                return
+            self.send_body(200, [{
+                "entryId": f"AF-{accession}-F1",
+                "uniprotAccession": accession,
+                "latestVersion": 4,
+                "pdbUrl": f"{self.base_url}/files/AF-{accession}-F1-model_v4.pdb"
+            }])
+            return
+        match = re.match(r"^/files/AF-([A-Z0-9]+)-F1-model_v(\d+)\.pdb$", path)
+        if match:
+            recorded = _load_fixture("alphafold", f"{_fixture_name(match.group(1))}.pdb")
+            self.send_body(200, recorded or synthetic_pdb(match.group(1), self.options.residues), "chemical/x-pdb")
+            return
+        self.send_body(404, {"error": "Not found"})
+
+    def route_chembl(self, path, params):
+        prefix = "/chembl/api/data"
+        if path == f"{prefix}/target/search":
+            query = params.get("q", "")
+            recorded = _load_fixture("chembl", f"target_{_fixture_name(query.upper())}.json")
+            self.send_body(200, recorded or {"targets": [{
+                "target_chembl_id": f"CHEMBL{_digest(query.upper()) % 1000000}",
+                "pref_name": query,
+                "organism": "Homo sapiens",
+                "target_type": "SINGLE PROTEIN"
+            }]})
+            return
+        if path in (f"{prefix}/activity", f"{prefix}/activity.json"):
+            target = params.get("target_chembl_id", "")
+            limit = int(params.get("limit", 20))
+            offset = int(params.get("offset", 0))
+            recorded = _load_fixture("chembl", f"activity_{_fixture_name(target)}.json")
+            activities = recorded["activities"] if recorded else synthetic_activities(target, self.options.activities)
+            page = activities[offset:offset + limit]
+            next_url = None
+            if offset + limit < len(activities):
+                query = dict(params, offset=offset + limit, limit=limit)
+                next_url = f"{prefix}/activity.json?{urlencode(query)}"
+            self.send_body(200, {
+                "activities": page,
+                "page_meta": {"limit": limit, "offset": offset, "total_count": len(activities), "next": next_url}
+            })
+            return
+        self.send_body(404, {"error": "Not found"})
+
+    def route_gemini(self, path, params):
+        match = re.match(r"^/v1beta/models/([^:]+):(generateContent|streamGenerateContent)$", path)
+        if not match:
+            self.send_body(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+        prompt = self.body.decode("utf-8", "replace")
+        if "user entered" in prompt:
+            text = json.dumps({"protein_name": "TP53", "gene_name": "TP53", "is_protein_query": True})
+        else:
+            text = ("Benchmark analysis text. " * (self.options.gemini_chars // 25 + 1))[:self.options.gemini_chars]
+
+        def candidate(chunk):
+            return {"candidates": [{"content": {"parts": [{"text": chunk}], "role": "model"}, "finishReason": "STOP", "index": 0}]}
+
+        if match.group(2) == "generateContent":
+            self.send_body(200, candidate(text))
+        else:
+            # The REST transport reads streamed responses as one JSON array
+            chunks = [text[i:i + 200] for i in range(0, len(text), 200)] or [""]
+            self.send_body(200, [candidate(chunk) for chunk in chunks])
+
+
+@lru_cache(maxsize=256)
+def synthetic_pdb(accession, residues):
+    """A deterministic single-chain model with residues * 5 atoms."""
+    rng = random.Random(accession)
+    lines = []
+    serial = 1
+    for i in range(residues):
+        residue = RESIDUES[rng.randrange(len(RESIDUES))]
+        plddt = rng.uniform(30, 98)
+        for j, (atom, element) in enumerate(BACKBONE):
+            x, y, z = i * 1.52 + j * 0.3, rng.uniform(-10, 10), rng.uniform(-10, 10)
+            lines.append("ATOM  %5d  %-3s %3s A%4d    %8.3f%8.3f%8.3f  1.00%6.2f           %s"
+                         % (serial, atom, residue, i + 1, x, y, z, plddt, element))
+            serial += 1
+    return "\n".join(lines) + "\nEND\n"
+
+
+@lru_cache(maxsize=256)
+def _activity_list(target, count):
+    rng = random.Random(target)
+    activities = []
+    for i in range(count):
+        molecule = rng.randrange(max(1, count // 4))
+        activities.append({
+            "molecule_chembl_id": f"CHEMBL{1000000 + molecule}",
+            "molecule_pref_name": f"BENCHMARK-{molecule}" if molecule % 3 else None,
+            "molecule_name": None,
+            "standard_type": rng.choice(("IC50", "Ki", "EC50", "Kd")),
+            "standard_value": round(rng.uniform(1, 10000), 2),
+            "standard_units": "nM",
+            "pchembl_value": f"{rng.uniform(4, 10):.2f}",
+            "target_organism": "Homo sapiens",
+            "assay_description": "Synthetic benchmark assay"
+        })
+    return tuple(json.dumps(a) for a in activities)
+
+
+def synthetic_activities(target, count):
+    return [json.loads(a) for a in _activity_list(target, count)]
+
+
+def start_stubs(options, host="127.0.0.1"):
+    """Start one threaded server per upstream on free ports and return their servers and base URLs."""
+    data = UniProtData()
+    servers = {}
+    urls = {}
+    for upstream in ("uniprot", "alphafold", "chembl", "gemini"):
+        handler = type(f"{upstream.title()}Handler", (StubHandler,), {"upstream": upstream, "options": options})
+        server = ThreadingHTTPServer((host, 0), handler)
+        server.daemon_threads = True
+        server.data = data
+        base_url = f"http://{host}:{server.server_address[1]}"
+        handler.base_url = base_url
+        threading.Thread(target=server.serve_forever, name=f"stub-{upstream}", daemon=True).start()
+        servers[upstream] = server
+        urls[upstream] = base_url
+    urls["chembl"] += "/chembl/api/data"
+    return servers, urls
+
+
+def stub_environment(urls):
+    """Environment variables that point the service at the stubs."""
+    return {
+        "UNIPROT_BASE_URL": urls["uniprot"],
+        "ALPHAFOLD_BASE_URL": urls["alphafold"],
+        "CHEMBL_BASE_URL": urls["chembl"],
+        "GEMINI_BASE_URL": urls["gemini"]
+    }
+
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean UniProt/AlphaFold/ChEMBL latency in seconds")
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="Mean Gemini latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency standard deviation as a fraction of the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream requests answered with 503")
+    parser.add_argument("--residues", type=int, default=400, help="Residues per synthetic AlphaFold model")
+    parser.add_argument("--activities", type=int, default=500, help="Activities per synthetic ChEMBL target")
+    parser.add_argument("--gemini-chars", type=int, default=2000, help="Length of synthetic Gemini responses")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency and error injection")
+
+
+def options_from_args(args):
+    return StubOptions(
+        latency=args.latency,
+        gemini_latency=args.gemini_latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        residues=args.residues,
+        activities=args.activities,
+        gemini_chars=args.gemini_chars,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for the upstream APIs.")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    servers, urls = start_stubs(options_from_args(args))
+    print(json.dumps(stub_environment(urls)), flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
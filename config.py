@@ -11,6 +11,133 @@ class Config:
     PDB_API_KEY = os.getenv('PDB_API_KEY', '')
     DRUGBANK_API_KEY = os.getenv('DRUGBANK_API_KEY', '')
     CHEMBL_API_KEY = os.getenv('CHEMBL_API_KEY', '')
+    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
+    
+    # Upstream base URLs; override to point the service at local stubs (see benchmarks/)
+    UNIPROT_BASE_URL = os.getenv('UNIPROT_BASE_URL', 'https://rest.uniprot.org')
+    ALPHAFOLD_BASE_URL = os.getenv('ALPHAFOLD_BASE_URL', 'https://alphafold.ebi.ac.uk')
+    CHEMBL_BASE_URL = os.getenv('CHEMBL_BASE_URL', 'https://www.ebi.ac.uk/chembl/api/data')
+    GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', '')  # Empty uses Google's endpoint
     
     # Cache settings
-    CACHE_EXPIRY = 3600  # 1 hour
\ No newline at end of file
+    CACHE_EXPIRY = 3600  # 1 hour
+    RESOLVER_CACHE_SIZE = int(os.getenv('RESOLVER_CACHE_SIZE', 1024))
+    RESOLVER_CACHE_TTL = int(os.getenv('RESOLVER_CACHE_TTL', 60))  # Short, so UniProt search cache revalidations show through
+
+    # Combined /protein/<name>/full endpoint
+    AGGREGATE_MAX_WORKERS = int(os.getenv('AGGREGATE_MAX_WORKERS', 8))
+    AGGREGATE_TIMEOUTS = {  # Per-source deadlines in seconds
+        'structure': float(os.getenv('AGGREGATE_STRUCTURE_TIMEOUT', 20)),
+        'drugs': float(os.getenv('AGGREGATE_DRUGS_TIMEOUT', 20)),
+        'analysis': float(os.getenv('AGGREGATE_ANALYSIS_TIMEOUT', 30))
+    }
+
+    # Shared HTTP client for UniProt, AlphaFold and ChEMBL
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 20))  # Connections kept alive per host
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 15))
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+    HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', 0.5))
+    HTTP_RETRY_AFTER_MAX = float(os.getenv('HTTP_RETRY_AFTER_MAX', 10))  # Cap on honored Retry-After
+    ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', 200))  # Shared by all hosts in asgi.py
+
+    # Gemini response cache ('memory' or 'sqlite')
+    LLM_CACHE_BACKEND = os.getenv('LLM_CACHE_BACKEND', 'memory')
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join('instance', 'llm_cache.sqlite3'))
+    LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', 2048))
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 7 * 24 * 3600))  # 1 week
+
+    # Local UniProt index used to answer refine-query without Gemini
+    PROTEIN_INDEX_PATH = os.getenv('PROTEIN_INDEX_PATH', os.path.join('data', 'protein_index.bin'))
+
+    # Autocomplete for /api/suggest
+    SUGGEST_MAX_LIMIT = int(os.getenv('SUGGEST_MAX_LIMIT', 20))
+    SUGGEST_MAX_FUZZY_NODES = int(os.getenv('SUGGEST_MAX_FUZZY_NODES', 300))  # Bounds typo search time
+
+    # Parsed AlphaFold models kept in memory for the structure endpoints
+    STRUCTURE_CACHE_SIZE = int(os.getenv('STRUCTURE_CACHE_SIZE', 64))
+
+    # On-disk store of AlphaFold models keyed by (accession, model version); empty dir disables it,
+    # and an unwritable one (e.g. on Vercel) falls back to the system temp dir
+    STRUCTURE_STORE_DIR = os.getenv('STRUCTURE_STORE_DIR', os.path.join('instance', 'structures'))
+    STRUCTURE_STORE_MAX_BYTES = int(os.getenv('STRUCTURE_STORE_MAX_BYTES', 2 * 1024 ** 3))  # 2 GB
+    STRUCTURE_METADATA_TTL = int(os.getenv('STRUCTURE_METADATA_TTL', 24 * 3600))  # 1 day
+
+    # Coalescing of concurrent identical upstream calls; set a directory to also coalesce across processes
+    SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', 30))  # Longest a caller waits on another's call
+    SINGLE_FLIGHT_DIR = os.getenv('SINGLE_FLIGHT_DIR', '')
+    SINGLE_FLIGHT_RESULT_TTL = float(os.getenv('SINGLE_FLIGHT_RESULT_TTL', 10))  # How long other processes reuse a result
+
+    # Aggregated ChEMBL compound tables (/drugs?mode=aggregate)
+    CHEMBL_PAGE_SIZE = int(os.getenv('CHEMBL_PAGE_SIZE', 1000))  # ChEMBL's maximum page size
+    CHEMBL_MAX_ACTIVITIES = int(os.getenv('CHEMBL_MAX_ACTIVITIES', 50000))
+    CHEMBL_TABLE_CACHE_SIZE = int(os.getenv('CHEMBL_TABLE_CACHE_SIZE', 128))
+    CHEMBL_TABLE_PAGE_SIZE = int(os.getenv('CHEMBL_TABLE_PAGE_SIZE', 25))
+    CHEMBL_TABLE_MAX_PAGE_SIZE = int(os.getenv('CHEMBL_TABLE_MAX_PAGE_SIZE', 100))
+
+    # POST /api/proteins/batch
+    BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', 500))
+    BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 8))
+    BATCH_UNIPROT_GROUP_SIZE = int(os.getenv('BATCH_UNIPROT_GROUP_SIZE', 50))  # Names per grouped UniProt query
+
+    # Circuit breakers per upstream (UniProt, AlphaFold, ChEMBL, Gemini)
+    CIRCUIT_WINDOW = float(os.getenv('CIRCUIT_WINDOW', 30))  # Seconds of recent calls the error rate is taken over
+    CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', 5))
+    CIRCUIT_FAILURE_RATE = float(os.getenv('CIRCUIT_FAILURE_RATE', 0.5))
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30))  # Seconds open before probing again
+    CIRCUIT_HALF_OPEN_PROBES = int(os.getenv('CIRCUIT_HALF_OPEN_PROBES', 1))
+    CIRCUIT_SLOW_CALL_SECONDS = {  # Calls slower than this count as failures
+        'uniprot': float(os.getenv('CIRCUIT_SLOW_UNIPROT', 10)),
+        'alphafold': float(os.getenv('CIRCUIT_SLOW_ALPHAFOLD', 10)),
+        'chembl': float(os.getenv('CIRCUIT_SLOW_CHEMBL', 15)),
+        'gemini': float(os.getenv('CIRCUIT_SLOW_GEMINI', 30))
+    }
+    RESOLVER_STALE_SIZE = int(os.getenv('RESOLVER_STALE_SIZE', 4096))  # Expired resolutions kept for outages
+
+    # Stale-while-revalidate for cached UniProt, AlphaFold and ChEMBL responses
+    REVALIDATE_MAX_STALE = int(os.getenv('REVALIDATE_MAX_STALE', 24 * 3600))  # Served this long past expiry while a conditional GET runs
+    REVALIDATE_WORKERS = int(os.getenv('REVALIDATE_WORKERS', 4))
+
+    # search_uniprot lookup strategy: 'sequential' waits for each lookup, 'hedged' fires the next one when a
+    # lookup runs over UNIPROT_HEDGE_DELAY. Hedging trades extra UniProt load for latency, so it is opt-in;
+    # set the delay near the p90 of aminoverse_upstream_request_seconds{upstream="uniprot"}
+    UNIPROT_SEARCH_STRATEGY = os.getenv('UNIPROT_SEARCH_STRATEGY', 'sequential')
+    UNIPROT_HEDGE_DELAY = float(os.getenv('UNIPROT_HEDGE_DELAY', 2.0))  # Seconds before hedging
+    UNIPROT_HEDGE_WORKERS = int(os.getenv('UNIPROT_HEDGE_WORKERS', 16))
+    UNIPROT_GENE_SYMBOL_MAX_LENGTH = int(os.getenv('UNIPROT_GENE_SYMBOL_MAX_LENGTH', 15))
+
+    # Protein queries served successfully, one per line, for warm-up --top; empty path disables it
+    QUERY_LOG_PATH = os.getenv('QUERY_LOG_PATH', os.path.join('instance', 'query_log.tsv'))
+
+    # Snapshot bundle written by `python -m services.warmup --snapshot` and loaded by create_app()
+    SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', os.path.join('data', 'snapshot.json.gz'))
+    SNAPSHOT_MAX_AGE = int(os.getenv('SNAPSHOT_MAX_AGE', 7 * 24 * 3600))  # Older bundles are ignored
+
+    # /conversation context: recent messages go to Gemini verbatim, older ones as a rolling summary
+    CONVERSATION_RECENT_MESSAGES = int(os.getenv('CONVERSATION_RECENT_MESSAGES', 6))
+    CONVERSATION_SUMMARY_BATCH = int(os.getenv('CONVERSATION_SUMMARY_BATCH', 6))  # Older messages folded into the summary at a time
+    CONVERSATION_HISTORY_TOKENS = int(os.getenv('CONVERSATION_HISTORY_TOKENS', 1500))  # Budget for summary plus verbatim history
+    CONVERSATION_MESSAGE_MAX_CHARS = int(os.getenv('CONVERSATION_MESSAGE_MAX_CHARS', 2000))  # Longer messages are truncated
+    CONVERSATION_SUMMARY_MAX_CHARS = int(os.getenv('CONVERSATION_SUMMARY_MAX_CHARS', 2000))
+    CONVERSATION_SUMMARY_CACHE_SIZE = int(os.getenv('CONVERSATION_SUMMARY_CACHE_SIZE', 1024))
+    CONVERSATION_SUMMARY_TTL = int(os.getenv('CONVERSATION_SUMMARY_TTL', 24 * 3600))
+    CONVERSATION_SUMMARY_WORKERS = int(os.getenv('CONVERSATION_SUMMARY_WORKERS', 2))
+
+    # Server-side /conversation sessions ('memory' or 'sqlite'); idle sessions expire.
+    # Both are per host, so a turn landing on another instance gets a 409 and the client resends its history
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory')
+    SESSION_PATH = os.getenv('SESSION_PATH', os.path.join('instance', 'sessions.sqlite3'))
+    SESSION_TTL = int(os.getenv('SESSION_TTL', 24 * 3600))  # Seconds since the last turn
+    SESSION_MAX_BYTES = int(os.getenv('SESSION_MAX_BYTES', 64 * 1024 ** 2))  # Cap on all stored history; least recently used go first
+    SESSION_MAX_MESSAGES = int(os.getenv('SESSION_MAX_MESSAGES', 200))  # Oldest turns are dropped beyond this
+    SESSION_MESSAGE_MAX_CHARS = int(os.getenv('SESSION_MESSAGE_MAX_CHARS', 8000))  # Longer new messages are rejected
+
+    # HTTP caching of API responses: Cache-Control max-age in seconds per route group, compression of larger bodies
+    HTTP_CACHE_STRUCTURE_MAX_AGE = int(os.getenv('HTTP_CACHE_STRUCTURE_MAX_AGE', 7 * 24 * 3600))  # AlphaFold models
+    HTTP_CACHE_PROTEIN_MAX_AGE = int(os.getenv('HTTP_CACHE_PROTEIN_MAX_AGE', 24 * 3600))  # UniProt and ChEMBL data
+    HTTP_CACHE_ANALYSIS_MAX_AGE = int(os.getenv('HTTP_CACHE_ANALYSIS_MAX_AGE', 3600))  # Gemini output
+    HTTP_CACHE_SUGGEST_MAX_AGE = int(os.getenv('HTTP_CACHE_SUGGEST_MAX_AGE', 3600))
+    HTTP_COMPRESS_MIN_BYTES = int(os.getenv('HTTP_COMPRESS_MIN_BYTES', 1024))  # Smaller bodies are sent as-is
+    HTTP_GZIP_LEVEL = int(os.getenv('HTTP_GZIP_LEVEL', 6))
+    HTTP_BROTLI_QUALITY = int(os.getenv('HTTP_BROTLI_QUALITY', 5))  # Needs the optional Brotli package
+    HTTP_COMPRESSED_CACHE_BYTES = int(os.getenv('HTTP_COMPRESSED_CACHE_BYTES', 32 * 1024 ** 2))  # Compressed bodies reused by ETag
@@ -0,0 +1,80 @@
+class UniProtRecord:
+    """
+    The handful of UniProt entry fields the API uses, parsed once.
+
+    Built from entries fetched with ENTRY_FIELDS, so the nested UniProt JSON
+    is walked a single time and then dropped.
+    """
+
+    __slots__ = ("accession", "entry_name", "protein_name", "gene_names", "gene_synonyms",
+                 "function", "organism", "reviewed")
+
+    # UniProt REST "fields" projection covering every attribute above
+    ENTRY_FIELDS = "accession,id,protein_name,gene_names,cc_function,organism_name,reviewed"
+
+    def __init__(self, accession, entry_name="", protein_name="", gene_names=(), gene_synonyms=(),
+                 function=None, organism="", reviewed=False):
+        self.accession = accession
+        self.entry_name = entry_name
+        self.protein_name = protein_name
+        self.gene_names = list(gene_names)
+        self.gene_synonyms = list(gene_synonyms)
+        self.function = function
+        self.organism = organism
+        self.reviewed = reviewed
+
+    @classmethod
+    def from_json(cls, entry):
+        """Parse a UniProtKB JSON entry (full or projected)."""
+        description = entry.get("proteinDescription") or {}
+        name = (description.get("recommendedName") or {}).get("fullName", {}).get("value")
+        if not name and description.get("submissionNames"):
+            name = description["submissionNames"][0].get("fullName", {}).get("value")
+
+        gene_names = []
+        gene_synonyms = []
+        for gene in entry.get("genes") or []:
+            if (gene.get("geneName") or {}).get("value"):
+                gene_names.append(gene["geneName"]["value"])
+            gene_synonyms.extend(s["value"] for s in gene.get("synonyms") or [] if s.get("value"))
+
+        function = None
+        for comment in entry.get("comments") or []:
+            if comment.get("commentType") == "FUNCTION" and comment.get("texts"):
+                function = comment["texts"][0].get("value")
+                break
+
+        return cls(
+            entry.get("primaryAccession", ""),
+            entry_name=entry.get("uniProtkbId", ""),
+            protein_name=name or "",
+            gene_names=gene_names,
+            gene_synonyms=gene_synonyms,
+            function=function,
+            organism=(entry.get("organism") or {}).get("scientificName", ""),
+            reviewed=str(entry.get("entryType", "")).startswith("UniProtKB reviewed")
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def gene_symbols(self):
+        """Upper-cased gene names and synonyms, for matching queries against."""
+        return {name.upper() for name in self.gene_names + self.gene_synonyms}
+
+    def display_name(self):
+        return self.protein_name or self.entry_name
+
+    def to_function_info(self):
+        """The function summary returned by get_protein_function."""
+        return {
+            'id': self.accession,
+            'name': self.display_name(),
+            'function': self.function or "Function information not available",
+            'gene_names': self.gene_names,
+            'organism': self.organism
+        }
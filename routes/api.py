@@ -1,13 +1,51 @@
-from flask import Blueprint, request, jsonify
-from services.uniprot_service import get_protein_function, search_uniprot
-from services.alphafold_service import get_alphafold_structure, get_alphafold_pdb
-from services.chembl_service import search_chembl, get_drug_associations
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
+from config import Config
+from services.uniprot_service import get_protein_function
+from services.protein_resolver import resolve_protein
+from services.alphafold_service import get_structure_data, get_stored_pdb_path
+from services.structure_store import read_model
+from services.structure_service import get_parsed_structure, get_structure_detail_data, DETAIL_LEVELS
+from services.chembl_service import search_chembl, get_drug_associations, get_drug_table
 # from services.protein_interactions_service import get_protein_interactions
-from services.gemini_service import refine_protein_query, generate_protein_analysis
-from utils.response_formatter import format_protein_response
+from services.gemini_service import refine_protein_query, generate_protein_analysis, stream_protein_analysis, query_gemini, stream_gemini
+from services.conversation_context import build_context_prompt
+from services.session_store import get_session_store, new_session_id
+from services.protein_aggregator import get_full_protein_data
+from services.suggest_service import suggest_proteins
+from services.batch_service import iter_batch_results, BATCH_SOURCES
+from utils.response_formatter import format_protein_response, format_sse_event, format_ndjson_line
+from utils import metrics
+from utils.http_cache import mark_degraded
 
 api_bp = Blueprint('api', __name__)
 
+def wants_stream():
+    """Check whether the client asked for a streamed response with ?stream=1."""
+    return request.args.get("stream", "").lower() in ("1", "true", "yes")
+
+def sse_response(chunks, **meta):
+    """
+    Stream text chunks to the client as Server-Sent Events.
+
+    Sends a "meta" event first, one "chunk" event per piece of text, and a
+    final "done" event. Errors raised while streaming become an "error" event.
+    """
+    def generate():
+        yield format_sse_event(meta, event="meta")
+        try:
+            for text in chunks:
+                yield format_sse_event({"text": text}, event="chunk")
+        except Exception as e:
+            print(f"Error while streaming response: {str(e)}")
+            yield format_sse_event({"error": str(e)}, event="error")
+        yield format_sse_event({}, event="done")
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_bp.route('/')
 def api_index():
     """API root endpoint."""
@@ -16,10 +54,17 @@ def api_index():
         "message": "AminoVerse API v1.0",
         "endpoints": {
             "GET /api/protein/{protein_name}": "Get basic protein information",
-            "GET /api/protein/{protein_name}/analysis": "Get AI-generated protein analysis",
-            "GET /api/protein/{protein_name}/structure": "Get protein 3D structure data",
-            "GET /api/protein/{protein_name}/drugs": "Get drug associations",
-            "POST /api/refine-query": "Refine a protein query using AI"
+            "GET /api/protein/{protein_name}/analysis": "Get AI-generated protein analysis (?stream=1 for Server-Sent Events)",
+            "GET /api/protein/{protein_name}/structure": "Get protein 3D structure data (?detail=ca|backbone|full)",
+            "GET /api/protein/{protein_name}/structure.bin": "Get atom coordinates, pLDDT and residue/chain indices as compressed NPZ (?detail=ca|backbone|full)",
+            "GET /api/protein/{protein_name}/structure.pdb": "Get the AlphaFold model as a PDB file from the local structure store",
+            "GET /api/protein/{protein_name}/drugs": "Get drug associations (?mode=aggregate&cursor=...&limit=... for a ranked compound table)",
+            "GET /api/protein/{protein_name}/full": "Get function, structure, drugs and analysis in one call",
+            "GET /api/suggest?q={partial_name}": "Suggest protein names as the user types",
+            "POST /api/proteins/batch": "Look up many proteins at once, streamed back as NDJSON in completion order",
+            "POST /api/refine-query": "Refine a protein query using AI",
+            "POST /api/conversation": "Ask a follow-up question in a server-side session ({session_id, message}; ?stream=1 for Server-Sent Events)",
+            "GET /api/metrics": "Service, upstream, route and cache metrics in the Prometheus text format"
         }
     })
 
@@ -38,7 +83,7 @@ def get_protein_info(protein_name):
             "function": function_data
         }
         
-        return jsonify(response)
+        return mark_degraded(jsonify(response), response)
     
     except Exception as e:
         import traceback
@@ -52,52 +97,108 @@ def get_protein_structure_data(protein_name):
     Get structure information for a protein
     """
     try:
-        # First get UniProt ID
-        uniprot_data = search_uniprot(protein_name)
+        detail = request.args.get("detail", "full").lower()
+        if detail not in DETAIL_LEVELS:
+            return jsonify({"error": f"Invalid 'detail' value, expected one of: {', '.join(DETAIL_LEVELS)}"}), 400
         
-        if uniprot_data.get("error") or not uniprot_data.get("results"):
+        # First get UniProt ID (shared with the other protein endpoints)
+        resolved = resolve_protein(protein_name)
+        
+        if resolved.get("error"):
             return jsonify({"error": "Could not find protein in UniProt"}), 404
             
-        uniprot_id = uniprot_data["results"][0].get("primaryAccession")
-        
-        if not uniprot_id:
-            return jsonify({"error": "Could not determine UniProt ID"}), 404
-        
-        # Get AlphaFold structure
-        structure_data = get_alphafold_structure(uniprot_id)
-        
-        # Fix here: Check if structure_data is a list and handle appropriately
-        if structure_data:
-            # Check if it's a dictionary with an error
-            if isinstance(structure_data, dict) and structure_data.get("error"):
-                response = {
-                    "protein_name": protein_name,
-                    "uniprot_id": uniprot_id,
-                    "error": structure_data.get("error")
-                }
-            # If it's a list (normal AlphaFold response format)
-            elif isinstance(structure_data, list):
-                pdb_data = get_alphafold_pdb(structure_data)
-                response = {
-                    "protein_name": protein_name,
-                    "uniprot_id": uniprot_id,
-                    "structure_metadata": structure_data,
-                    "pdb_data": pdb_data
-                }
-            else:
-                response = {
-                    "protein_name": protein_name,
-                    "uniprot_id": uniprot_id,
-                    "error": "Unexpected structure data format"
-                }
+        uniprot_id = resolved["accession"]
+        
+        # Get AlphaFold structure and PDB data
+        response = {"protein_name": protein_name}
+        
+        if detail == "full":
+            response.update(get_structure_data(uniprot_id))
         else:
-            response = {
-                "protein_name": protein_name,
-                "uniprot_id": uniprot_id,
-                "error": "No structure available"
+            # Reduced models are cut from the parsed atom arrays
+            response.update(get_structure_detail_data(uniprot_id, detail))
+        
+        return mark_degraded(jsonify(response), response)
+    
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Error processing request: {str(e)}\n{error_details}")
+        return jsonify({"error": str(e), "details": error_details}), 500
+
+@api_bp.route('/protein/<protein_name>/structure.bin', methods=['GET'])
+def get_protein_structure_binary(protein_name):
+    """
+    Get the parsed structure of a protein as a compressed NumPy archive
+    """
+    try:
+        detail = request.args.get("detail", "full").lower()
+        if detail not in DETAIL_LEVELS:
+            return jsonify({"error": f"Invalid 'detail' value, expected one of: {', '.join(DETAIL_LEVELS)}"}), 400
+        
+        resolved = resolve_protein(protein_name)
+        
+        if resolved.get("error"):
+            return jsonify({"error": "Could not find protein in UniProt"}), 404
+        
+        uniprot_id = resolved["accession"]
+        structure = get_parsed_structure(uniprot_id, detail)
+        
+        if isinstance(structure, dict):
+            return jsonify({"protein_name": protein_name, "uniprot_id": uniprot_id, "error": structure["error"]}), 404
+        
+        return Response(
+            structure.to_npz(),
+            mimetype="application/octet-stream",
+            headers={
+                "Content-Disposition": f'attachment; filename="{uniprot_id}.npz"',
+                "X-Atom-Count": str(len(structure))
             }
+        )
+    
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Error processing request: {str(e)}\n{error_details}")
+        return jsonify({"error": str(e), "details": error_details}), 500
+
+@api_bp.route('/protein/<protein_name>/structure.pdb', methods=['GET'])
+def get_protein_structure_pdb(protein_name):
+    """
+    Get the AlphaFold model of a protein as a PDB file
+    """
+    try:
+        resolved = resolve_protein(protein_name)
         
-        return jsonify(response)
+        if resolved.get("error"):
+            return jsonify({"error": "Could not find protein in UniProt"}), 404
+        
+        uniprot_id = resolved["accession"]
+        stored = get_stored_pdb_path(uniprot_id)
+        
+        if stored.get("error"):
+            return jsonify({"protein_name": protein_name, "uniprot_id": uniprot_id, "error": stored["error"]}), 404
+        
+        download_name = f"AF-{stored['accession']}-v{stored['model_version']}.pdb"
+        
+        # The stored file is already gzip'd, so clients that accept gzip get it as-is
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            response = send_file(
+                stored["path"], mimetype="chemical/x-pdb", download_name=download_name,
+                max_age=Config.HTTP_CACHE_STRUCTURE_MAX_AGE
+            )
+            response.headers["Content-Encoding"] = "gzip"
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
+        
+        pdb_text = read_model(stored["accession"], stored["model_version"])
+        if pdb_text is None:
+            return jsonify({"protein_name": protein_name, "uniprot_id": uniprot_id, "error": "Could not read stored model"}), 500
+        return Response(
+            pdb_text,
+            mimetype="chemical/x-pdb",
+            headers={"Content-Disposition": f'inline; filename="{download_name}"', "Vary": "Accept-Encoding"}
+        )
     
     except Exception as e:
         import traceback
@@ -111,6 +212,14 @@ def get_protein_drug_data(protein_name):
     Get drug association information for a protein
     """
     try:
+        # Ranked compound table over every ChEMBL activity, paged with cursors
+        if request.args.get("mode") == "aggregate":
+            limit = request.args.get("limit", type=int)
+            drug_data = get_drug_table(protein_name, cursor=request.args.get("cursor"), limit=limit)
+            status = 400 if drug_data.get("error") == "Invalid cursor" else 200
+            response = {"protein_name": protein_name, "drug_associations": drug_data}
+            return mark_degraded(jsonify(response), response), status
+        
         # Get drug associations
         drug_data = get_drug_associations(protein_name)
         
@@ -119,7 +228,7 @@ def get_protein_drug_data(protein_name):
             "drug_associations": drug_data
         }
         
-        return jsonify(response)
+        return mark_degraded(jsonify(response), response)
     
     except Exception as e:
         import traceback
@@ -133,17 +242,17 @@ def get_protein_analysis(protein_name):
     Get AI-generated analysis for a protein
     """
     try:
-        # First get UniProt ID
-        uniprot_data = search_uniprot(protein_name)
+        # First get UniProt ID (shared with the other protein endpoints)
+        resolved = resolve_protein(protein_name)
         
-        if uniprot_data.get("error") or not uniprot_data.get("results"):
+        if resolved.get("error"):
             return jsonify({"error": "Could not find protein in UniProt"}), 404
             
-        uniprot_id = uniprot_data["results"][0].get("primaryAccession")
-        protein_name = uniprot_data["results"][0].get("proteinDescription", {}).get("recommendedName", {}).get("fullName", {}).get("value", protein_name)
+        uniprot_id = resolved["accession"]
+        protein_name = resolved["entry"].protein_name or protein_name
         
-        if not uniprot_id:
-            return jsonify({"error": "Could not determine UniProt ID"}), 404
+        if wants_stream():
+            return sse_response(stream_protein_analysis(protein_name, uniprot_id), protein_name=protein_name, uniprot_id=uniprot_id)
         
         # Generate analysis
         analysis = generate_protein_analysis(protein_name, uniprot_id)
@@ -154,7 +263,89 @@ def get_protein_analysis(protein_name):
             "analysis": analysis
         }
         
-        return jsonify(response)
+        return mark_degraded(jsonify(response), response)
+    
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Error processing request: {str(e)}\n{error_details}")
+        return jsonify({"error": str(e), "details": error_details}), 500
+
+@api_bp.route('/protein/<protein_name>/full', methods=['GET'])
+def get_full_protein_info(protein_name):
+    """
+    Get function, structure, drug and analysis data for a protein in one call
+    """
+    try:
+        response = get_full_protein_data(protein_name)
+        
+        if response.get("error"):
+            return jsonify(response), 404
+        
+        return mark_degraded(jsonify(response), response)
+    
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Error processing request: {str(e)}\n{error_details}")
+        return jsonify({"error": str(e), "details": error_details}), 500
+
+@api_bp.route('/proteins/batch', methods=['POST'])
+def get_protein_batch():
+    """
+    Look up a list of protein names or accessions in one call
+
+    Accepts {"proteins": [...], "include": ["structure", "drugs"]} and streams
+    one JSON object per line as each protein finishes.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        queries = data.get("proteins")
+        include = data.get("include", list(BATCH_SOURCES))
+        
+        if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+            return jsonify({"error": "'proteins' must be a non-empty list of names or accessions"}), 400
+        
+        if len(queries) > Config.BATCH_MAX_SIZE:
+            return jsonify({"error": f"At most {Config.BATCH_MAX_SIZE} proteins per batch"}), 400
+        
+        if not isinstance(include, list) or any(source not in BATCH_SOURCES for source in include):
+            return jsonify({"error": f"'include' must be a list drawn from: {', '.join(BATCH_SOURCES)}"}), 400
+        
+        def generate():
+            for result in iter_batch_results([q.strip() for q in queries], include):
+                yield format_ndjson_line(result)
+        
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+    
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Error processing request: {str(e)}\n{error_details}")
+        return jsonify({"error": str(e), "details": error_details}), 500
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Expose latency histograms, payload sizes, cache hits and error counts for Prometheus
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@api_bp.route('/suggest', methods=['GET'])
+def suggest():
+    """
+    Suggest gene symbols and protein names for a partial query
+    """
+    try:
+        query = request.args.get("q", "")
+        limit = request.args.get("limit", 10, type=int)
+        
+        suggestions = suggest_proteins(query, limit)
+        
+        if suggestions.get("error"):
+            return jsonify(suggestions), 503
+        
+        return jsonify(suggestions)
     
     except Exception as e:
         import traceback
@@ -190,45 +381,91 @@ def refine_query():
 def conversation():
     """
     Handle a conversational query about proteins
+
+    Accepts {"session_id": "...", "message": "...", "protein": "..."}. The
+    history is kept server-side under the session ID, which is returned and
+    created when missing. An unknown or expired ID (another instance, or a
+    restart, served the earlier turns) gets a 409 with "session_restarted"
+    so the client can resend the turn with its copy of the earlier messages
+    as "history"; that seeds a new session. The legacy {"messages": [...]}
+    form with the full history is still accepted. Only the latest turns are
+    sent verbatim; older ones go as a cached summary, and the protein's
+    UniProt facts are added when already cached.
     """
     try:
         data = request.json
         
-        if not data or not data.get("messages"):
-            return jsonify({"error": "Missing 'messages' field in request"}), 400
-        
-        # Format the conversation for Gemini
-        messages = data["messages"]
-        current_query = messages[-1] if messages else ""
-        conversation_history = "\n".join([f"User: {msg}" if i % 2 == 0 else f"Assistant: {msg}" for i, msg in enumerate(messages[:-1])]) if len(messages) > 1 else ""
+        # The session form is chosen by the presence of "message", so an empty one is an error, not the legacy form
+        if not isinstance(data, dict) or ("message" not in data and not data.get("messages")):
+            return jsonify({"error": "Missing 'message' field in request"}), 400
         
-        # Build the prompt with conversation context
-        if conversation_history:
-            prompt = f"""
-            I am an AI assistant specializing in protein biology. 
+        if "message" not in data:
+            messages = data["messages"]
+            if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+                return jsonify({"error": "'messages' must be a list of strings"}), 400
             
-            Previous conversation:
-            {conversation_history}
+            # Format the conversation for Gemini within the context budget
+            prompt, context = build_context_prompt(messages, data.get("conversation_id"), data.get("protein"))
             
-            User's latest question: {current_query}
+            if wants_stream():
+                return sse_response(stream_gemini(prompt))
             
-            Provide a helpful, scientifically accurate response about this protein or biology question.
-            """
-        else:
-            prompt = f"""
-            I am an AI assistant specializing in protein biology. 
+            # Get response from Gemini
+            response = query_gemini(prompt)
             
-            User's question: {current_query}
+            return jsonify({
+                "response": response,
+                "context": context
+            })
+        
+        message = data["message"]
+        if not isinstance(message, str) or not message.strip():
+            return jsonify({"error": "'message' must be a non-empty string"}), 400
+        if len(message) > Config.SESSION_MESSAGE_MAX_CHARS:
+            return jsonify({"error": f"'message' is longer than {Config.SESSION_MESSAGE_MAX_CHARS} characters"}), 400
+        
+        seed = data.get("history")
+        if seed is not None and (not isinstance(seed, list) or not all(isinstance(m, str) for m in seed) or len(seed) % 2):
+            return jsonify({"error": "'history' must be a list of completed user/assistant message pairs"}), 400
+        
+        store = get_session_store()
+        session_id = data.get("session_id")
+        history = store.get(session_id) if isinstance(session_id, str) and session_id else None
+        restarted = bool(session_id) and history is None
+        if restarted and seed is None:
+            # Answering without the earlier turns would lose the conversation; ask for them instead
+            return jsonify({"error": "Unknown or expired session, resend with 'history'", "session_restarted": True}), 409
+        if history is None:
+            # A new session starts from the client's copy of the history, stored with the first completed turn
+            session_id = new_session_id()
+            history = seed or []
+            turn = history + [message]
+        else:
+            turn = [message]
+        
+        prompt, context = build_context_prompt(history + [message], session_id, data.get("protein"))
+        
+        if wants_stream():
+            def chunks():
+                parts = []
+                for text in stream_gemini(prompt):
+                    parts.append(text)
+                    yield text
+                # Only a completed reply is stored; disconnects and errors leave the history as it was
+                store.append(session_id, turn + ["".join(parts)])
             
-            Provide a helpful, scientifically accurate response about this protein or biology question.
-            """
+            return sse_response(chunks(), session_id=session_id, session_restarted=restarted)
         
         # Get response from Gemini
-        from services.gemini_service import query_gemini
         response = query_gemini(prompt)
+        if response is not None:
+            store.append(session_id, turn + [response])
         
         return jsonify({
-            "response": response
+            "response": response,
+            "session_id": session_id,
+            "session_restarted": restarted,
+            "context": context
         })
     
     except Exception as e:
@@ -83,16 +83,29 @@ async function getDrugAssociations(proteinName) {
     }
 }
 
-async function sendChatMessage(messages) {
+async function sendChatMessage(message, sessionId, protein, history) {
     try {
         const response = await fetch(`${API_BASE_URL}/conversation`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ messages: messages }),
+            body: JSON.stringify({
+                session_id: sessionId || undefined,
+                message: message,
+                protein: protein || undefined,
+                history: history
+            }),
         });
         
+        if (response.status === 409) {
+            // The session is unknown to the server (expired, or kept by another instance)
+            const body = await response.json();
+            if (body.session_restarted && history === undefined) {
+                return sendChatMessage(message, null, protein, chatHistory);
+            }
+        }
+        
         if (!response.ok) {
             throw new Error(`Error: ${response.statusText}`);
         }
@@ -238,7 +251,9 @@ function showSection(sectionId) {
 }
 
 // Initialize chat
-let chatMessages = [];
+let chatSessionId = null;
+// Completed user/assistant turns, resent to seed a new session when the server no longer has ours
+let chatHistory = [];
 let currentProtein = null;
 
 // Format analysis text for better display
@@ -475,9 +490,6 @@ async function sendChat() {
         return;
     }
     
-    // Add message to chat history
-    chatMessages.push(message);
-    
     // Display user message with animation delay
     addChatMessage("user", message);
     
@@ -495,14 +507,11 @@ async function sendChat() {
         // Get response from API with slight delay for better UX
         setTimeout(async () => {
             try {
-                // Include the current protein context if available
-                const contextMessage = currentProtein ? 
-                    `The user is currently exploring the protein: ${currentProtein}. Please provide specific information about this protein in your response.` : "";
-                
-                const contextualMessages = contextMessage ? 
-                    [contextMessage, ...chatMessages] : chatMessages;
-                
-                const response = await sendChatMessage(contextualMessages);
+                // The backend keeps the history under the session ID and adds the current protein's facts
+                const response = await sendChatMessage(message, chatSessionId, currentProtein);
+                if (response.session_id) {
+                    chatSessionId = response.session_id;
+                }
                 
                 if (response.response) {
                     // Replace "thinking" message with actual response
@@ -512,7 +521,7 @@ async function sendChat() {
                     addChatMessage("assistant", response.response, "", true);
                     
                     // Add to chat history
-                    chatMessages.push(response.response);
+                    chatHistory.push(message, response.response);
                 } else {
                     // Replace "thinking" message with error
                     document.querySelector(".chat-message.thinking").remove();
@@ -1,19 +1,79 @@
+import asyncio
 import requests
+from config import Config
+from services import http_client, structure_store
+from services.revalidation import FRESH, STALE, conditional_headers, freshness, get_validators, revalidate_in_background
+from services.single_flight import single_flight, async_single_flight
+from utils import metrics
 
+def prediction_url(uniprot_id):
+    return f"{Config.ALPHAFOLD_BASE_URL}/api/prediction/{uniprot_id}"
+
+def cached_metadata(uniprot_id):
+    """
+    Return (metadata, previous) from the structure store.
+
+    Fresh metadata is returned as is; stale metadata is returned while it is
+    revalidated in the background. Otherwise metadata is None and previous
+    is the expired (metadata, validators), if any.
+    """
+    entry = structure_store.get_metadata_entry(uniprot_id)
+    state = freshness(entry[2], Config.STRUCTURE_METADATA_TTL) if entry is not None else None
+    metrics.record_cache("structure_store_metadata", state in (FRESH, STALE))
+    if state == FRESH:
+        return entry[0], None
+    if state == STALE:
+        revalidate_in_background("structure_store_metadata", uniprot_id, lambda: load_metadata(uniprot_id, entry[:2])[1])
+        return entry[0], None
+    return None, entry[:2] if entry is not None else None
+
+def store_metadata(uniprot_id, response, previous):
+    """
+    Turn an AlphaFold prediction response into (data, result) and keep it in the structure store.
+
+    A 304 renews previous; result is "not_modified", "changed" or "error".
+    """
+    if response.status_code == 304 and previous is not None:
+        structure_store.put_metadata(uniprot_id, previous[0], validators=previous[1])
+        return previous[0], "not_modified"
+    if response.status_code == 404:
+        return {"error": "Protein structure not found in AlphaFold database"}, "error"
+    response.raise_for_status()
+    data = response.json()
+    if isinstance(data, list) and data:
+        structure_store.put_metadata(uniprot_id, data, validators=get_validators(response.headers))
+    return data, "changed"
+
+def load_metadata(uniprot_id, previous=None):
+    """Fetch AlphaFold metadata, conditionally when previous (metadata, validators) is given."""
+    response = http_client.get(prediction_url(uniprot_id), headers=conditional_headers(previous[1] if previous else None))
+    return store_metadata(uniprot_id, response, previous)
+
+@metrics.timed()
+@single_flight("alphafold_structure", key=str)
 def get_alphafold_structure(uniprot_id):
     """Get AlphaFold protein structure by UniProt ID."""
-    url = f"https://alphafold.ebi.ac.uk/api/prediction/{uniprot_id}"
+    stored, previous = cached_metadata(uniprot_id)
+    if stored is not None:
+        return stored
     
     try:
-        response = requests.get(url)
-        if response.status_code == 404:
-            return {"error": "Protein structure not found in AlphaFold database"}
-        response.raise_for_status()
-        data = response.json()
+        data, _ = load_metadata(uniprot_id, previous)
         return data  # This could be a list, as shown by the error
     except requests.exceptions.RequestException as e:
+        # Models rarely change, so expired metadata beats no structure during an outage
+        stale = structure_store.get_metadata(uniprot_id, allow_stale=True)
+        if stale is not None:
+            print(f"AlphaFold unavailable, serving stale metadata for {uniprot_id}")
+            return stale
         return {"error": f"Error querying AlphaFold API: {str(e)}"}
 
+def model_key(alphafold_data):
+    """Return the (accession, model version) a list of AlphaFold metadata describes."""
+    entry = alphafold_data[0]
+    return entry.get("uniprotAccession"), entry.get("latestVersion")
+
+@metrics.timed()
 def get_alphafold_pdb(alphafold_data):
     """Download PDB structure from AlphaFold using the PDB URL from the data."""
     if not alphafold_data:
@@ -25,13 +85,144 @@ def get_alphafold_pdb(alphafold_data):
             pdb_url = alphafold_data[0].get("pdbUrl")
             if not pdb_url:
                 return {"error": "No PDB URL available in AlphaFold data"}
+            
+            accession, version = model_key(alphafold_data)
+            storable = accession is not None and version is not None
+            pdb_text = structure_store.read_model(accession, version) if storable else None
+            if pdb_text is not None:
+                return {"pdb_data": pdb_text}
                 
-            response = requests.get(pdb_url)
+            response = http_client.get(pdb_url)
             response.raise_for_status()
+            if storable:
+                structure_store.put_model(accession, version, response.text)
             return {"pdb_data": response.text}
         else:
             return {"error": "Invalid AlphaFold data structure"}
     except requests.exceptions.RequestException as e:
         return {"error": f"Error fetching AlphaFold PDB: {str(e)}"}
     except Exception as e:
-        return {"error": f"Unexpected error processing AlphaFold data: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Unexpected error processing AlphaFold data: {str(e)}"}
+
+def get_structure_data(uniprot_id):
+    """Get AlphaFold metadata and PDB data for a UniProt ID as one dict."""
+    structure_data = get_alphafold_structure(uniprot_id)
+    
+    if not structure_data:
+        return {"uniprot_id": uniprot_id, "error": "No structure available"}
+    
+    # Check if it's a dictionary with an error
+    if isinstance(structure_data, dict) and structure_data.get("error"):
+        return {"uniprot_id": uniprot_id, "error": structure_data.get("error")}
+    
+    # If it's a list (normal AlphaFold response format)
+    if isinstance(structure_data, list):
+        return {
+            "uniprot_id": uniprot_id,
+            "structure_metadata": structure_data,
+            "pdb_data": get_alphafold_pdb(structure_data)
+        }
+    
+    return {"uniprot_id": uniprot_id, "error": "Unexpected structure data format"}
+
+def get_stored_pdb_path(uniprot_id):
+    """
+    Get the path of the gzip'd PDB file for a UniProt ID in the structure store.
+
+    Downloads the model into the store first if needed. Returns a dict with
+    "path", or with "error" if there is no model or the store is disabled.
+    """
+    if not structure_store.is_enabled():
+        return {"error": "Structure store is disabled"}
+    
+    structure_data = get_alphafold_structure(uniprot_id)
+    if isinstance(structure_data, dict) and structure_data.get("error"):
+        return {"error": structure_data["error"]}
+    if not isinstance(structure_data, list) or not structure_data:
+        return {"error": "No structure available"}
+    
+    accession, version = model_key(structure_data)
+    if accession is None or version is None:
+        return {"error": "AlphaFold data has no accession or model version"}
+    
+    path = structure_store.model_path(accession, version)
+    if path is None:
+        pdb_data = get_alphafold_pdb(structure_data)
+        if pdb_data.get("error"):
+            return {"error": pdb_data["error"]}
+        path = structure_store.model_path(accession, version)
+        if path is None:
+            return {"error": "Could not store AlphaFold model"}
+    
+    return {"path": path, "accession": accession, "model_version": version}
+
+
+@metrics.timed()
+@async_single_flight("alphafold_structure_async", key=str)
+async def async_get_alphafold_structure(uniprot_id):
+    """Async variant of get_alphafold_structure for the ASGI app."""
+    import httpx
+    stored, previous = cached_metadata(uniprot_id)
+    if stored is not None:
+        return stored
+    
+    try:
+        response = await http_client.async_get(
+            prediction_url(uniprot_id), headers=conditional_headers(previous[1] if previous else None)
+        )
+        data, _ = store_metadata(uniprot_id, response, previous)
+        return data
+    except (httpx.HTTPError, ValueError) as e:
+        # ValueError is a body that is not JSON, which the sync path gets as a RequestException
+        stale = structure_store.get_metadata(uniprot_id, allow_stale=True)
+        if stale is not None:
+            print(f"AlphaFold unavailable, serving stale metadata for {uniprot_id}")
+            return stale
+        return {"error": f"Error querying AlphaFold API: {str(e)}"}
+
+@metrics.timed()
+async def async_get_alphafold_pdb(alphafold_data):
+    """Async variant of get_alphafold_pdb; store reads and writes run in a worker thread."""
+    import httpx
+    if not isinstance(alphafold_data, list) or not alphafold_data:
+        return {"error": "Invalid AlphaFold data structure"}
+    
+    pdb_url = alphafold_data[0].get("pdbUrl")
+    if not pdb_url:
+        return {"error": "No PDB URL available in AlphaFold data"}
+    
+    try:
+        accession, version = model_key(alphafold_data)
+        storable = accession is not None and version is not None
+        pdb_text = await asyncio.to_thread(structure_store.read_model, accession, version) if storable else None
+        if pdb_text is not None:
+            return {"pdb_data": pdb_text}
+        
+        response = await http_client.async_get(pdb_url)
+        response.raise_for_status()
+        if storable:
+            await asyncio.to_thread(structure_store.put_model, accession, version, response.text)
+        return {"pdb_data": response.text}
+    except httpx.HTTPError as e:
+        return {"error": f"Error fetching AlphaFold PDB: {str(e)}"}
+    except Exception as e:
+        return {"error": f"Unexpected error processing AlphaFold data: {str(e)}"}
+
+async def async_get_structure_data(uniprot_id):
+    """Async variant of get_structure_data for the ASGI app."""
+    structure_data = await async_get_alphafold_structure(uniprot_id)
+    
+    if not structure_data:
+        return {"uniprot_id": uniprot_id, "error": "No structure available"}
+    
+    if isinstance(structure_data, dict) and structure_data.get("error"):
+        return {"uniprot_id": uniprot_id, "error": structure_data.get("error")}
+    
+    if isinstance(structure_data, list):
+        return {
+            "uniprot_id": uniprot_id,
+            "structure_metadata": structure_data,
+            "pdb_data": await async_get_alphafold_pdb(structure_data)
+        }
+    
+    return {"uniprot_id": uniprot_id, "error": "Unexpected structure data format"}
@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import Config
+from services.protein_resolver import resolve_protein, resolve_proteins
+from services.uniprot_service import get_protein_function
+from services.alphafold_service import get_alphafold_structure
+from services.chembl_service import get_drug_associations
+
+# Sources a batch can ask for on top of the UniProt function data
+BATCH_SOURCES = ("structure", "drugs")
+
+# Separate from the /full pool so one large batch cannot starve single-protein requests
+_executor = ThreadPoolExecutor(max_workers=Config.BATCH_MAX_WORKERS, thread_name_prefix="batch")
+
+
+def summarize_structure(structure_data):
+    """Reduce AlphaFold prediction metadata to the fields a batch result needs."""
+    if isinstance(structure_data, dict) and structure_data.get("error"):
+        return {"error": structure_data["error"]}
+    if not isinstance(structure_data, list) or not structure_data:
+        return {"error": "No structure available"}
+
+    model = structure_data[0]
+    return {
+        "entry_id": model.get("entryId"),
+        "model_version": model.get("latestVersion"),
+        "mean_plddt": model.get("globalMetricValue"),
+        "pdb_url": model.get("pdbUrl")
+    }
+
+
+def lookup_protein(query, resolved, include):
+    """Build the result for one query of a batch."""
+    if resolved is None:
+        resolved = resolve_protein(query)
+    if resolved.get("error"):
+        return {"query": query, "error": resolved["error"]}
+
+    uniprot_id = resolved["accession"]
+    result = {
+        "query": query,
+        "uniprot_id": uniprot_id,
+        "function": get_protein_function(query)
+    }
+    if "structure" in include:
+        result["structure"] = summarize_structure(get_alphafold_structure(uniprot_id))
+    if "drugs" in include:
+        result["drug_associations"] = get_drug_associations(query)
+    return result
+
+
+def iter_batch_results(queries, include=BATCH_SOURCES):
+    """
+    Look up many proteins and yield one result dict per query as each finishes.
+
+    Accessions and gene symbols are resolved together in grouped UniProt
+    requests; anything left over is resolved one by one on the worker
+    pool. Each result carries the "index" of its query in the input, since
+    results arrive in completion order rather than input order.
+    """
+    resolved = resolve_proteins(set(queries))
+
+    futures = {}
+    for index, query in enumerate(queries):
+        future = _executor.submit(lookup_protein, query, resolved.get(query), include)
+        futures[future] = (index, query)
+
+    try:
+        for future in as_completed(futures):
+            index, query = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"query": query, "error": f"Unexpected error looking up protein: {str(e)}"}
+            result["index"] = index
+            yield result
+    finally:
+        # Stop queued lookups if the client goes away mid-stream
+        for future in futures:
+            future.cancel()
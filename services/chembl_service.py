@@ -1,24 +1,102 @@
+import base64
+import threading
+from array import array
+from urllib.parse import urljoin
 import requests
+import time
+from cachetools import TLRUCache
+from config import Config
+from services import http_client
+from services.revalidation import RevalidatingCache, NOT_MODIFIED, conditional_headers, get_validators
+from services.single_flight import single_flight, async_single_flight
+from utils import metrics
+from utils.query import normalize_query
 
-def search_chembl(protein_name):
-    """Search ChEMBL for targets related to the protein."""
-    base_url = "https://www.ebi.ac.uk/chembl/api/data"
-    
-    # Search for targets by protein name
-    url = f"{base_url}/target/search"
-    params = {
+CHEMBL_BASE_URL = Config.CHEMBL_BASE_URL
+
+# Target searches by protein name, so repeat drug lookups skip straight to the
+# activities; stale ones are revalidated in the background
+_target_cache = RevalidatingCache("chembl_targets", Config.RESOLVER_CACHE_SIZE, Config.CACHE_EXPIRY)
+TARGET_SEARCH_URL = f"{CHEMBL_BASE_URL}/target/search"
+
+
+def _target_params(protein_name):
+    return {
         "q": protein_name,
         "format": "json",
         "limit": 5
     }
-    
+
+
+def prime_target_search(protein_name, chembl_data, fetched_at=None):
+    """Seed the target search cache, e.g. from a warm-up snapshot, fetched at fetched_at (default now)."""
+    _target_cache.store(normalize_query(protein_name), chembl_data, fetched_at=fetched_at)
+
+def _load_targets(protein_name, validators):
+    # Search for targets by protein name, conditionally when revalidating
+    response = http_client.get(
+        TARGET_SEARCH_URL, params=_target_params(protein_name), headers=conditional_headers(validators)
+    )
+    if response.status_code == 304:
+        return NOT_MODIFIED
+    response.raise_for_status()
+    return response.json(), get_validators(response.headers)
+
+@metrics.timed()
+def search_chembl(protein_name):
+    """Search ChEMBL for targets related to the protein."""
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return _target_cache.get(normalize_query(protein_name), lambda validators: _load_targets(protein_name, validators))
     except requests.exceptions.RequestException as e:
         return {"error": f"Error querying ChEMBL API: {str(e)}"}
 
+def select_target(targets):
+    """Pick the target to report drugs for, preferring a single human protein over complexes and families."""
+    for target_type, organism in (("SINGLE PROTEIN", "Homo sapiens"), ("SINGLE PROTEIN", None)):
+        for target in targets:
+            if target.get("target_type") == target_type and organism in (None, target.get("organism")):
+                return target
+    return targets[0]
+
+def format_drug_list(activities):
+    """Turn raw ChEMBL activities into the drug entries get_drug_associations returns."""
+    drug_list = []
+    for activity in activities:
+        # Only include entries that have the essential data
+        if not activity.get("molecule_chembl_id"):
+            continue
+
+        drug = {
+            "molecule_chembl_id": activity.get("molecule_chembl_id"),
+        }
+
+        # Only add fields if they have actual data
+        if activity.get("molecule_name"):
+            drug["molecule_name"] = activity["molecule_name"]
+
+        if activity.get("standard_type"):
+            drug["activity_type"] = activity["standard_type"]
+
+        if activity.get("standard_value") is not None:
+            value_str = f"{activity['standard_value']}"
+            if activity.get("standard_units"):
+                value_str += f" {activity['standard_units']}"
+            drug["activity_value"] = value_str
+
+        # Include additional informative fields when available
+        if activity.get("target_organism"):
+            drug["target_organism"] = activity["target_organism"]
+
+        if activity.get("assay_description"):
+            drug["assay_description"] = activity["assay_description"]
+
+        # Only append if we have more than just the ID
+        if len(drug) > 1:
+            drug_list.append(drug)
+    return drug_list
+
+@metrics.timed()
+@single_flight("chembl_drugs", key=normalize_query)
 def get_drug_associations(protein_name):
     """Query ChEMBL API for drug associations."""
     try:
@@ -32,55 +110,301 @@ def get_drug_associations(protein_name):
         if not chembl_data.get("targets") or len(chembl_data["targets"]) == 0:
             return {"error": "No target information found in ChEMBL"}
         
-        target_chembl_id = chembl_data["targets"][0].get("target_chembl_id")
+        target = select_target(chembl_data["targets"])
+        target_chembl_id = target.get("target_chembl_id")
         
         if not target_chembl_id:
             return {"error": "Could not find ChEMBL target ID"}
         
         # Get drugs/compounds that interact with this target
-        drugs_url = f"https://www.ebi.ac.uk/chembl/api/data/activity?target_chembl_id={target_chembl_id}&limit=30&format=json"
-        drugs_response = requests.get(drugs_url)
+        drugs_url = f"{CHEMBL_BASE_URL}/activity?target_chembl_id={target_chembl_id}&limit=30&format=json"
+        drugs_response = http_client.get(drugs_url)
         drugs_response.raise_for_status()
         drugs_data = drugs_response.json()
         
-        drug_list = []
-        for activity in drugs_data.get("activities", []):
-            # Only include entries that have the essential data
-            if not activity.get("molecule_chembl_id"):
-                continue
-                
-            drug = {
-                "molecule_chembl_id": activity.get("molecule_chembl_id"),
-            }
-            
-            # Only add fields if they have actual data
-            if activity.get("molecule_name"):
-                drug["molecule_name"] = activity["molecule_name"]
-                
-            if activity.get("standard_type"):
-                drug["activity_type"] = activity["standard_type"]
-                
-            if activity.get("standard_value") is not None:
-                value_str = f"{activity['standard_value']}"
-                if activity.get("standard_units"):
-                    value_str += f" {activity['standard_units']}"
-                drug["activity_value"] = value_str
-                
-            # Include additional informative fields when available
-            if activity.get("target_organism"):
-                drug["target_organism"] = activity["target_organism"]
-                
-            if activity.get("assay_description"):
-                drug["assay_description"] = activity["assay_description"]
-                
-            # Only append if we have more than just the ID
-            if len(drug) > 1:
-                drug_list.append(drug)
+        drug_list = format_drug_list(drugs_data.get("activities", []))
         
         return {
             "target_chembl_id": target_chembl_id,
-            "target_name": chembl_data["targets"][0].get("pref_name", ""),
+            "target_name": target.get("pref_name", ""),
             "drugs": drug_list
         }
     except Exception as e:
-        return {"error": f"Error fetching drug association data: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Error fetching drug association data: {str(e)}"}
+
+@metrics.timed()
+async def async_search_chembl(protein_name):
+    """Async variant of search_chembl for the ASGI app."""
+    import httpx
+    
+    async def load(validators):
+        response = await http_client.async_get(
+            TARGET_SEARCH_URL, params=_target_params(protein_name), headers=conditional_headers(validators)
+        )
+        if response.status_code == 304:
+            return NOT_MODIFIED
+        response.raise_for_status()
+        return response.json(), get_validators(response.headers)
+    
+    try:
+        return await _target_cache.async_get(
+            normalize_query(protein_name), load, lambda validators: _load_targets(protein_name, validators)
+        )
+    except (httpx.HTTPError, ValueError) as e:
+        # ValueError is a body that is not JSON, which the sync path gets as a RequestException
+        return {"error": f"Error querying ChEMBL API: {str(e)}"}
+
+@metrics.timed()
+@async_single_flight("chembl_drugs_async", key=normalize_query)
+async def async_get_drug_associations(protein_name):
+    """Async variant of get_drug_associations for the ASGI app."""
+    try:
+        chembl_data = await async_search_chembl(protein_name)
+        
+        if chembl_data.get("error"):
+            return {"error": chembl_data["error"]}
+        
+        if not chembl_data.get("targets"):
+            return {"error": "No target information found in ChEMBL"}
+        
+        target = select_target(chembl_data["targets"])
+        target_chembl_id = target.get("target_chembl_id")
+        
+        if not target_chembl_id:
+            return {"error": "Could not find ChEMBL target ID"}
+        
+        drugs_url = f"{CHEMBL_BASE_URL}/activity?target_chembl_id={target_chembl_id}&limit=30&format=json"
+        drugs_response = await http_client.async_get(drugs_url)
+        drugs_response.raise_for_status()
+        
+        return {
+            "target_chembl_id": target_chembl_id,
+            "target_name": target.get("pref_name", ""),
+            "drugs": format_drug_list(drugs_response.json().get("activities", []))
+        }
+    except Exception as e:
+        return {"error": f"Error fetching drug association data: {str(e)}"}
+
+
+# Only the fields the compound table needs, so each page stays small
+ACTIVITY_FIELDS = "molecule_chembl_id,molecule_pref_name,standard_type,pchembl_value"
+
+# Aggregated compound tables, keyed by target ChEMBL ID, so cursors page through one
+# snapshot; stored as (table, expiry time)
+_table_cache = TLRUCache(maxsize=Config.CHEMBL_TABLE_CACHE_SIZE, ttu=lambda _key, entry, now: entry[1], timer=time.time)
+_table_lock = threading.Lock()
+
+
+def iter_activity_pages(target_chembl_id):
+    """
+    Yield lists of activities for a target one page at a time.
+
+    Follows ChEMBL's page_meta.next links until the last page, or until
+    Config.CHEMBL_MAX_ACTIVITIES activities have been read.
+    """
+    url = f"{CHEMBL_BASE_URL}/activity.json"
+    params = {
+        "target_chembl_id": target_chembl_id,
+        "only": ACTIVITY_FIELDS,
+        "limit": Config.CHEMBL_PAGE_SIZE
+    }
+    seen = 0
+    while url and seen < Config.CHEMBL_MAX_ACTIVITIES:
+        response = http_client.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        activities = data.get("activities", [])
+        seen += len(activities)
+        yield activities
+
+        next_url = (data.get("page_meta") or {}).get("next")
+        # The next link carries its own query string
+        url = urljoin(CHEMBL_BASE_URL, next_url) if next_url and activities else None
+        params = None
+
+
+def aggregate_activities(pages):
+    """
+    Aggregate activity pages into one row per molecule.
+
+    Activities are reduced to integer and float arrays as pages arrive, so
+    memory grows with the number of activities rather than with their JSON.
+    Returns (molecule IDs, names, activity types, columns) where columns
+    holds NumPy arrays indexed by molecule: best and median pChEMBL (NaN
+    when no activity has one), activity count and the sorted type ids.
+    """
+    # numpy is imported on first use so cold starts that never aggregate skip it
+    import numpy as np
+    molecule_ids = {}
+    names = []
+    type_ids = {}
+    molecule_column = array("i")
+    type_column = array("i")
+    pchembl_column = array("f")
+    total = 0
+
+    for activities in pages:
+        for activity in activities:
+            molecule = activity.get("molecule_chembl_id")
+            if not molecule:
+                continue
+            number = molecule_ids.get(molecule)
+            if number is None:
+                number = molecule_ids[molecule] = len(names)
+                names.append(activity.get("molecule_pref_name") or "")
+            elif not names[number] and activity.get("molecule_pref_name"):
+                names[number] = activity["molecule_pref_name"]
+
+            # Untyped activities still count towards the pChEMBL summary but list no type
+            activity_type = activity.get("standard_type")
+            type_id = type_ids.setdefault(activity_type, len(type_ids)) if activity_type else -1
+            pchembl = activity.get("pchembl_value")
+
+            molecule_column.append(number)
+            type_column.append(type_id)
+            pchembl_column.append(float(pchembl) if pchembl not in (None, "") else float("nan"))
+            total += 1
+
+    molecule = np.frombuffer(molecule_column, dtype=np.int32) if total else np.empty(0, dtype=np.int32)
+    types = np.frombuffer(type_column, dtype=np.int32) if total else np.empty(0, dtype=np.int32)
+    pchembl = np.frombuffer(pchembl_column, dtype=np.float32) if total else np.empty(0, dtype=np.float32)
+    molecule_count = len(names)
+
+    count = np.bincount(molecule, minlength=molecule_count)
+
+    # Sort by molecule, then pChEMBL with NaN last, so each molecule's measured
+    # values form a sorted run at the start of its group
+    order = np.lexsort((pchembl, molecule))
+    sorted_pchembl = pchembl[order]
+    measured = np.bincount(molecule, weights=~np.isnan(pchembl), minlength=molecule_count).astype(np.int64)
+    starts = np.concatenate(([0], np.cumsum(count)[:-1])).astype(np.int64)
+
+    best = np.full(molecule_count, np.nan, dtype=np.float32)
+    median = np.full(molecule_count, np.nan, dtype=np.float32)
+    has_value = measured > 0
+    if has_value.any():
+        first = starts[has_value]
+        last = first + measured[has_value] - 1
+        best[has_value] = sorted_pchembl[last]
+        median[has_value] = (sorted_pchembl[first + (measured[has_value] - 1) // 2] + sorted_pchembl[first + measured[has_value] // 2]) / 2
+
+    type_names = sorted(type_ids, key=type_ids.get)
+    typed = types >= 0
+    pairs = np.unique(molecule[typed].astype(np.int64) * len(type_names) + types[typed]) if total else np.empty(0, dtype=np.int64)
+    type_lists = [[] for _ in range(molecule_count)]
+    for pair in pairs.tolist():
+        type_lists[pair // len(type_names)].append(type_names[pair % len(type_names)])
+
+    molecules = sorted(molecule_ids, key=molecule_ids.get)
+    return molecules, names, type_lists, {"best": best, "median": median, "count": count, "activities": total}
+
+
+def build_compound_table(target_chembl_id):
+    """Fetch every activity for a target and rank the molecules by best pChEMBL, then activity count."""
+    import numpy as np
+    molecules, names, type_lists, columns = aggregate_activities(iter_activity_pages(target_chembl_id))
+    best = columns["best"]
+    # Unmeasured molecules sort last; np.lexsort uses the last key as primary
+    order = np.lexsort((-columns["count"], -np.nan_to_num(best, nan=-np.inf)))
+
+    compounds = []
+    for number in order.tolist():
+        compounds.append({
+            "molecule_chembl_id": molecules[number],
+            "molecule_name": names[number] or None,
+            "best_pchembl": None if np.isnan(best[number]) else round(float(best[number]), 2),
+            "median_pchembl": None if np.isnan(columns["median"][number]) else round(float(columns["median"][number]), 2),
+            "activity_count": int(columns["count"][number]),
+            "activity_types": type_lists[number]
+        })
+
+    return {
+        "compounds": compounds,
+        "total_activities": columns["activities"],
+        "truncated": columns["activities"] >= Config.CHEMBL_MAX_ACTIVITIES
+    }
+
+
+def encode_cursor(target_chembl_id, offset):
+    return base64.urlsafe_b64encode(f"{target_chembl_id}:{offset}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, target_chembl_id):
+    """Return the offset a cursor points at, or None if it is malformed or for another target."""
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        target, offset = text.rsplit(":", 1)
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if target != target_chembl_id or offset < 0:
+        return None
+    return offset
+
+
+def prime_compound_table(target_chembl_id, table, fetched_at=None):
+    """Seed the compound table cache, e.g. from a warm-up snapshot, built at fetched_at (default now)."""
+    with _table_lock:
+        _table_cache[target_chembl_id] = (table, (fetched_at or time.time()) + Config.CACHE_EXPIRY)
+
+
+@single_flight("chembl_table", key=str)
+def get_compound_table(target_chembl_id):
+    """Get the ranked compound table for a target, built once per Config.CACHE_EXPIRY."""
+    with _table_lock:
+        entry = _table_cache.get(target_chembl_id)
+    metrics.record_cache("chembl_table", entry is not None)
+    if entry is not None:
+        return entry[0]
+    table = build_compound_table(target_chembl_id)
+    prime_compound_table(target_chembl_id, table)
+    return table
+
+
+def get_drug_table(protein_name, cursor=None, limit=None):
+    """
+    Get one page of the ranked, de-duplicated compound table for a protein.
+
+    Returns the page with a "next_cursor" to pass back for the following
+    page (None on the last one), or a dict with an "error" key.
+    """
+    limit = max(1, min(limit or Config.CHEMBL_TABLE_PAGE_SIZE, Config.CHEMBL_TABLE_MAX_PAGE_SIZE))
+    try:
+        chembl_data = search_chembl(protein_name)
+        
+        if chembl_data.get("error"):
+            return {"error": chembl_data["error"]}
+        
+        if not chembl_data.get("targets"):
+            return {"error": "No target information found in ChEMBL"}
+        
+        target = select_target(chembl_data["targets"])
+        target_chembl_id = target.get("target_chembl_id")
+        
+        if not target_chembl_id:
+            return {"error": "Could not find ChEMBL target ID"}
+        
+        offset = 0
+        if cursor:
+            offset = decode_cursor(cursor, target_chembl_id)
+            if offset is None:
+                return {"error": "Invalid cursor"}
+        
+        table = get_compound_table(target_chembl_id)
+        compounds = table["compounds"]
+        end = offset + limit
+        
+        return {
+            "target_chembl_id": target_chembl_id,
+            "target_name": target.get("pref_name", ""),
+            "target_type": target.get("target_type"),
+            "total_compounds": len(compounds),
+            "total_activities": table["total_activities"],
+            "truncated": table["truncated"],
+            "compounds": compounds[offset:end],
+            "next_cursor": encode_cursor(target_chembl_id, end) if end < len(compounds) else None
+        }
+    except requests.exceptions.RequestException as e:
+        return {"error": f"Error querying ChEMBL API: {str(e)}"}
+    except Exception as e:
+        return {"error": f"Error building compound table: {str(e)}"}
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+import requests
+from config import Config
+from utils import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upstream each host (and port, for local stubs) belongs to
+UPSTREAM_HOSTS = {
+    urlsplit(Config.UNIPROT_BASE_URL).netloc: "uniprot",
+    urlsplit(Config.ALPHAFOLD_BASE_URL).netloc: "alphafold",
+    urlsplit(Config.CHEMBL_BASE_URL).netloc: "chembl"
+}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} is unavailable (circuit open, retrying in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker for one upstream.
+
+    Calls are recorded over a rolling window of Config.CIRCUIT_WINDOW
+    seconds, and calls slower than the upstream's slow-call threshold count
+    as failures. Once the window holds at least Config.CIRCUIT_MIN_CALLS
+    calls and the failure rate reaches Config.CIRCUIT_FAILURE_RATE, the
+    breaker opens and calls fail fast. After Config.CIRCUIT_RESET_TIMEOUT
+    it lets a few probe calls through (half-open); a successful probe
+    closes it again and a failed one reopens it. before_call() hands each
+    probe a token that record() must get back, so calls admitted before
+    the breaker opened cannot close it.
+    """
+
+    def __init__(self, name, slow_call_seconds):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes = 0
+        self.half_open_id = 0
+        self.trips = 0
+        self.rejected = 0
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._calls and now - self._calls[0][0] > Config.CIRCUIT_WINDOW:
+            self._calls.popleft()
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if the call should not go upstream.
+
+        Returns a probe token to pass to record() when the call is a
+        half-open probe, otherwise None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN:
+                retry_in = self.opened_at + Config.CIRCUIT_RESET_TIMEOUT - now
+                if retry_in > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, retry_in)
+                self.state = HALF_OPEN
+                self.probes = 0
+                self.half_open_id += 1
+            if self.state == HALF_OPEN:
+                if self.probes >= Config.CIRCUIT_HALF_OPEN_PROBES:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 0)
+                self.probes += 1
+                return self.half_open_id
+        return None
+
+    def record(self, success, elapsed, probe=None):
+        """Record the outcome of a call made after before_call(), with the probe token it returned."""
+        now = time.monotonic()
+        failed = not success or elapsed > self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                # Only this half-open period's probes decide; older calls are ignored
+                if probe != self.half_open_id:
+                    return
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = CLOSED
+                    self._calls.clear()
+                return
+
+            self._calls.append((now, failed))
+            self._trim(now)
+            if self.state == CLOSED and len(self._calls) >= Config.CIRCUIT_MIN_CALLS:
+                failures = sum(1 for _, f in self._calls if f)
+                if failures / len(self._calls) >= Config.CIRCUIT_FAILURE_RATE:
+                    self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        self.trips += 1
+        self._calls.clear()
+        print(f"Circuit breaker for {self.name} opened")
+
+    def is_open(self):
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < Config.CIRCUIT_RESET_TIMEOUT
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            failures = sum(1 for _, f in self._calls if f)
+            return {
+                "state": self.state,
+                "recent_calls": len(self._calls),
+                "recent_failures": failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "retry_in": round(max(0.0, self.opened_at + Config.CIRCUIT_RESET_TIMEOUT - now), 1) if self.state == OPEN else None
+            }
+
+
+_breakers = {
+    name: CircuitBreaker(name, Config.CIRCUIT_SLOW_CALL_SECONDS[name])
+    for name in ("uniprot", "alphafold", "chembl", "gemini")
+}
+
+
+def get_breaker(name):
+    return _breakers[name]
+
+
+def breaker_for_url(url):
+    """Return the breaker for the upstream serving a URL, or None for other hosts."""
+    name = UPSTREAM_HOSTS.get(urlsplit(url).netloc)
+    return _breakers.get(name)
+
+
+def upstream_for_url(url):
+    """Return the upstream name for a URL, or its host if it is not a known upstream."""
+    host = urlsplit(url).netloc
+    return UPSTREAM_HOSTS.get(host, host)
+
+
+def get_breaker_states():
+    """Return a snapshot of every breaker, keyed by upstream name."""
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
+
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+metrics.register(metrics.Gauge(
+    "aminoverse_circuit_state", "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open).", ["upstream"],
+    lambda: {(name,): STATE_VALUES[breaker.state] for name, breaker in _breakers.items()}
+))
+metrics.register(metrics.Gauge(
+    "aminoverse_circuit_rejected_total", "Calls failed fast by an open circuit breaker.", ["upstream"],
+    lambda: {(name,): breaker.rejected for name, breaker in _breakers.items()}, type="counter"
+))
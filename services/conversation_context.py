@@ -0,0 +1,139 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+from config import Config
+from services.gemini_service import build_conversation_prompt, build_summary_prompt, format_conversation_turns, query_gemini
+from services.protein_resolver import get_cached
+
+# Rolling summaries of older conversation turns. An entry summarizes the
+# first n history messages and is keyed by (conversation ID, hash of those
+# messages), so clients that resend an edited history never get a summary
+# of something else. Summaries cover whole batches of
+# Config.CONVERSATION_SUMMARY_BATCH messages and are built in the
+# background, so a turn never waits on Gemini for one.
+
+_summaries = TTLCache(maxsize=Config.CONVERSATION_SUMMARY_CACHE_SIZE, ttl=Config.CONVERSATION_SUMMARY_TTL)
+_pending = set()
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=Config.CONVERSATION_SUMMARY_WORKERS, thread_name_prefix="summary")
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def _truncate(text, max_chars):
+    text = str(text)
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + " [...]"
+
+
+def _summary_key(conversation_id, history, count):
+    digest = hashlib.sha256("\0".join(str(m) for m in history[:count]).encode("utf-8")).hexdigest()
+    return (conversation_id or "", count, digest)
+
+
+def latest_summary(conversation_id, history, limit):
+    """Return (summary, messages covered) for the longest cached summary of at most limit messages."""
+    batch = Config.CONVERSATION_SUMMARY_BATCH
+    with _lock:
+        for count in range(limit - limit % batch, 0, -batch):
+            summary = _summaries.get(_summary_key(conversation_id, history, count))
+            if summary is not None:
+                return summary, count
+    return None, 0
+
+
+def _summarize(conversation_id, history, count):
+    key = _summary_key(conversation_id, history, count)
+    try:
+        previous, covered = latest_summary(conversation_id, history, count - 1)
+        turns = [_truncate(m, Config.CONVERSATION_MESSAGE_MAX_CHARS) for m in history[covered:count]]
+        summary = query_gemini(build_summary_prompt(previous, format_conversation_turns(turns, start=covered)))
+        if summary:
+            with _lock:
+                _summaries[key] = _truncate(summary.strip(), Config.CONVERSATION_SUMMARY_MAX_CHARS)
+    except Exception as e:
+        print(f"Error summarizing conversation: {e}")
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def schedule_summary(conversation_id, history, count):
+    """Summarize the first count history messages in the background, unless already cached or underway."""
+    key = _summary_key(conversation_id, history, count)
+    with _lock:
+        if key in _pending or key in _summaries:
+            return
+        _pending.add(key)
+    _executor.submit(_summarize, conversation_id, list(history[:count]), count)
+
+
+def protein_facts(protein):
+    """Compact UniProt facts for a protein from the resolver cache, or just its name if it is not cached."""
+    if not protein:
+        return None
+    resolved = get_cached(protein)
+    if not resolved or resolved.get("error"):
+        # A cold instance still tells Gemini which protein the user means
+        return _truncate(protein, 200)
+    record = resolved["entry"]
+    facts = f"{record.display_name()} (UniProt {record.accession}"
+    if record.gene_names:
+        facts += f", gene {', '.join(record.gene_names)}"
+    if record.organism:
+        facts += f", {record.organism}"
+    facts += ")"
+    if record.function:
+        facts += f". Function: {_truncate(record.function, 600)}"
+    return facts
+
+
+def build_context_prompt(messages, conversation_id=None, protein=None):
+    """
+    Build the /conversation prompt within a fixed token budget.
+
+    messages alternate user and assistant turns and end with the current
+    question. The last Config.CONVERSATION_RECENT_MESSAGES history messages
+    are kept verbatim; older ones are replaced by the cached rolling summary
+    and folded into it in the background once a batch has accumulated.
+    Whatever does not fit Config.CONVERSATION_HISTORY_TOKENS is dropped,
+    oldest first. Returns (prompt, stats).
+    """
+    current_query = messages[-1]
+    history = messages[:-1]
+
+    older = max(0, len(history) - Config.CONVERSATION_RECENT_MESSAGES)
+    target = older - older % Config.CONVERSATION_SUMMARY_BATCH
+    summary, covered = latest_summary(conversation_id, history, target)
+    if covered < target:
+        schedule_summary(conversation_id, history, target)
+
+    budget = Config.CONVERSATION_HISTORY_TOKENS - (estimate_tokens(summary) if summary else 0)
+    kept = []
+    for message in reversed(history[covered:]):
+        message = _truncate(message, Config.CONVERSATION_MESSAGE_MAX_CHARS)
+        cost = estimate_tokens(message)
+        if kept and cost > budget:
+            break
+        kept.append(message)
+        budget -= cost
+    kept.reverse()
+    start = len(history) - len(kept)
+
+    prompt = build_conversation_prompt(
+        current_query,
+        format_conversation_turns(kept, start=start),
+        summary=summary,
+        protein_facts=protein_facts(protein)
+    )
+    stats = {
+        "messages": len(messages),
+        "summarized_messages": covered,
+        "verbatim_messages": len(kept),
+        "dropped_messages": start - covered,
+        "prompt_tokens": estimate_tokens(prompt)
+    }
+    return prompt, stats
@@ -1,30 +1,134 @@
-import google.generativeai as genai
 from flask import current_app
 import json
+import threading
+import time
+from config import Config
+from services.circuit_breaker import get_breaker
+from services.llm_cache import get_llm_cache
+from services.protein_index import refine_locally
+from services.single_flight import single_flight, async_single_flight
+from utils import metrics
+
+_model = None
+_model_lock = threading.Lock()
 
-def initialize_gemini():
-    """Initialize the Gemini API with the API key."""
-    try:
-        from config import Config
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        return True
-    except Exception as e:
-        print(f"Error initializing Gemini API: {e}")
-        return False
 
+def get_gemini_model():
+    """Return the process-wide Gemini model, configuring the client on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                # Imported here so cold starts of routes that never call Gemini skip its gRPC/protobuf stack
+                import google.generativeai as genai
+                if Config.GEMINI_BASE_URL:
+                    # Alternative endpoint (e.g. the benchmark stub), spoken to over REST
+                    genai.configure(
+                        api_key=Config.GEMINI_API_KEY,
+                        transport="rest",
+                        client_options={"api_endpoint": Config.GEMINI_BASE_URL}
+                    )
+                else:
+                    genai.configure(api_key=Config.GEMINI_API_KEY)
+                _model = genai.GenerativeModel(Config.GEMINI_MODEL)
+    return _model
+
+@metrics.timed()
+@single_flight("gemini", key=lambda prompt: f"{Config.GEMINI_MODEL}\0{prompt}")
 def query_gemini(prompt):
     """Query Gemini AI with a prompt and return the response."""
+    breaker = get_breaker("gemini")
     try:
-        initialize_gemini()
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
+        model = get_gemini_model()
+        probe = breaker.before_call()
+        started = time.monotonic()
+        try:
+            response = model.generate_content(prompt)
+        except Exception:
+            breaker.record(False, time.monotonic() - started, probe)
+            metrics.record_upstream("gemini", time.monotonic() - started)
+            raise
+        breaker.record(True, time.monotonic() - started, probe)
+        metrics.record_upstream("gemini", time.monotonic() - started, 200, len(response.text.encode("utf-8")))
         return response.text
     except Exception as e:
         print(f"Error querying Gemini API: {e}")
         return None
 
+def cached_query_gemini(prompt):
+    """Query Gemini, reusing a cached response for an identical model and prompt."""
+    cache = get_llm_cache()
+    cached = cache.get(Config.GEMINI_MODEL, prompt)
+    if cached is not None:
+        return cached
+    
+    response = query_gemini(prompt)
+    if response is not None:
+        cache.set(Config.GEMINI_MODEL, prompt, response)
+    return response
+
+@metrics.timed()
+@async_single_flight("gemini_async", key=lambda prompt: f"{Config.GEMINI_MODEL}\0{prompt}")
+async def async_query_gemini(prompt):
+    """Async variant of query_gemini for the ASGI app."""
+    breaker = get_breaker("gemini")
+    try:
+        model = get_gemini_model()
+        probe = breaker.before_call()
+        started = time.monotonic()
+        try:
+            response = await model.generate_content_async(prompt)
+        except Exception:
+            breaker.record(False, time.monotonic() - started, probe)
+            metrics.record_upstream("gemini", time.monotonic() - started)
+            raise
+        breaker.record(True, time.monotonic() - started, probe)
+        metrics.record_upstream("gemini", time.monotonic() - started, 200, len(response.text.encode("utf-8")))
+        return response.text
+    except Exception as e:
+        print(f"Error querying Gemini API: {e}")
+        return None
+
+async def async_cached_query_gemini(prompt):
+    """Async variant of cached_query_gemini, sharing the same cache."""
+    cache = get_llm_cache()
+    cached = cache.get(Config.GEMINI_MODEL, prompt)
+    if cached is not None:
+        return cached
+    
+    response = await async_query_gemini(prompt)
+    if response is not None:
+        cache.set(Config.GEMINI_MODEL, prompt, response)
+    return response
+
+def stream_gemini(prompt):
+    """Query Gemini AI with a prompt and yield the response text as it is generated."""
+    breaker = get_breaker("gemini")
+    model = get_gemini_model()
+    probe = breaker.before_call()
+    started = time.monotonic()
+    try:
+        for chunk in model.generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+    except GeneratorExit:
+        # The client went away mid-stream, which says nothing about Gemini
+        breaker.record(True, time.monotonic() - started, probe)
+        raise
+    except Exception:
+        breaker.record(False, time.monotonic() - started, probe)
+        metrics.record_upstream("gemini", time.monotonic() - started)
+        raise
+    breaker.record(True, time.monotonic() - started, probe)
+    metrics.record_upstream("gemini", time.monotonic() - started, 200)
+
 def refine_protein_query(user_query):
     """Use Gemini to refine and understand a protein query."""
+    # Exact accessions, gene symbols and known names are answered locally
+    local = refine_locally(user_query)
+    if local is not None:
+        return local
+    
     prompt = f"""
     I'm searching for protein information. The user entered: "{user_query}"
     
@@ -37,7 +141,7 @@ def refine_protein_query(user_query):
     Format as JSON with keys: "protein_name", "alternative_names", "uniprot_ids", "description"
     """
     
-    response = query_gemini(prompt)
+    response = cached_query_gemini(prompt)
     
     try:
         return json.loads(response)
@@ -50,9 +154,9 @@ def refine_protein_query(user_query):
             "description": "No description provided."
         }
 
-def generate_protein_analysis(protein_name, uniprot_id):
-    """Generate detailed analysis about a protein using Gemini."""
-    prompt = f"""
+def build_protein_analysis_prompt(protein_name, uniprot_id):
+    """Build the Gemini prompt for a detailed protein analysis."""
+    return f"""
     Provide a detailed analysis of the protein {protein_name} (UniProt ID: {uniprot_id}).
     
     Include:
@@ -64,5 +168,79 @@ def generate_protein_analysis(protein_name, uniprot_id):
     
     Format the response with markdown headers and bullet points. Keep it concise and scientifically accurate.
     """
+
+def generate_protein_analysis(protein_name, uniprot_id):
+    """Generate detailed analysis about a protein using Gemini."""
+    return cached_query_gemini(build_protein_analysis_prompt(protein_name, uniprot_id))
+
+async def async_generate_protein_analysis(protein_name, uniprot_id):
+    """Async variant of generate_protein_analysis for the ASGI app."""
+    return await async_cached_query_gemini(build_protein_analysis_prompt(protein_name, uniprot_id))
+
+def stream_protein_analysis(protein_name, uniprot_id):
+    """Stream a detailed analysis about a protein from Gemini, chunk by chunk."""
+    prompt = build_protein_analysis_prompt(protein_name, uniprot_id)
+    cache = get_llm_cache()
+    cached = cache.get(Config.GEMINI_MODEL, prompt)
+    if cached is not None:
+        yield cached
+        return
+    
+    # Only cache the analysis once the whole stream has arrived
+    chunks = []
+    for text in stream_gemini(prompt):
+        chunks.append(text)
+        yield text
+    cache.set(Config.GEMINI_MODEL, prompt, "".join(chunks))
+
+def format_conversation_turns(messages, start=0):
+    """Format messages as alternating User/Assistant lines; start is the index of the first message."""
+    return "\n".join(f"User: {msg}" if (start + i) % 2 == 0 else f"Assistant: {msg}" for i, msg in enumerate(messages))
+
+def build_conversation_prompt(current_query, conversation_history="", summary=None, protein_facts=None):
+    """Build the Gemini prompt for a conversation from its latest question and the context kept for it."""
+    context = ""
+    if protein_facts:
+        context += f"""
+        Protein the user is exploring: {protein_facts}
+        """
+    if summary:
+        context += f"""
+        Summary of the earlier conversation: {summary}
+        """
+    if conversation_history:
+        context += f"""
+        Previous conversation:
+        {conversation_history}
+        """
     
-    return query_gemini(prompt)
\ No newline at end of file
+    if context:
+        return f"""
+        I am an AI assistant specializing in protein biology. 
+        {context}
+        User's latest question: {current_query}
+        
+        Provide a helpful, scientifically accurate response about this protein or biology question.
+        """
+    
+    return f"""
+        I am an AI assistant specializing in protein biology. 
+        
+        User's question: {current_query}
+        
+        Provide a helpful, scientifically accurate response about this protein or biology question.
+        """
+
+def build_summary_prompt(previous_summary, turns):
+    """Build the Gemini prompt that folds older conversation turns into a rolling summary."""
+    previous = f"""
+    Summary so far: {previous_summary}
+    """ if previous_summary else ""
+    return f"""
+    Summarize this conversation between a user and a protein biology assistant for use as context in later turns.
+    {previous}
+    New turns:
+    {turns}
+    
+    Write one compact paragraph that keeps the proteins, genes, diseases, drugs and open questions discussed. Do not add new information.
+    """
@@ -0,0 +1,222 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+from services.circuit_breaker import CircuitOpenError, breaker_for_url, upstream_for_url
+from utils import metrics
+
+# One keep-alive session per upstream host, created on first use
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# Optional pacing per upstream name, e.g. by the warm-up job
+_rate_limiters = {}
+
+
+class JitteredRetry(Retry):
+    """urllib3 Retry with full jitter on backoff and a cap on Retry-After."""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return random.uniform(0, backoff)
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, Config.HTTP_RETRY_AFTER_MAX)
+
+
+def _build_session():
+    """Create a session with a pooled adapter and retry policy from Config."""
+    retry = JitteredRetry(
+        total=Config.HTTP_MAX_RETRIES,
+        backoff_factor=Config.HTTP_BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False  # Let callers see the final response and raise_for_status()
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url):
+    """Return the shared session for the host of the given URL."""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _build_session()
+                _sessions[key] = session
+    return session
+
+
+def set_rate_limiters(limiters):
+    """
+    Pace requests to upstreams by name ("uniprot", "alphafold", "chembl").
+
+    Each limiter's acquire() is called before every request to its upstream
+    made through get(); pass {} to stop pacing.
+    """
+    global _rate_limiters
+    _rate_limiters = dict(limiters)
+
+
+def get(url, params=None, **kwargs):
+    """
+    GET a URL through the pooled session for its host.
+
+    Applies the default (connect, read) timeout from Config unless one is
+    given. Raises the same requests exceptions as requests.get, including
+    CircuitOpenError when the upstream's circuit breaker is open.
+    """
+    kwargs.setdefault("timeout", (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT))
+    # Pace before taking a half-open probe slot, so the slot is always given back in the finally below
+    limiter = _rate_limiters.get(upstream_for_url(url))
+    if limiter is not None:
+        limiter.acquire()
+    breaker = breaker_for_url(url)
+    probe = breaker.before_call() if breaker is not None else None
+
+    started = time.monotonic()
+    response = None
+    try:
+        response = get_session(url).get(url, params=params, **kwargs)
+        return response
+    finally:
+        _record_call(url, breaker, probe, response, time.monotonic() - started)
+
+
+def _record_call(url, breaker, probe, response, elapsed):
+    """Feed the outcome of one upstream call to its circuit breaker and the metrics."""
+    status = response.status_code if response is not None else None
+    if breaker is not None:
+        breaker.record(status is not None and not is_upstream_failure(status), elapsed, probe)
+    metrics.record_upstream(upstream_for_url(url), elapsed, status, len(response.content) if response is not None else None)
+
+
+def is_upstream_failure(status_code):
+    """Count rate limiting and server errors against an upstream; 4xx answers are healthy."""
+    return status_code == 429 or status_code >= 500
+
+
+def is_outage_error(error):
+    """
+    Check whether a requests or httpx error means the upstream itself is down.
+
+    Callers use this to skip fallback queries against the same upstream,
+    which would only wait out the same outage again.
+    """
+    if isinstance(error, (CircuitOpenError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    if response is not None:
+        return is_upstream_failure(response.status_code)
+    # httpx transport errors (connect, read, timeout) carry no response
+    return type(error).__module__.startswith("httpx")
+
+
+def close_sessions():
+    """Close every pooled session and its connections."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+# Async client for the ASGI app (asgi.py); httpx is only imported when it is used
+_async_client = None
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def get_async_client():
+    """Return the shared httpx.AsyncClient, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        import httpx
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(Config.HTTP_READ_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=Config.ASYNC_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.HTTP_POOL_MAXSIZE
+            ),
+            follow_redirects=True
+        )
+    return _async_client
+
+
+def _async_retry_delay(attempt, response):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), Config.HTTP_RETRY_AFTER_MAX)
+    return random.uniform(0, Config.HTTP_BACKOFF_FACTOR * (2 ** attempt))
+
+
+async def async_get(url, params=None, **kwargs):
+    """
+    GET a URL through the shared async client.
+
+    Retries connection errors and 429/5xx responses like the sync get(), with
+    the same jittered backoff and Retry-After cap. Raises httpx exceptions.
+    """
+    import httpx
+    breaker = breaker_for_url(url)
+    probe = None
+    if breaker is not None:
+        try:
+            probe = breaker.before_call()
+        except CircuitOpenError as e:
+            # Async callers handle httpx errors, so fail fast with one of those
+            raise httpx.ConnectError(str(e))
+
+    started = time.monotonic()
+    response = None
+    try:
+        response = await _async_get_with_retries(url, params, kwargs)
+        return response
+    finally:
+        _record_call(url, breaker, probe, response, time.monotonic() - started)
+
+
+async def _async_get_with_retries(url, params, kwargs):
+    import asyncio
+    import httpx
+    client = get_async_client()
+    for attempt in range(Config.HTTP_MAX_RETRIES + 1):
+        last_attempt = attempt == Config.HTTP_MAX_RETRIES
+        try:
+            response = await client.get(url, params=params, **kwargs)
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+            await asyncio.sleep(_async_retry_delay(attempt, None))
+            continue
+        if response.status_code not in RETRY_STATUSES or last_attempt:
+            return response
+        await asyncio.sleep(_async_retry_delay(attempt, response))
+
+
+async def close_async_client():
+    """Close the shared async client and its connections."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from config import Config
+from services.protein_resolver import resolve_protein, async_resolve_protein
+from services.uniprot_service import get_protein_function, async_get_protein_function
+from services.alphafold_service import get_structure_data, async_get_structure_data
+from services.chembl_service import get_drug_associations, async_get_drug_associations
+from services.gemini_service import generate_protein_analysis, async_generate_protein_analysis
+from utils.response_formatter import format_protein_response
+
+# Shared, bounded pool so concurrent /full requests cannot spawn unlimited threads
+_executor = ThreadPoolExecutor(max_workers=Config.AGGREGATE_MAX_WORKERS, thread_name_prefix="aggregate")
+
+
+def _fetch_analysis(protein_name, uniprot_id):
+    """Wrap the Gemini analysis text in a dict like the other sources."""
+    analysis = generate_protein_analysis(protein_name, uniprot_id)
+    if analysis is None:
+        return {"error": "Gemini did not return an analysis"}
+    return {"text": analysis}
+
+
+async def _async_fetch_analysis(protein_name, uniprot_id):
+    analysis = await async_generate_protein_analysis(protein_name, uniprot_id)
+    if analysis is None:
+        return {"error": "Gemini did not return an analysis"}
+    return {"text": analysis}
+
+
+def get_full_protein_data(protein_name):
+    """
+    Fetch function, structure, drug and analysis data for a protein in one call.
+
+    The UniProt accession is resolved once, then AlphaFold, ChEMBL and Gemini
+    are queried in parallel. Each source has its own deadline from
+    Config.AGGREGATE_TIMEOUTS; a source that fails or runs late is reported in
+    "errors" and the rest of the document is still returned.
+    """
+    resolved = resolve_protein(protein_name)
+
+    if resolved.get("error"):
+        return {"protein": protein_name, "error": "Could not find protein in UniProt"}
+
+    uniprot_id = resolved["accession"]
+    full_name = resolved["entry"].protein_name or protein_name
+
+    started = time.monotonic()
+    futures = {
+        "structure": _executor.submit(get_structure_data, uniprot_id),
+        "drugs": _executor.submit(get_drug_associations, protein_name),
+        "analysis": _executor.submit(_fetch_analysis, full_name, uniprot_id)
+    }
+
+    # Already cached by resolve_protein, so this does not hit UniProt again
+    function_data = get_protein_function(protein_name)
+
+    results = {}
+    errors = {}
+    for source, future in futures.items():
+        deadline = started + Config.AGGREGATE_TIMEOUTS[source]
+        try:
+            results[source] = future.result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            # The worker keeps running in the background; we just stop waiting for it
+            results[source] = {"error": f"Timed out after {Config.AGGREGATE_TIMEOUTS[source]:g}s"}
+        except Exception as e:
+            results[source] = {"error": f"Unexpected error fetching {source} data: {str(e)}"}
+
+        if isinstance(results[source], dict) and results[source].get("error"):
+            errors[source] = results[source]["error"]
+
+    if function_data.get("error"):
+        errors["function"] = function_data["error"]
+
+    response = format_protein_response(
+        protein_name,
+        function_data=function_data,
+        structure_data=results["structure"],
+        drug_data=results["drugs"],
+        analysis_data=results["analysis"]
+    )
+    response["uniprot_id"] = uniprot_id
+    response["errors"] = errors
+
+    return response
+
+
+async def _with_deadline(source, coroutine):
+    """Await one source within its Config.AGGREGATE_TIMEOUTS deadline, turning failures into an error dict."""
+    try:
+        return await asyncio.wait_for(coroutine, Config.AGGREGATE_TIMEOUTS[source])
+    except asyncio.TimeoutError:
+        return {"error": f"Timed out after {Config.AGGREGATE_TIMEOUTS[source]:g}s"}
+    except Exception as e:
+        return {"error": f"Unexpected error fetching {source} data: {str(e)}"}
+
+
+async def async_get_full_protein_data(protein_name):
+    """Async variant of get_full_protein_data: awaits AlphaFold, ChEMBL and Gemini concurrently."""
+    resolved = await async_resolve_protein(protein_name)
+
+    if resolved.get("error"):
+        return {"protein": protein_name, "error": "Could not find protein in UniProt"}
+
+    uniprot_id = resolved["accession"]
+    full_name = resolved["entry"].protein_name or protein_name
+
+    structure_data, drug_data, analysis_data, function_data = await asyncio.gather(
+        _with_deadline("structure", async_get_structure_data(uniprot_id)),
+        _with_deadline("drugs", async_get_drug_associations(protein_name)),
+        _with_deadline("analysis", _async_fetch_analysis(full_name, uniprot_id)),
+        async_get_protein_function(protein_name)
+    )
+
+    errors = {}
+    for source, data in (("structure", structure_data), ("drugs", drug_data), ("analysis", analysis_data), ("function", function_data)):
+        if isinstance(data, dict) and data.get("error"):
+            errors[source] = data["error"]
+
+    response = format_protein_response(
+        protein_name,
+        function_data=function_data,
+        structure_data=structure_data,
+        drug_data=drug_data,
+        analysis_data=analysis_data
+    )
+    response["uniprot_id"] = uniprot_id
+    response["errors"] = errors
+
+    return response
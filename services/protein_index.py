@@ -0,0 +1,364 @@
+"""
+Local index of human UniProt accessions, gene symbols and protein names.
+
+The index is built offline from a UniProt TSV download, for example:
+
+    https://rest.uniprot.org/uniprotkb/stream?format=tsv&query=organism_id:9606
+        &fields=accession,id,gene_names,protein_name,annotation_score
+
+and written to a single binary file that is memory-mapped at runtime:
+
+    python -m services.protein_index uniprot_human.tsv data/protein_index.bin
+
+File layout (little-endian):
+
+    header        8-byte magic, u32 entry count, u32 key count
+    entry offsets (entry count + 1) x u32 into the entry blob
+    key offsets   (key count + 1) x u32 into the key blob
+    key targets   key count x u32, entry number | key kind << 28
+    entry blob    UTF-8 rows: accession, entry name, genes, protein name,
+                  alternative names, annotation score (tab separated)
+    key blob      normalized keys, sorted bytewise
+
+Lookups binary-search the key blob in place, so loading costs one mmap and
+no parsing.
+"""
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from config import Config
+from utils.query import normalize_query
+
+MAGIC = b"AVPIDX1\0"
+HEADER = struct.Struct("<8sII")
+
+# Key kinds, in order of preference when several entries share a key
+KIND_ACCESSION = 0
+KIND_ENTRY_NAME = 1
+KIND_GENE = 2
+KIND_GENE_SYNONYM = 3
+KIND_PROTEIN_NAME = 4
+KIND_ALT_NAME = 5
+
+KIND_SHIFT = 28
+ENTRY_MASK = (1 << KIND_SHIFT) - 1
+
+ACCESSION_RE = re.compile(r"^([OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9]([A-Z][A-Z0-9]{2}[0-9]){1,2})(-\d+)?$")
+# "(EC 3.4.21.-)" groups in UniProt protein names are enzyme classes, not names
+EC_NUMBER_RE = re.compile(r"^(EC\s*)?\d+\.[\d-]+\.[\d-]+\.(n?\d+|-)$", re.IGNORECASE)
+
+
+def is_accession(query):
+    """Check whether a query looks like a UniProt accession (optionally with isoform)."""
+    return bool(ACCESSION_RE.match(normalize_query(query)))
+
+
+def _u32_array(buffer):
+    values = array("I")
+    values.frombytes(buffer)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class ProteinEntry:
+    """One protein row from the index."""
+
+    __slots__ = ("accession", "entry_name", "genes", "protein_name", "alternative_names", "score")
+
+    def __init__(self, accession, entry_name, genes, protein_name, alternative_names, score):
+        self.accession = accession
+        self.entry_name = entry_name
+        self.genes = genes
+        self.protein_name = protein_name
+        self.alternative_names = alternative_names
+        self.score = score
+
+    @classmethod
+    def from_row(cls, row):
+        accession, entry_name, genes, protein_name, alternative_names, score = row.split("\t")
+        return cls(
+            accession,
+            entry_name,
+            genes.split(" ") if genes else [],
+            protein_name,
+            alternative_names.split("|") if alternative_names else [],
+            float(score or 0)
+        )
+
+    def to_row(self):
+        return "\t".join([
+            self.accession,
+            self.entry_name,
+            " ".join(self.genes),
+            self.protein_name,
+            "|".join(self.alternative_names),
+            f"{self.score:g}"
+        ])
+
+    def keys(self):
+        """Yield (normalized key, kind) pairs this entry should be found under."""
+        yield normalize_query(self.accession), KIND_ACCESSION
+        if self.entry_name:
+            yield normalize_query(self.entry_name), KIND_ENTRY_NAME
+        for i, gene in enumerate(self.genes):
+            yield normalize_query(gene), KIND_GENE if i == 0 else KIND_GENE_SYNONYM
+        if self.protein_name:
+            yield normalize_query(self.protein_name), KIND_PROTEIN_NAME
+        for name in self.alternative_names:
+            yield normalize_query(name), KIND_ALT_NAME
+
+
+class ProteinIndex:
+    """Read-only, memory-mapped view of a protein index file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.entry_count, self.key_count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a protein index file")
+
+        pos = HEADER.size
+        self._entry_offsets = _u32_array(self._mm[pos:pos + 4 * (self.entry_count + 1)])
+        pos += 4 * (self.entry_count + 1)
+        self._key_offsets = _u32_array(self._mm[pos:pos + 4 * (self.key_count + 1)])
+        pos += 4 * (self.key_count + 1)
+        self._key_targets = _u32_array(self._mm[pos:pos + 4 * self.key_count])
+        pos += 4 * self.key_count
+        self._entry_base = pos
+        self._key_base = pos + self._entry_offsets[-1]
+
+    def __len__(self):
+        return self.entry_count
+
+    def key_at(self, i):
+        """Return the i-th sorted key as bytes."""
+        start = self._key_base + self._key_offsets[i]
+        return self._mm[start:self._key_base + self._key_offsets[i + 1]]
+
+    def entry_at(self, i):
+        """Return the i-th entry as a ProteinEntry."""
+        start = self._entry_base + self._entry_offsets[i]
+        row = self._mm[start:self._entry_base + self._entry_offsets[i + 1]]
+        return ProteinEntry.from_row(row.decode("utf-8"))
+
+    def target_at(self, i):
+        """Return (entry number, key kind) for the i-th sorted key."""
+        target = self._key_targets[i]
+        return target & ENTRY_MASK, target >> KIND_SHIFT
+
+    def lower_bound(self, key):
+        """Return the position of the first sorted key >= key (bytes)."""
+        lo, hi = 0, self.key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def entries(self):
+        """Iterate over every entry in file order."""
+        for i in range(self.entry_count):
+            yield self.entry_at(i)
+
+    def lookup(self, query):
+        """
+        Find the best entry for an exact accession, gene symbol or name.
+
+        Returns a ProteinEntry, or None if the normalized query is not a key.
+        Accessions win over gene symbols, which win over names; ties go to
+        the entry with the higher UniProt annotation score.
+        """
+        key = normalize_query(query).encode("utf-8")
+        if not key:
+            return None
+
+        # Isoform accessions (P04637-2) resolve to their canonical entry
+        if ACCESSION_RE.match(key.decode("utf-8")) and b"-" in key:
+            key = key.split(b"-", 1)[0]
+
+        best = None
+        i = self.lower_bound(key)
+        while i < self.key_count and self.key_at(i) == key:
+            entry_number, kind = self.target_at(i)
+            entry = self.entry_at(entry_number)
+            rank = (kind, -entry.score)
+            if best is None or rank < best[0]:
+                best = (rank, entry)
+            i += 1
+
+        return best[1] if best else None
+
+    def close(self):
+        self._mm.close()
+
+
+def split_protein_names(text):
+    """
+    Split a UniProt "Protein names" value into (recommended name, alternatives).
+
+    "Cellular tumor antigen p53 (Antigen NY-CO-13) (Phosphoprotein p53)"
+    becomes ("Cellular tumor antigen p53", ["Antigen NY-CO-13", "Phosphoprotein p53"]).
+    Bracketed "[Cleaved into: ...]" and "[Includes: ...]" sections and EC
+    numbers such as "(EC 2.7.11.1)" are dropped.
+    """
+    text = re.sub(r"\s*\[(Cleaved into|Includes):.*$", "", text or "")
+    groups = []
+    depth = 0
+    start = None
+    first_group = None
+    for i, char in enumerate(text):
+        if char == "(":
+            if depth == 0:
+                # "(" inside a word, e.g. "Na(+)", is part of the name
+                if i > 0 and text[i - 1] != " ":
+                    depth += 1
+                    continue
+                start = i + 1
+                if first_group is None:
+                    first_group = i
+            depth += 1
+        elif char == ")" and depth > 0:
+            depth -= 1
+            if depth == 0 and start is not None:
+                groups.append(text[start:i].strip())
+                start = None
+
+    recommended = text[:first_group].strip() if first_group is not None else text.strip()
+    return recommended, [g for g in groups if g and not EC_NUMBER_RE.match(g)]
+
+
+def build_index(tsv_path, out_path):
+    """Build an index file from a UniProt TSV download. Returns the entry count."""
+    entries = []
+    with open(tsv_path, encoding="utf-8") as f:
+        columns = f.readline().rstrip("\n").split("\t")
+        col = {name: i for i, name in enumerate(columns)}
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if not fields or not fields[0]:
+                continue
+
+            def field(name):
+                i = col.get(name)
+                return fields[i].strip() if i is not None and i < len(fields) else ""
+
+            protein_name, alternative_names = split_protein_names(field("Protein names"))
+            score_match = re.match(r"[\d.]+", field("Annotation"))
+            entries.append(ProteinEntry(
+                field("Entry"),
+                field("Entry Name"),
+                field("Gene Names").replace(";", " ").split(),
+                protein_name.replace("|", "/"),
+                [name.replace("|", "/") for name in alternative_names],
+                float(score_match.group(0)) if score_match else 0.0
+            ))
+
+    entry_blob = bytearray()
+    entry_offsets = array("I", [0])
+    keys = []
+    for number, entry in enumerate(entries):
+        entry_blob += entry.to_row().encode("utf-8")
+        entry_offsets.append(len(entry_blob))
+        for key, kind in set(entry.keys()):
+            if key:
+                keys.append((key.encode("utf-8"), (kind << KIND_SHIFT) | number))
+    keys.sort()
+
+    key_blob = bytearray()
+    key_offsets = array("I", [0])
+    key_targets = array("I")
+    for key, target in keys:
+        key_blob += key
+        key_offsets.append(len(key_blob))
+        key_targets.append(target)
+
+    if sys.byteorder == "big":
+        for values in (entry_offsets, key_offsets, key_targets):
+            values.byteswap()
+
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(entries), len(keys)))
+        f.write(entry_offsets.tobytes())
+        f.write(key_offsets.tobytes())
+        f.write(key_targets.tobytes())
+        f.write(entry_blob)
+        f.write(key_blob)
+    os.replace(tmp_path, out_path)
+
+    return len(entries)
+
+
+_index = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def get_protein_index():
+    """Return the process-wide index from Config.PROTEIN_INDEX_PATH, or None if there is none."""
+    global _index, _index_loaded
+    if not _index_loaded:
+        with _index_lock:
+            if not _index_loaded:
+                path = Config.PROTEIN_INDEX_PATH
+                if path and os.path.exists(path):
+                    try:
+                        _index = ProteinIndex(path)
+                    except (OSError, ValueError) as e:
+                        print(f"Error loading protein index {path}: {e}")
+                _index_loaded = True
+    return _index
+
+
+def refine_locally(user_query):
+    """
+    Answer a refine-query request from the local index without calling Gemini.
+
+    Returns a dict in the same shape as gemini_service.refine_protein_query,
+    or None if the query is free text the index cannot resolve.
+    """
+    index = get_protein_index()
+    entry = index.lookup(user_query) if index is not None else None
+
+    if entry is not None:
+        return {
+            "protein_name": entry.genes[0] if entry.genes else entry.protein_name,
+            "alternative_names": [name for name in [entry.protein_name] + entry.genes[1:] + entry.alternative_names if name],
+            "uniprot_ids": [entry.accession],
+            "description": entry.protein_name or "No description provided.",
+            "source": "local_index"
+        }
+
+    # An exact accession needs no interpretation even if the index lacks it
+    if is_accession(user_query):
+        accession = normalize_query(user_query)
+        return {
+            "protein_name": accession,
+            "alternative_names": [],
+            "uniprot_ids": [accession],
+            "description": "No description provided.",
+            "source": "accession"
+        }
+
+    return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m services.protein_index <uniprot.tsv> <output.bin>")
+        sys.exit(1)
+    count = build_index(sys.argv[1], sys.argv[2])
+    print(f"Wrote {count} entries to {sys.argv[2]}")
@@ -0,0 +1,149 @@
+import threading
+import time
+from cachetools import LRUCache, TLRUCache
+from config import Config
+from models.uniprot_record import UniProtRecord
+from services.uniprot_service import search_uniprot, search_uniprot_batch, async_search_uniprot
+from utils import metrics
+from utils.query import normalize_query
+
+# Resolved queries, keyed by normalized query string, as (resolution, expiry
+# time) so primed entries expire relative to when they were fetched. Single
+# lookups are only kept for Config.RESOLVER_CACHE_TTL: the UniProt search
+# cache behind them holds the response and revalidates it once stale, and a
+# longer TTL here would keep serving the old resolution past that.
+_cache = TLRUCache(maxsize=Config.RESOLVER_CACHE_SIZE, ttu=lambda _key, entry, now: entry[1], timer=time.time)
+# Every resolution ever made, kept past expiry to answer while UniProt is down
+_stale = LRUCache(maxsize=Config.RESOLVER_STALE_SIZE)
+_lock = threading.Lock()
+
+
+def resolve_protein(query):
+    """
+    Resolve a protein name or accession to its UniProt accession and entry.
+
+    Returns a dict with "query", "accession" and "entry" (a UniProtRecord)
+    keys, or a dict with an "error" key if the protein could not be found. Successful lookups are
+    cached briefly so every endpoint of a request reuses them; the UniProt
+    search cache keeps them for longer.
+    """
+    key = normalize_query(query)
+
+    cached = _cached(key)
+    metrics.record_cache("resolver", cached is not None)
+    if cached is not None:
+        return cached
+
+    uniprot_data = search_uniprot(query)
+
+    if uniprot_data.get("error"):
+        return _stale_or_error(key, uniprot_data["error"])
+
+    if not uniprot_data.get("results"):
+        return {"error": "No protein information found"}
+
+    return _store(key, UniProtRecord.from_json(uniprot_data["results"][0]), Config.RESOLVER_CACHE_TTL)
+
+
+async def async_resolve_protein(query):
+    """Async variant of resolve_protein for the ASGI app; shares the same cache."""
+    key = normalize_query(query)
+
+    cached = _cached(key)
+    metrics.record_cache("resolver", cached is not None)
+    if cached is not None:
+        return cached
+
+    uniprot_data = await async_search_uniprot(query)
+
+    if uniprot_data.get("error"):
+        return _stale_or_error(key, uniprot_data["error"])
+
+    if not uniprot_data.get("results"):
+        return {"error": "No protein information found"}
+
+    return _store(key, UniProtRecord.from_json(uniprot_data["results"][0]), Config.RESOLVER_CACHE_TTL)
+
+
+def _cached(key):
+    with _lock:
+        entry = _cache.get(key)
+    return entry[0] if entry is not None else None
+
+
+def _store(key, record, ttl, fetched_at=None):
+    accession = record.accession
+
+    if not accession:
+        return {"error": "Could not determine UniProt ID"}
+
+    resolved = {
+        "query": key,
+        "accession": accession,
+        "entry": record
+    }
+
+    with _lock:
+        # Entries already past their expiry are skipped by the cache and only kept for outages
+        _cache[key] = (resolved, (fetched_at or time.time()) + ttl)
+        _stale[key] = resolved
+
+    return resolved
+
+
+def _stale_or_error(key, error):
+    """Fall back to an expired resolution when UniProt fails, marked with "stale": True."""
+    with _lock:
+        stale = _stale.get(key)
+    if stale is None:
+        return {"error": error}
+    print(f"UniProt unavailable, serving stale resolution for {key}")
+    return dict(stale, stale=True)
+
+
+def resolve_proteins(queries):
+    """
+    Resolve many queries at once, returning a dict of query -> resolve_protein result.
+
+    Cached queries are answered directly and the rest go to UniProt in
+    grouped requests. Queries the grouped lookup cannot answer (free-text
+    names, for instance) are not resolved here; callers fall back to
+    resolve_protein for them.
+    """
+    results = {}
+    missing = []
+    for query in queries:
+        cached = _cached(normalize_query(query))
+        if cached is not None:
+            results[query] = cached
+        else:
+            missing.append(query)
+
+    if missing:
+        # Grouped lookups are not in the search cache, so they are kept here for the full expiry
+        for query, record in search_uniprot_batch(missing).items():
+            results[query] = _store(normalize_query(query), record, Config.CACHE_EXPIRY)
+
+    return results
+
+
+def get_cached(query):
+    """Return the cached (or expired but kept) resolution for a query without calling UniProt, or None."""
+    key = normalize_query(query)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+    with _lock:
+        return _stale.get(key)
+
+
+def prime(query, record, fetched_at=None):
+    """Seed the cache with a known resolution, e.g. from a warm-up snapshot, fetched at fetched_at (default now)."""
+    return _store(normalize_query(query), record, Config.CACHE_EXPIRY, fetched_at)
+
+
+def clear_cache():
+    """Drop every cached resolution."""
+    with _lock:
+        _cache.clear()
+        _stale.clear()
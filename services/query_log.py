@@ -0,0 +1,52 @@
+import os
+import threading
+import time
+from collections import Counter
+from config import Config
+from utils.query import normalize_query
+
+# Append-only log of protein queries the API answered, so the warm-up job
+# can precompute the most popular ones. Lines are "<unix time>\t<query>".
+
+_lock = threading.Lock()
+_disabled = False
+
+
+def record_query(query):
+    """Append a served protein query to Config.QUERY_LOG_PATH; failures disable the log."""
+    global _disabled
+    path = Config.QUERY_LOG_PATH
+    query = normalize_query(query)
+    if not path or _disabled or not query:
+        return
+    line = f"{time.time():.0f}\t{query}\n"
+    with _lock:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            # Read-only filesystems (e.g. serverless) just run without a log
+            print(f"Error writing query log, disabling it: {e}")
+            _disabled = True
+
+
+def top_queries(n, path=None, since=None):
+    """Return the n most frequent queries in the log, optionally only those logged after the unix time since."""
+    path = path or Config.QUERY_LOG_PATH
+    counts = Counter()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                timestamp, _, query = line.rstrip("\n").partition("\t")
+                if not query:
+                    continue
+                if since is not None and (not timestamp.isdigit() or int(timestamp) < since):
+                    continue
+                counts[query] += 1
+    except OSError as e:
+        print(f"Error reading query log {path}: {e}")
+        return []
+    return [query for query, _ in counts.most_common(n)]
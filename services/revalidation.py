@@ -0,0 +1,156 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import LRUCache
+from config import Config
+from utils import metrics
+
+# Stale-while-revalidate for cached upstream responses. An entry is fresh
+# for its TTL; for Config.REVALIDATE_MAX_STALE seconds after that it is
+# still served, while a background conditional GET (If-None-Match /
+# If-Modified-Since with the upstream's ETag and Last-Modified) checks
+# whether it changed. Only entries older than that make a request wait on
+# the upstream.
+
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+# Returned by a loader when the upstream answered 304 Not Modified
+NOT_MODIFIED = object()
+
+_pending = set()
+_pending_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=Config.REVALIDATE_WORKERS, thread_name_prefix="revalidate")
+
+
+def get_validators(headers):
+    """The ETag and Last-Modified of an upstream response, as a dict with the headers it had."""
+    validators = {}
+    if headers.get("ETag"):
+        validators["etag"] = headers["ETag"]
+    if headers.get("Last-Modified"):
+        validators["last_modified"] = headers["Last-Modified"]
+    return validators
+
+
+def conditional_headers(validators):
+    """Request headers that turn a GET into a conditional one, given stored validators."""
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def freshness(fetched_at, ttl):
+    """FRESH within ttl of fetched_at, STALE for Config.REVALIDATE_MAX_STALE more seconds, then EXPIRED."""
+    age = time.time() - fetched_at
+    if age <= ttl:
+        return FRESH
+    if age <= ttl + Config.REVALIDATE_MAX_STALE:
+        return STALE
+    return EXPIRED
+
+
+def revalidate_in_background(cache_name, key, refresh):
+    """Run refresh() on the revalidation pool unless one is already underway for (cache_name, key)."""
+    pending_key = (cache_name, key)
+    with _pending_lock:
+        if pending_key in _pending:
+            return False
+        _pending.add(pending_key)
+
+    def run():
+        try:
+            result = refresh()
+            metrics.record_revalidation(cache_name, result)
+        except Exception as e:
+            print(f"Error revalidating {cache_name} entry {key}: {e}")
+            metrics.record_revalidation(cache_name, "error")
+        finally:
+            with _pending_lock:
+                _pending.discard(pending_key)
+
+    _executor.submit(run)
+    return True
+
+
+class RevalidatingCache:
+    """
+    In-memory stale-while-revalidate cache of upstream responses.
+
+    Values are loaded by a function taking the stored validators (None when
+    there is no entry) and returning NOT_MODIFIED, a (value, validators)
+    pair, or a value with an "error" key, which is returned but not cached.
+    """
+
+    def __init__(self, name, maxsize, ttl):
+        self.name = name
+        self.ttl = ttl
+        self._entries = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """Return (value, validators, state) for key, or (None, None, None) if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None, None, None
+        value, validators, fetched_at = entry
+        return value, validators, freshness(fetched_at, self.ttl)
+
+    def store(self, key, value, validators=None, fetched_at=None):
+        with self._lock:
+            self._entries[key] = (value, validators or {}, fetched_at or time.time())
+        return value
+
+    def _apply(self, key, result, previous):
+        """Store a loader's result; returns the value to serve and how the entry changed."""
+        if result is NOT_MODIFIED and previous is not None:
+            self.store(key, previous[0], previous[1])
+            return previous[0], "not_modified"
+        if isinstance(result, tuple):
+            return self.store(key, *result), "changed"
+        return result, "error"
+
+    def _serve_cached(self, key, load):
+        """
+        Look up key, revalidating it in the background with load if stale.
+
+        Returns (value, None) when the cached value can be served, otherwise
+        (None, previous) with previous the expired (value, validators), if any.
+        """
+        value, validators, state = self.lookup(key)
+        metrics.record_cache(self.name, state in (FRESH, STALE))
+        if state == FRESH:
+            return value, None
+        if state == STALE:
+            def refresh():
+                return self._apply(key, load(validators), (value, validators))[1]
+            revalidate_in_background(self.name, key, refresh)
+            return value, None
+        return None, (value, validators) if state == EXPIRED else None
+
+    def get(self, key, load):
+        """
+        Return the value for key: cached if fresh, cached and revalidated in
+        the background if stale, otherwise loaded (conditionally, when an
+        expired entry is still held) before returning.
+        """
+        value, previous = self._serve_cached(key, load)
+        if value is not None:
+            return value
+        return self._apply(key, load(previous[1] if previous else None), previous)[0]
+
+    async def async_get(self, key, async_load, load):
+        """Async variant of get; expired entries are loaded with async_load, stale ones revalidated with load."""
+        value, previous = self._serve_cached(key, load)
+        if value is not None:
+            return value
+        return self._apply(key, await async_load(previous[1] if previous else None), previous)[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+import uuid
+from cachetools import TTLCache
+from config import Config
+from utils import db
+
+# Conversation histories kept server-side so /conversation clients send
+# only a session ID and their new message. A session's history is a list
+# of messages alternating user and assistant, always ending on an
+# assistant reply.
+
+
+def _history_size(messages):
+    return sum(len(m) for m in messages) + 64
+
+
+def _trim(messages):
+    """Drop the oldest user/assistant pairs beyond Config.SESSION_MAX_MESSAGES."""
+    excess = len(messages) - Config.SESSION_MAX_MESSAGES
+    if excess > 0:
+        messages = messages[excess + excess % 2:]
+    return messages
+
+
+class MemoryBackend:
+    """In-process store; sessions expire ttl seconds after their last turn and the least recently used go past max_bytes."""
+
+    def __init__(self, max_bytes, ttl):
+        self._sessions = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=_history_size)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            messages = self._sessions.get(session_id)
+        return list(messages) if messages is not None else None
+
+    def append(self, session_id, new_messages):
+        with self._lock:
+            messages = _trim(list(self._sessions.get(session_id) or []) + list(new_messages))
+            # Re-inserting restarts the idle timer
+            self._sessions.pop(session_id, None)
+            if _history_size(messages) <= self._sessions.maxsize:
+                self._sessions[session_id] = messages
+        return len(messages)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+class SQLiteBackend:
+    """On-disk store shared by every worker process, with the same idle expiry and size cap."""
+
+    def __init__(self, path, max_bytes, ttl):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, messages TEXT NOT NULL, "
+                "size INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)")
+
+    def _connect(self):
+        return db.connect(self.path)
+
+    def get(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT messages FROM sessions WHERE session_id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def append(self, session_id, new_messages):
+        now = time.time()
+        with self._connect() as conn:
+            # IMMEDIATE takes the write lock up front so concurrent turns cannot lose each other's messages
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT messages FROM sessions WHERE session_id = ? AND updated_at >= ?",
+                (session_id, now - self.ttl)
+            ).fetchone()
+            messages = _trim((json.loads(row[0]) if row else []) + list(new_messages))
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, messages, size, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(messages), _history_size(messages), now)
+            )
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                "SELECT session_id FROM (SELECT session_id, SUM(size) OVER (ORDER BY updated_at DESC) AS total "
+                "FROM sessions) WHERE total > ?)",
+                (self.max_bytes,)
+            )
+        return len(messages)
+
+    def delete(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE updated_at >= ?", (time.time() - self.ttl,)
+            ).fetchone()[0]
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Return the process-wide session store, built from Config on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if Config.SESSION_BACKEND == 'sqlite':
+                    _store = SQLiteBackend(Config.SESSION_PATH, Config.SESSION_MAX_BYTES, Config.SESSION_TTL)
+                else:
+                    _store = MemoryBackend(Config.SESSION_MAX_BYTES, Config.SESSION_TTL)
+    return _store
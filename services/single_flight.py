@@ -0,0 +1,252 @@
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+from utils import db, metrics
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; cross-process coalescing is skipped there
+    fcntl = None
+
+
+class _Call:
+    """One in-flight call that other callers with the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def is_shareable(result):
+    """Only successful results are handed to callers in other processes."""
+    if result is None:
+        return False
+    return not (isinstance(result, dict) and result.get("error"))
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one upstream call.
+
+    Within a process, the first caller for a key runs the function and the
+    others wait for its result (up to timeout seconds, then they run it
+    themselves). With Config.SINGLE_FLIGHT_DIR set, callers in different
+    processes also serialize on a lock file per key, and a fresh result the
+    previous holder published to a small SQLite table is reused instead of
+    calling upstream again.
+    """
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout if timeout is not None else Config.SINGLE_FLIGHT_TIMEOUT
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                print(f"Single-flight wait for {self.name} {key!r} timed out, calling upstream directly")
+                return fn(*args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            with self._lock:
+                self.shared += 1
+            # Each caller gets its own copy so one cannot mutate another's result
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = self._run(key, fn, args, kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run(self, key, fn, args, kwargs):
+        if not Config.SINGLE_FLIGHT_DIR or fcntl is None:
+            return fn(*args, **kwargs)
+
+        digest = hashlib.sha256(f"{self.name}\0{key}".encode("utf-8")).hexdigest()
+        try:
+            os.makedirs(Config.SINGLE_FLIGHT_DIR, exist_ok=True)
+            lock_file = open(os.path.join(Config.SINGLE_FLIGHT_DIR, f"{digest}.lock"), "w")
+        except OSError as e:
+            print(f"Single-flight lock file unavailable: {e}")
+            return fn(*args, **kwargs)
+
+        with lock_file:
+            if not self._acquire(lock_file):
+                print(f"Single-flight lock for {self.name} {key!r} timed out, calling upstream directly")
+                return fn(*args, **kwargs)
+            try:
+                published = _read_result(digest)
+                if published is not None:
+                    with self._lock:
+                        self.shared += 1
+                    return published
+                result = fn(*args, **kwargs)
+                if is_shareable(result):
+                    _write_result(digest, result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _acquire(self, lock_file):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.05)
+
+
+@contextmanager
+def _connect():
+    with db.connect(os.path.join(Config.SINGLE_FLIGHT_DIR, "results.sqlite3")) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)")
+        yield conn
+
+
+def _read_result(digest):
+    try:
+        with _connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM results WHERE key = ?", (digest,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"Error reading single-flight result: {e}")
+        return None
+    if row is None or time.time() - row[1] > Config.SINGLE_FLIGHT_RESULT_TTL:
+        return None
+    return json.loads(row[0])
+
+
+def _write_result(digest, result):
+    now = time.time()
+    try:
+        value = json.dumps(result)
+        with _connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO results (key, value, created_at) VALUES (?, ?, ?)", (digest, value, now))
+            conn.execute("DELETE FROM results WHERE created_at < ?", (now - Config.SINGLE_FLIGHT_RESULT_TTL,))
+    except (TypeError, ValueError, sqlite3.Error) as e:
+        print(f"Error writing single-flight result: {e}")
+
+
+_groups = {}
+
+
+def single_flight(name, key=None):
+    """
+    Decorator that coalesces concurrent calls to a function with the same key.
+
+    key maps the call's arguments to a string; by default it is the repr of
+    the positional and keyword arguments.
+    """
+    def decorator(fn):
+        group = SingleFlight(name)
+        _groups[name] = group
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else repr((args, sorted(kwargs.items())))
+            return group.do(call_key, fn, *args, **kwargs)
+
+        wrapper.single_flight = group
+        return wrapper
+    return decorator
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent coroutine calls with the same key on one event loop.
+
+    Followers await the leader's result for up to timeout seconds, then make
+    the call themselves, like SingleFlight.
+    """
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout if timeout is not None else Config.SINGLE_FLIGHT_TIMEOUT
+        self._calls = {}
+        self.shared = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        future = self._calls.get(key)
+        if future is not None:
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                print(f"Single-flight wait for {self.name} {key!r} timed out, calling upstream directly")
+                return await fn(*args, **kwargs)
+            except asyncio.CancelledError:
+                # The leader's request was cancelled (its client went away), not ours
+                if future.cancelled():
+                    return await fn(*args, **kwargs)
+                raise
+            self.shared += 1
+            return copy.deepcopy(result)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._calls.pop(key, None)
+
+
+def async_single_flight(name, key=None):
+    """Decorator like single_flight for coroutine functions."""
+    def decorator(fn):
+        group = AsyncSingleFlight(name)
+        _groups[name] = group
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else repr((args, sorted(kwargs.items())))
+            return await group.do(call_key, fn, *args, **kwargs)
+
+        wrapper.single_flight = group
+        return wrapper
+    return decorator
+
+
+def get_stats():
+    """Return how many callers were served a shared result, per group."""
+    return {name: group.shared for name, group in _groups.items()}
+
+
+metrics.register(metrics.Gauge(
+    "aminoverse_single_flight_shared_total", "Callers served the result of another caller's in-flight call.", ["group"],
+    lambda: {(name,): shared for name, shared in get_stats().items()}, type="counter"
+))
@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+import time
+from config import Config
+from models.uniprot_record import UniProtRecord
+from services import structure_store
+from services.protein_resolver import prime
+from services.chembl_service import prime_target_search, prime_compound_table
+from services.llm_cache import get_llm_cache
+
+# A snapshot bundle is the precomputed data for popular proteins, written by
+# the warm-up job (services/warmup.py) and loaded into the caches when the
+# app starts, so a cold instance answers those proteins without upstream calls:
+#
+#     {"version": 1, "created_at": <unix time>, "gemini_model": "...",
+#      "proteins": [{"query", "record", "alphafold", "alphafold_validators",
+#                    "chembl_targets", "compound_table", "analysis"}, ...]}
+#
+# Every key of a protein other than "query" is optional. Loaded data is
+# dated created_at, so an old bundle expires (or is revalidated) on schedule
+# instead of being served as freshly fetched.
+
+SNAPSHOT_VERSION = 1
+
+
+def _open(path, mode, compressed):
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_snapshot(proteins, path=None):
+    """Write warmed protein entries to a snapshot bundle (gzip'd if the path ends in .gz)."""
+    path = path or Config.SNAPSHOT_PATH
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "gemini_model": Config.GEMINI_MODEL,
+        "proteins": proteins
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with _open(tmp_path, "w", path.endswith(".gz")) as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(path=None):
+    """
+    Load a snapshot bundle into the resolver, structure, ChEMBL and Gemini caches.
+
+    Missing, unreadable, outdated or older than Config.SNAPSHOT_MAX_AGE
+    bundles are skipped. Returns the number of proteins loaded.
+    """
+    path = path or Config.SNAPSHOT_PATH
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with _open(path, "r", path.endswith(".gz")) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading snapshot {path}: {e}")
+        return 0
+
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        print(f"Ignoring snapshot {path}: unsupported version {snapshot.get('version')}")
+        return 0
+    created_at = snapshot.get("created_at", 0)
+    if time.time() - created_at > Config.SNAPSHOT_MAX_AGE:
+        print(f"Ignoring snapshot {path}: older than {Config.SNAPSHOT_MAX_AGE}s")
+        return 0
+
+    loaded = 0
+    for protein in snapshot.get("proteins", []):
+        query = protein.get("query")
+        if not query or not protein.get("record"):
+            continue
+        record = UniProtRecord.from_dict(protein["record"])
+        prime(query, record, fetched_at=created_at)
+        prime(record.accession, record, fetched_at=created_at)
+
+        if protein.get("alphafold"):
+            # The persistent store may already hold newer metadata than the bundle
+            stored = structure_store.get_metadata_entry(record.accession)
+            if stored is None or stored[2] < created_at:
+                structure_store.put_metadata(
+                    record.accession, protein["alphafold"], fetched_at=created_at,
+                    validators=protein.get("alphafold_validators")
+                )
+        if protein.get("chembl_targets"):
+            prime_target_search(query, protein["chembl_targets"], fetched_at=created_at)
+        if protein.get("compound_table"):
+            prime_compound_table(
+                protein["compound_table"]["target_chembl_id"], protein["compound_table"]["table"], fetched_at=created_at
+            )
+        if protein.get("analysis"):
+            get_llm_cache().set(snapshot.get("gemini_model"), protein["analysis"]["prompt"], protein["analysis"]["text"])
+        loaded += 1
+
+    print(f"Loaded {loaded} proteins from snapshot {path}")
+    return loaded
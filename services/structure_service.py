@@ -0,0 +1,193 @@
+import io
+import threading
+from cachetools import LRUCache
+from config import Config
+from services.alphafold_service import get_alphafold_structure, get_alphafold_pdb
+from utils import metrics
+
+# Levels of detail a structure can be served at
+DETAIL_LEVELS = ("full", "backbone", "ca")
+BACKBONE_ATOMS = [b"N", b"CA", b"C", b"O"]
+
+# Parsed structures, keyed by (UniProt ID, AlphaFold model version, detail level)
+_cache = LRUCache(maxsize=Config.STRUCTURE_CACHE_SIZE)
+_lock = threading.Lock()
+
+
+class Structure:
+    """
+    Atom-level arrays parsed from a PDB file.
+
+    coords is (n_atoms, 3) float32 and b_factor holds AlphaFold's per-atom
+    pLDDT. chain_index and residue_index number chains and residues from 0
+    in file order, and hetero marks HETATM records. records keeps the
+    original ATOM/HETATM lines so subsets can be written back out as PDB text.
+    """
+
+    __slots__ = ("uniprot_id", "model_version", "coords", "b_factor", "atom_name", "residue_name",
+                 "residue_seq", "residue_index", "chain_ids", "chain_index", "element", "hetero", "records")
+
+    def __init__(self, uniprot_id, model_version, **arrays):
+        self.uniprot_id = uniprot_id
+        self.model_version = model_version
+        for name in self.__slots__[2:]:
+            setattr(self, name, arrays[name])
+
+    def __len__(self):
+        return len(self.coords)
+
+    def subset(self, mask):
+        """Return a new Structure with only the atoms selected by a boolean mask."""
+        arrays = {name: getattr(self, name)[mask] for name in self.__slots__[2:] if name != "chain_ids"}
+        return Structure(self.uniprot_id, self.model_version, chain_ids=self.chain_ids, **arrays)
+
+    def to_pdb(self):
+        """Write the atoms back out as PDB text."""
+        import numpy as np
+        return b"\n".join(np.char.rstrip(self.records)).decode("ascii") + "\nEND\n"
+
+    def to_npz(self):
+        """Serialize the arrays (without the PDB records) as compressed NPZ bytes."""
+        import numpy as np
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            uniprot_id=np.array(self.uniprot_id),
+            model_version=np.array(self.model_version or 0, dtype=np.int32),
+            coords=self.coords,
+            b_factor=self.b_factor,
+            atom_name=self.atom_name,
+            residue_name=self.residue_name,
+            residue_seq=self.residue_seq,
+            residue_index=self.residue_index,
+            chain_ids=self.chain_ids,
+            chain_index=self.chain_index,
+            element=self.element,
+            hetero=self.hetero
+        )
+        return buffer.getvalue()
+
+
+def parse_pdb(pdb_text, uniprot_id=None, model_version=None):
+    """Parse the ATOM/HETATM records of a PDB file into a Structure using fixed-column slicing."""
+    # numpy is imported on first use so cold starts that never parse a structure skip it
+    import numpy as np
+    lines = [line.encode("ascii", "replace").ljust(80)[:80]
+             for line in pdb_text.splitlines() if line.startswith(("ATOM  ", "HETATM"))]
+    records = np.array(lines, dtype="S80")
+    raw = records.view(np.uint8).reshape(len(records), 80)
+
+    def column(start, end):
+        return np.ascontiguousarray(raw[:, start:end]).view(f"S{end - start}").ravel()
+
+    coords = np.stack([column(30, 38), column(38, 46), column(46, 54)], axis=1).astype(np.float32)
+    chain = column(21, 22)
+    residue_seq = column(22, 26).astype(np.int32)
+    insertion_code = column(26, 27)
+
+    # A new residue starts wherever chain, number or insertion code changes
+    changed = np.ones(len(records), dtype=bool)
+    if len(records) > 1:
+        changed[1:] = (chain[1:] != chain[:-1]) | (residue_seq[1:] != residue_seq[:-1]) | (insertion_code[1:] != insertion_code[:-1])
+    residue_index = (np.cumsum(changed) - 1).astype(np.int32)
+
+    chain_ids, first_seen, chain_index = np.unique(chain, return_index=True, return_inverse=True)
+    # Number chains in file order rather than alphabetically
+    order = np.argsort(first_seen)
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+
+    return Structure(
+        uniprot_id,
+        model_version,
+        coords=coords,
+        b_factor=column(60, 66).astype(np.float32),
+        atom_name=np.char.strip(column(12, 16)),
+        residue_name=np.char.strip(column(17, 20)),
+        residue_seq=residue_seq,
+        residue_index=residue_index,
+        chain_ids=chain_ids[order],
+        chain_index=remap[chain_index.ravel()].astype(np.int16),
+        element=np.char.strip(column(76, 78)),
+        hetero=column(0, 6) == b"HETATM",
+        records=records
+    )
+
+
+def select_detail(structure, detail):
+    """Reduce a full structure to a level of detail: "full", "backbone" (N, CA, C, O) or "ca"."""
+    if detail == "full":
+        return structure
+
+    import numpy as np
+    # HETATM records are skipped so a calcium ion named "CA" is not taken for an alpha carbon
+    if detail == "ca":
+        mask = structure.atom_name == b"CA"
+    else:
+        mask = np.isin(structure.atom_name, BACKBONE_ATOMS)
+    return structure.subset(mask & ~structure.hetero)
+
+
+def parse_structure_data(uniprot_id, structure_data, detail="full"):
+    """
+    Parse the model described by AlphaFold metadata at a level of detail.
+
+    Returns the Structure, or a dict with an "error" key. Each level is kept
+    in an LRU cache so repeat requests skip the download, the parse and the
+    filter.
+    """
+    if isinstance(structure_data, dict) and structure_data.get("error"):
+        return {"error": structure_data["error"]}
+    if not isinstance(structure_data, list) or not structure_data:
+        return {"error": "No structure available"}
+
+    model_version = structure_data[0].get("latestVersion")
+    with _lock:
+        structure = _cache.get((uniprot_id, model_version, detail))
+        full = _cache.get((uniprot_id, model_version, "full"))
+    metrics.record_cache("structure", structure is not None)
+    if structure is not None:
+        return structure
+
+    if full is None:
+        pdb_data = get_alphafold_pdb(structure_data)
+        if pdb_data.get("error"):
+            return {"error": pdb_data["error"]}
+
+        try:
+            full = parse_pdb(pdb_data["pdb_data"], uniprot_id, model_version)
+        except ValueError as e:
+            return {"error": f"Could not parse AlphaFold PDB data: {str(e)}"}
+
+        if len(full) == 0:
+            return {"error": "AlphaFold PDB data contains no atoms"}
+
+    structure = select_detail(full, detail)
+
+    with _lock:
+        _cache[(uniprot_id, model_version, "full")] = full
+        _cache[(uniprot_id, model_version, detail)] = structure
+
+    return structure
+
+
+def get_parsed_structure(uniprot_id, detail="full"):
+    """Get the AlphaFold model for a UniProt ID as a parsed Structure (or an error dict)."""
+    return parse_structure_data(uniprot_id, get_alphafold_structure(uniprot_id), detail)
+
+
+def get_structure_detail_data(uniprot_id, detail):
+    """Get AlphaFold metadata and PDB text reduced to a level of detail, shaped like get_structure_data."""
+    structure_data = get_alphafold_structure(uniprot_id)
+    structure = parse_structure_data(uniprot_id, structure_data, detail)
+
+    if isinstance(structure, dict):
+        return {"uniprot_id": uniprot_id, "detail": detail, "error": structure["error"]}
+
+    return {
+        "uniprot_id": uniprot_id,
+        "detail": detail,
+        "atom_count": len(structure),
+        "structure_metadata": structure_data,
+        "pdb_data": {"pdb_data": structure.to_pdb()}
+    }
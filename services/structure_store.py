@@ -0,0 +1,205 @@
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from config import Config
+from utils import db, metrics
+
+# AlphaFold models never change within a model version, so they are kept on
+# disk keyed by (accession, version). Metadata can point at a newer version,
+# so it is only trusted for Config.STRUCTURE_METADATA_TTL seconds; after that
+# alphafold_service serves it while revalidating with the stored validators.
+
+_init_lock = threading.Lock()
+# (configured directory, directory in use or None when the store is disabled)
+_store_dir = (None, None)
+
+
+def _directory():
+    """
+    The directory models are stored in, created on first use.
+
+    When Config.STRUCTURE_STORE_DIR cannot be written (read-only serverless
+    filesystems, for instance) a directory under the system temp dir is used
+    instead, and the store is disabled if that fails too.
+    """
+    global _store_dir
+    configured = Config.STRUCTURE_STORE_DIR
+    if _store_dir[0] != configured:
+        with _init_lock:
+            if _store_dir[0] != configured:
+                _store_dir = (configured, _open_directory(configured) if configured else None)
+    return _store_dir[1]
+
+
+def _open_directory(configured):
+    for directory in (configured, os.path.join(tempfile.gettempdir(), "aminoverse-structures")):
+        try:
+            _create_index(directory)
+            if directory != configured:
+                print(f"Structure store directory {configured} is not writable, using {directory}")
+            return directory
+        except (OSError, sqlite3.Error) as e:
+            print(f"Structure store directory {directory} unavailable: {e}")
+    print("Structure store disabled")
+    return None
+
+
+def is_enabled():
+    return _directory() is not None
+
+
+def _index_path():
+    return os.path.join(_directory(), "index.sqlite3")
+
+
+def _create_index(directory):
+    os.makedirs(directory, exist_ok=True)
+    if not os.access(directory, os.W_OK):
+        raise OSError(f"{directory} is not writable")
+    with db.connect(os.path.join(directory, "index.sqlite3")) as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS models ("
+            "accession TEXT NOT NULL, version INTEGER NOT NULL, filename TEXT NOT NULL, "
+            "size INTEGER NOT NULL, accessed_at REAL NOT NULL, "
+            "PRIMARY KEY (accession, version))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            "accession TEXT PRIMARY KEY, body TEXT NOT NULL, fetched_at REAL NOT NULL, validators TEXT)"
+        )
+        # Stores created before upstream validators were kept
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(metadata)")]
+        if "validators" not in columns:
+            conn.execute("ALTER TABLE metadata ADD COLUMN validators TEXT")
+
+
+def _connect():
+    return db.connect(_index_path())
+
+
+def get_metadata_entry(accession):
+    """Return (metadata, upstream validators, fetched_at) stored for an accession, however old, or None."""
+    if not is_enabled():
+        return None
+    try:
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT body, validators, fetched_at FROM metadata WHERE accession = ?", (accession,)
+            ).fetchone()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error reading structure store metadata: {e}")
+        return None
+    if row is None:
+        return None
+    return json.loads(row[0]), json.loads(row[1]) if row[1] else {}, row[2]
+
+
+def get_metadata(accession, allow_stale=False):
+    """Return stored AlphaFold metadata for an accession, or None if missing (or stale, unless allow_stale)."""
+    entry = get_metadata_entry(accession)
+    fresh = entry is not None and time.time() - entry[2] <= Config.STRUCTURE_METADATA_TTL
+    if not allow_stale:
+        metrics.record_cache("structure_store_metadata", fresh)
+    if entry is None or not (fresh or allow_stale):
+        return None
+    return entry[0]
+
+
+def put_metadata(accession, metadata, fetched_at=None, validators=None):
+    """Store AlphaFold metadata for an accession, fetched at fetched_at (default now) with its upstream ETag/Last-Modified."""
+    if not is_enabled():
+        return
+    try:
+        with _connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO metadata (accession, body, fetched_at, validators) VALUES (?, ?, ?, ?)",
+                (accession, json.dumps(metadata), fetched_at or time.time(), json.dumps(validators or {}))
+            )
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error writing structure store metadata: {e}")
+
+
+def model_path(accession, version):
+    """Return the path of the stored gzip'd PDB file for a model, or None if it is not stored."""
+    if not is_enabled():
+        return None
+    try:
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT filename FROM models WHERE accession = ? AND version = ?", (accession, version)
+            ).fetchone()
+            if row is None:
+                return None
+            path = os.path.join(_directory(), row[0])
+            if not os.path.exists(path):
+                conn.execute("DELETE FROM models WHERE accession = ? AND version = ?", (accession, version))
+                return None
+            conn.execute(
+                "UPDATE models SET accessed_at = ? WHERE accession = ? AND version = ?",
+                (time.time(), accession, version)
+            )
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error reading structure store index: {e}")
+        return None
+    return path
+
+
+def read_model(accession, version):
+    """Return the stored PDB text for a model, or None if it is not stored."""
+    path = model_path(accession, version)
+    metrics.record_cache("structure_store_model", path is not None)
+    if path is None:
+        return None
+    try:
+        # Parsing needs the whole model, so the file is simply read and inflated
+        with open(path, "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+    except (OSError, ValueError, EOFError) as e:
+        print(f"Error reading stored structure {path}: {e}")
+        return None
+
+
+def put_model(accession, version, pdb_text):
+    """Store a model's PDB text gzip'd on disk, then evict old models over the size budget."""
+    if not is_enabled():
+        return
+    filename = f"AF-{accession}-v{version}.pdb.gz"
+    path = os.path.join(_directory(), filename)
+    data = gzip.compress(pdb_text.encode("utf-8"), compresslevel=6)
+
+    try:
+        with _connect() as conn:
+            # Write to a temporary name first so readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            conn.execute(
+                "INSERT OR REPLACE INTO models (accession, version, filename, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (accession, version, filename, len(data), time.time())
+            )
+        evict()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error writing structure store model {filename}: {e}")
+
+
+def evict():
+    """Delete least recently used models until the store fits Config.STRUCTURE_STORE_MAX_BYTES."""
+    with _connect() as conn:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM models").fetchone()[0]
+        if total <= Config.STRUCTURE_STORE_MAX_BYTES:
+            return
+        rows = conn.execute("SELECT accession, version, filename, size FROM models ORDER BY accessed_at").fetchall()
+        for accession, version, filename, size in rows:
+            if total <= Config.STRUCTURE_STORE_MAX_BYTES:
+                break
+            try:
+                os.remove(os.path.join(_directory(), filename))
+            except FileNotFoundError:
+                pass
+            conn.execute("DELETE FROM models WHERE accession = ? AND version = ?", (accession, version))
+            total -= size
@@ -0,0 +1,259 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from config import Config
+from services.protein_index import (
+    KIND_ACCESSION, KIND_ENTRY_NAME, KIND_GENE, KIND_GENE_SYNONYM, KIND_PROTEIN_NAME, KIND_ALT_NAME,
+    get_protein_index
+)
+from utils.query import normalize_query
+
+# Which kind of name to show first when a protein matches under several
+DISPLAY_PRIORITY = {
+    KIND_GENE: 0,
+    KIND_ACCESSION: 1,
+    KIND_PROTEIN_NAME: 2,
+    KIND_GENE_SYNONYM: 3,
+    KIND_ALT_NAME: 4,
+    KIND_ENTRY_NAME: 5
+}
+
+
+def next_edit_row(rows, char, query, depth, max_distance):
+    """
+    Extend an edit-distance DP by one key character.
+
+    rows holds the last two DP rows and the key character that produced
+    the last one; cell k of a row is the distance between query[:k] and the
+    key prefix so far. Adjacent transpositions count as one edit, and only
+    the diagonal band that can stay within max_distance is computed.
+    """
+    previous, row, previous_char = rows
+    too_far = max_distance + 1
+    next_row = [too_far] * (len(query) + 1)
+    if depth <= max_distance:
+        next_row[0] = depth
+    for k in range(max(1, depth - max_distance), min(len(query), depth + max_distance) + 1):
+        cost = min(next_row[k - 1] + 1, row[k] + 1, row[k - 1] + (query[k - 1] != char))
+        if k > 1 and previous is not None and query[k - 1] == previous_char and query[k - 2] == char:
+            cost = min(cost, previous[k - 2] + 1)
+        next_row[k] = min(cost, too_far)
+    return (row, next_row, char)
+
+
+class SuggestIndex:
+    """
+    In-memory autocomplete index over gene symbols, protein names and synonyms.
+
+    All names live in one sorted list, so every prefix is a contiguous range
+    found with bisect, and the sorted list doubles as an implicit trie. A
+    segment tree over each key's popularity rank returns the best keys in a
+    range without scanning it. Typos are handled by walking that trie with a
+    Levenshtein row per node, pruning branches that are already too far off.
+    """
+
+    def __init__(self, entries):
+        self._entries = []
+        pairs = []
+        for number, entry in enumerate(entries):
+            self._entries.append((entry.accession, entry.genes[0] if entry.genes else "", entry.protein_name))
+            names = [(entry.accession, KIND_ACCESSION), (entry.entry_name, KIND_ENTRY_NAME)]
+            names += [(gene, KIND_GENE if i == 0 else KIND_GENE_SYNONYM) for i, gene in enumerate(entry.genes)]
+            names += [(entry.protein_name, KIND_PROTEIN_NAME)]
+            names += [(name, KIND_ALT_NAME) for name in entry.alternative_names]
+            seen = set()
+            for text, kind in names:
+                key = normalize_query(text)
+                if key and key not in seen:
+                    seen.add(key)
+                    # Popularity first (annotation score), then the most canonical kind of name
+                    pairs.append((key, (-entry.score, DISPLAY_PRIORITY[kind], len(key)), number, text))
+        pairs.sort()
+
+        self._keys = [pair[0] for pair in pairs]
+        self._texts = [pair[3] for pair in pairs]
+        self._key_entry = array("I", (pair[2] for pair in pairs))
+
+        # Query-independent rank of every key as a single integer
+        order = sorted(range(len(pairs)), key=lambda i: pairs[i][1])
+        self._rank = array("I", bytes(4 * len(pairs)))
+        for position, i in enumerate(order):
+            self._rank[i] = position
+
+        # Segment tree holding the best-ranked key id under each node
+        size = 1
+        while size < max(1, len(pairs)):
+            size *= 2
+        self._size = size
+        self._tree = array("i", [-1]) * (2 * size)
+        for i in range(len(pairs)):
+            self._tree[size + i] = i
+        for node in range(size - 1, 0, -1):
+            self._tree[node] = self._better(self._tree[2 * node], self._tree[2 * node + 1])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _better(self, a, b):
+        if a < 0:
+            return b
+        if b < 0:
+            return a
+        return a if self._rank[a] <= self._rank[b] else b
+
+    def _best_in_range(self, lo, hi):
+        """Return the best-ranked key id in keys[lo:hi]."""
+        best = -1
+        lo += self._size
+        hi += self._size
+        while lo < hi:
+            if lo & 1:
+                best = self._better(best, self._tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = self._better(best, self._tree[hi])
+            lo //= 2
+            hi //= 2
+        return best
+
+    def _prefix_range(self, prefix):
+        start = bisect_left(self._keys, prefix)
+        return start, bisect_left(self._keys, prefix + "\uffff", start)
+
+    def _fuzzy_ranges(self, query, max_distance, limit):
+        """
+        Find key ranges whose prefix is within max_distance edits of query.
+
+        The first character must match, which keeps the walk small and
+        matches how people mistype. Stops once the ranges found hold enough
+        keys and nothing left to explore can beat them. Returns (distance,
+        lo, hi) tuples.
+        """
+        found = []
+        lo, hi = self._prefix_range(query[0])
+        if lo == hi:
+            return found
+
+        start = (None, [min(k, max_distance + 1) for k in range(len(query) + 1)], None)
+        first_rows = next_edit_row(start, query[0], query, 1, max_distance)
+        max_depth = len(query) + max_distance
+
+        # Best-first walk (closest, then deepest, prefixes first), so the node
+        # budget only ever cuts off the least promising branches
+        heap = [(min(first_rows[1]), -1, 0, query[0], lo, hi, first_rows, max_distance + 1)]
+        counter = 0
+        covered = 0
+        worst_found = 0
+        while heap and counter < Config.SUGGEST_MAX_FUZZY_NODES:
+            if covered >= 4 * limit and heap[0][0] >= worst_found:
+                break
+            _, _, _, prefix, lo, hi, rows, best_above = heapq.heappop(heap)
+            distance = rows[1][-1]
+            if distance < best_above:
+                found.append((distance, lo, hi))
+                best_above = distance
+                covered += hi - lo
+                worst_found = max(worst_found, distance)
+            if best_above == 0 or len(prefix) >= max_depth:
+                continue
+
+            depth = len(prefix)
+            i = lo
+            while i < hi and len(self._keys[i]) == depth:
+                i += 1
+            while i < hi:
+                char = self._keys[i][depth]
+                j = bisect_left(self._keys, prefix + chr(ord(char) + 1), i, hi)
+                child_rows = next_edit_row(rows, char, query, depth + 1, max_distance)
+                closest = min(child_rows[1])
+                if closest <= max_distance:
+                    counter += 1
+                    heapq.heappush(heap, (closest, -depth - 1, counter, prefix + char, i, j, child_rows, best_above))
+                i = j
+        return found
+
+    def suggest(self, query, limit=10):
+        """Return up to limit suggestions for a partial, possibly misspelled, query."""
+        query = normalize_query(query)
+        limit = max(1, min(limit, Config.SUGGEST_MAX_LIMIT))
+        if not query:
+            return []
+
+        # Each heap item is a key range with the best key in it, ordered by
+        # (edit distance, not an exact match, popularity rank)
+        heap = []
+
+        def push(distance, lo, hi):
+            if lo < hi:
+                best = self._best_in_range(lo, hi)
+                exact = self._keys[best] == query
+                heapq.heappush(heap, (distance, not exact, self._rank[best], best, lo, hi))
+
+        lo, hi = self._prefix_range(query)
+        # Exact matches sort first in their prefix range; give each its own slot
+        exact_end = lo
+        while exact_end < hi and self._keys[exact_end] == query:
+            push(0, exact_end, exact_end + 1)
+            exact_end += 1
+        push(0, exact_end, hi)
+
+        # Only look for typos when the prefix alone cannot fill the list, and
+        # only widen to two edits for longer queries that one edit cannot fill
+        matched = {self._key_entry[i] for i in range(lo, min(hi, lo + 4 * limit))}
+        max_distances = (1, 2) if len(query) >= 8 else (1,)
+        for max_distance in max_distances if len(query) >= 3 else ():
+            if len(matched) >= limit:
+                break
+            for distance, fuzzy_lo, fuzzy_hi in self._fuzzy_ranges(query, max_distance, limit):
+                if distance > 0:
+                    push(distance, fuzzy_lo, fuzzy_hi)
+                    matched.update(self._key_entry[i] for i in range(fuzzy_lo, min(fuzzy_hi, fuzzy_lo + 4 * limit)))
+
+        results = []
+        seen = set()
+        while heap and len(results) < limit:
+            distance, _, _, key_id, lo, hi = heapq.heappop(heap)
+            # Split the range around the key just taken so the next best one surfaces
+            push(distance, lo, key_id)
+            push(distance, key_id + 1, hi)
+
+            entry_number = self._key_entry[key_id]
+            if entry_number in seen:
+                continue
+            seen.add(entry_number)
+            accession, gene, protein_name = self._entries[entry_number]
+            results.append({
+                "match": self._texts[key_id],
+                "accession": accession,
+                "gene": gene,
+                "protein_name": protein_name,
+                "distance": distance
+            })
+        return results
+
+
+_suggest_index = None
+_suggest_lock = threading.Lock()
+
+
+def get_suggest_index():
+    """Return the process-wide suggest index, built from the protein index on first use."""
+    global _suggest_index
+    if _suggest_index is None:
+        with _suggest_lock:
+            if _suggest_index is None:
+                protein_index = get_protein_index()
+                if protein_index is None:
+                    return None
+                _suggest_index = SuggestIndex(protein_index.entries())
+    return _suggest_index
+
+
+def suggest_proteins(query, limit=10):
+    """Suggest proteins for a partial query, or return an error dict if no index is available."""
+    index = get_suggest_index()
+    if index is None:
+        return {"error": "Protein name index is not available"}
+    return {"query": query, "suggestions": index.suggest(query, limit)}
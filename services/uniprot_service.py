@@ -1,97 +1,269 @@
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import requests
-import json
+from config import Config
+from models.uniprot_record import UniProtRecord
+from services import http_client
+from services.revalidation import RevalidatingCache, NOT_MODIFIED, conditional_headers, get_validators
+from services.protein_index import is_accession
+from services.single_flight import single_flight, async_single_flight
+from utils import metrics
+from utils.query import normalize_query
 
+UNIPROT_SEARCH_URL = f"{Config.UNIPROT_BASE_URL}/uniprotkb/search"
+UNIPROT_ENTRY_URL = f"{Config.UNIPROT_BASE_URL}/uniprotkb"
+
+# Names that can be looked up as exact gene symbols
+GENE_SYMBOL_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+# Hedged lookups run here so a slow first strategy does not hold the request thread
+_hedge_executor = ThreadPoolExecutor(max_workers=Config.UNIPROT_HEDGE_WORKERS, thread_name_prefix="uniprot-hedge")
+
+# Successful searches by normalized query. The validators also name the
+# strategy that answered, so a stale entry is revalidated with one
+# conditional GET to that lookup instead of a full search.
+_search_cache = RevalidatingCache("uniprot_search", Config.RESOLVER_CACHE_SIZE, Config.CACHE_EXPIRY)
+
+
+def classify_query(query):
+    """Classify a query as "accession", "gene" (symbol-shaped) or "free_text"."""
+    key = normalize_query(query)
+    if is_accession(key):
+        return "accession"
+    if GENE_SYMBOL_RE.match(key) and len(key) <= Config.UNIPROT_GENE_SYMBOL_MAX_LENGTH:
+        return "gene"
+    return "free_text"
+
+def uniprot_strategies(query):
+    """
+    Return the lookups to try for a query, most likely to answer first.
+
+    Each strategy is (name, url, params). Accessions are fetched directly,
+    gene symbols are matched exactly among human genes, and free text goes
+    to the organism-filtered full-text search.
+    """
+    # Only the top hit is used, and only the fields UniProtRecord reads
+    def search_params(uniprot_query):
+        return {"query": uniprot_query, "format": "json", "size": 1, "fields": UniProtRecord.ENTRY_FIELDS}
+
+    search = ("search", UNIPROT_SEARCH_URL, search_params(f"{query} AND organism_id:9606"))  # Just search for the protein in humans
+    kind = classify_query(query)
+    if kind == "accession":
+        entry_params = {"format": "json", "fields": UniProtRecord.ENTRY_FIELDS}
+        return [("accession", f"{UNIPROT_ENTRY_URL}/{normalize_query(query)}", entry_params), search]
+    if kind == "gene":
+        return [("gene", UNIPROT_SEARCH_URL, search_params(f"gene_exact:{query} AND organism_id:9606")), search]
+    return [search, ("gene_fallback", UNIPROT_SEARCH_URL, search_params(f"gene:{query}"))]
+
+def parse_strategy_response(name, response):
+    """Turn a strategy's response into search-shaped JSON ({"results": [...]})."""
+    if name == "accession":
+        if response.status_code in (400, 404):
+            return {"results": []}
+        response.raise_for_status()
+        return {"results": [response.json()]}
+    response.raise_for_status()
+    return response.json()
+
+def run_strategy(strategy):
+    """Run one strategy, returning its search-shaped JSON and the response's validators."""
+    name, url, params = strategy
+    response = http_client.get(url, params=params)
+    return parse_strategy_response(name, response), dict(get_validators(response.headers), strategy=name)
+
+def find_strategy(query, validators):
+    """The strategy that answered a cached search, from its validators, or None."""
+    name = (validators or {}).get("strategy")
+    return next((strategy for strategy in uniprot_strategies(query) if strategy[0] == name), None)
+
+def revalidated_result(name, response):
+    """A conditional strategy response as a cache loader result, or None if it no longer answers."""
+    if response.status_code == 304:
+        return NOT_MODIFIED
+    data = parse_strategy_response(name, response)
+    if not data.get("results"):
+        return None
+    return data, dict(get_validators(response.headers), strategy=name)
+
+def search_result(answered, errors):
+    """The result once every strategy has finished without a hit."""
+    if answered or not errors:
+        return {"results": []}
+    return {"error": f"Error querying UniProt API: {str(errors[0])}", "results": []}
+
+@metrics.timed()
+@single_flight("uniprot_search", key=normalize_query)
 def search_uniprot(query):
-    """Search UniProt API for proteins matching the query."""
-    # Try a simpler query first with minimal parameters
-    url = "https://rest.uniprot.org/uniprotkb/search"
-    params = {
-        "query": f"{query} AND organism_id:9606",  # Just search for the protein in humans
-        "format": "json",
-        "size": 5
-    }
+    """
+    Search UniProt API for proteins matching the query.
+
+    Strategies from uniprot_strategies() are tried in order. With
+    Config.UNIPROT_SEARCH_STRATEGY set to "hedged", the next strategy is
+    also fired whenever the running ones have not answered within
+    Config.UNIPROT_HEDGE_DELAY seconds, and the first non-empty answer wins.
+    Hits are cached for Config.CACHE_EXPIRY seconds and then served stale
+    while they are revalidated in the background.
+    """
+    return _search_cache.get(normalize_query(query), lambda validators: _load_search(query, validators))
+
+def _load_search(query, validators):
+    strategy = find_strategy(query, validators)
+    if strategy is not None:
+        name, url, params = strategy
+        try:
+            result = revalidated_result(name, http_client.get(url, params=params, headers=conditional_headers(validators)))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"UniProt API error ({name}): {str(e)}")
+            return {"error": f"Error querying UniProt API: {str(e)}", "results": []}
+        if result is not None:
+            return result
+    return _search(query)
+
+def _search(query):
+    """Run the lookup strategies; returns (data, validators) for a hit, otherwise search_result()."""
+    strategies = uniprot_strategies(query)
+    if Config.UNIPROT_SEARCH_STRATEGY != "hedged":
+        return _search_sequential(strategies)
     
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"UniProt API error: {str(e)}")
-        
-        # Try an alternative approach - direct accession lookup
-        if len(query) >= 5 and query[0:2].isalpha():  # Looks like a UniProt accession
+    remaining = list(strategies)
+    pending = {}
+    errors = []
+    answered = False
+    
+    def launch():
+        strategy = remaining.pop(0)
+        pending[_hedge_executor.submit(run_strategy, strategy)] = strategy[0]
+    
+    launch()
+    while pending:
+        done, _ = wait(pending, timeout=Config.UNIPROT_HEDGE_DELAY if remaining else None, return_when=FIRST_COMPLETED)
+        if not done:
+            # Over the latency budget: hedge with the next strategy
+            launch()
+            continue
+        for future in done:
+            name = pending.pop(future)
             try:
-                entry_url = f"https://rest.uniprot.org/uniprotkb/{query}"
-                entry_response = requests.get(entry_url)
-                if entry_response.status_code == 200:
-                    return {"results": [entry_response.json()]}
-            except:
-                pass
-        
-        # Try with gene name exact match as a fallback
+                data, validators = future.result()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"UniProt API error ({name}): {str(e)}")
+                errors.append(e)
+                # The other strategies hit the same upstream, so skip them while it is down
+                if http_client.is_outage_error(e):
+                    remaining.clear()
+                continue
+            if data.get("results"):
+                return data, validators
+            answered = True
+        if not pending and remaining:
+            launch()
+    
+    return search_result(answered, errors)
+
+def _search_sequential(strategies):
+    errors = []
+    answered = False
+    for strategy in strategies:
+        try:
+            data, validators = run_strategy(strategy)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"UniProt API error ({strategy[0]}): {str(e)}")
+            errors.append(e)
+            if http_client.is_outage_error(e):
+                break
+            continue
+        if data.get("results"):
+            return data, validators
+        answered = True
+    return search_result(answered, errors)
+
+async def async_run_strategy(strategy):
+    name, url, params = strategy
+    response = await http_client.async_get(url, params=params)
+    return parse_strategy_response(name, response), dict(get_validators(response.headers), strategy=name)
+
+@metrics.timed()
+@async_single_flight("uniprot_search_async", key=normalize_query)
+async def async_search_uniprot(query):
+    """Async variant of search_uniprot for the ASGI app, with the same strategies, hedging and cache."""
+    return await _search_cache.async_get(
+        normalize_query(query),
+        lambda validators: _async_load_search(query, validators),
+        lambda validators: _load_search(query, validators)
+    )
+
+async def _async_load_search(query, validators):
+    import httpx
+    strategy = find_strategy(query, validators)
+    if strategy is not None:
+        name, url, params = strategy
         try:
-            fallback_params = {
-                "query": f"gene:{query}",  # Search by gene name
-                "format": "json",
-                "size": 5
-            }
-            fallback_response = requests.get(url, fallback_params)
-            fallback_response.raise_for_status()
-            return fallback_response.json()
-        except:
-            # Return error if all attempts fail
+            result = revalidated_result(name, await http_client.async_get(url, params=params, headers=conditional_headers(validators)))
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"UniProt API error ({name}): {str(e)}")
             return {"error": f"Error querying UniProt API: {str(e)}", "results": []}
+        if result is not None:
+            return result
+    return await _async_search(query)
+
+async def _async_search(query):
+    import httpx
+    remaining = list(uniprot_strategies(query))
+    hedged = Config.UNIPROT_SEARCH_STRATEGY == "hedged"
+    pending = {}
+    errors = []
+    answered = False
+    
+    def launch():
+        strategy = remaining.pop(0)
+        pending[asyncio.ensure_future(async_run_strategy(strategy))] = strategy[0]
+    
+    launch()
+    try:
+        while pending:
+            timeout = Config.UNIPROT_HEDGE_DELAY if hedged and remaining else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+            for task in done:
+                name = pending.pop(task)
+                try:
+                    data, validators = task.result()
+                except (httpx.HTTPError, ValueError) as e:
+                    print(f"UniProt API error ({name}): {str(e)}")
+                    errors.append(e)
+                    if http_client.is_outage_error(e):
+                        remaining.clear()
+                    continue
+                if data.get("results"):
+                    return data, validators
+                answered = True
+            if not pending and remaining:
+                launch()
+    finally:
+        # Unlike threads, losing lookups can be cancelled outright
+        for task in pending:
+            task.cancel()
+    
+    return search_result(answered, errors)
 
 def get_protein_function(protein_name):
     """
     Query UniProt API to get protein function information
     """
     try:
-        # Use the search function
-        uniprot_data = search_uniprot(protein_name)
+        # Resolve through the shared cache so other endpoints reuse the search
+        from services.protein_resolver import resolve_protein
+        resolved = resolve_protein(protein_name)
         
-        if uniprot_data.get("error"):
-            return {"error": uniprot_data["error"]}
+        if resolved.get("error"):
+            return {"error": resolved["error"]}
             
         # Process the first result if available
-        if uniprot_data.get('results') and len(uniprot_data['results']) > 0:
-            protein_data = uniprot_data['results'][0]
-            
-            # Extract gene names safely
-            gene_names = []
-            if protein_data.get('genes'):
-                genes = protein_data['genes']
-                if isinstance(genes, list) and len(genes) > 0:
-                    for gene in genes:
-                        if isinstance(gene, dict) and gene.get('geneName'):
-                            gene_name_list = gene.get('geneName', [])
-                            for g in gene_name_list:
-                                if isinstance(g, dict) and g.get('value'):
-                                    gene_names.append(g['value'])
-                                elif isinstance(g, str):
-                                    gene_names.append(g)
-            
-            # Extract function information safely
-            function = "Function information not available"
-            if protein_data.get('comments'):
-                for comment in protein_data.get('comments', []):
-                    if isinstance(comment, dict) and comment.get('commentType') == 'FUNCTION':
-                        if comment.get('texts') and len(comment['texts']) > 0:
-                            if isinstance(comment['texts'][0], dict):
-                                function = comment['texts'][0].get('value', function)
-            
-            # Build function info dictionary with safe extractions
-            function_info = {
-                'id': protein_data.get('primaryAccession', ''),
-                'name': (protein_data.get('proteinDescription', {}).get('recommendedName', {}).get('fullName', {}).get('value', '')
-                        or protein_data.get('proteinDescription', {}).get('submissionNames', [{}])[0].get('fullName', {}).get('value', '')
-                        or protein_data.get('id', '')),
-                'function': function,
-                'gene_names': gene_names,
-                'organism': protein_data.get('organism', {}).get('scientificName', '')
-            }
-            
-            return function_info
+        if resolved.get('entry'):
+            return resolved['entry'].to_function_info()
         else:
             return {'error': 'No protein information found'}
     
@@ -100,4 +272,93 @@ def get_protein_function(protein_name):
         error_details = traceback.format_exc()
         print(f"Error in get_protein_function: {str(e)}\n{error_details}")
         # Catch any other unexpected errors
-        return {'error': f"Unexpected error processing UniProt data: {str(e)}"}
\ No newline at end of file
+        return {'error': f"Unexpected error processing UniProt data: {str(e)}"}
+
+async def async_get_protein_function(protein_name):
+    """Async variant of get_protein_function for the ASGI app."""
+    try:
+        from services.protein_resolver import async_resolve_protein
+        resolved = await async_resolve_protein(protein_name)
+        
+        if resolved.get("error"):
+            return {"error": resolved["error"]}
+        
+        return resolved["entry"].to_function_info()
+    
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Error in async_get_protein_function: {str(e)}\n{error_details}")
+        return {'error': f"Unexpected error processing UniProt data: {str(e)}"}
+
+
+def _search_group(query, size, fields=UniProtRecord.ENTRY_FIELDS):
+    params = {"query": query, "format": "json", "size": size, "fields": fields}
+    response = http_client.get(UNIPROT_SEARCH_URL, params=params)
+    response.raise_for_status()
+    return response.json().get("results", [])
+
+
+def search_uniprot_batch(queries):
+    """
+    Look up many accessions and gene symbols in a few grouped UniProt requests.
+
+    Accessions are fetched with "accession:A OR accession:B ..." and gene
+    symbols with "gene_exact:X OR gene_exact:Y ..." restricted to human, in
+    groups of Config.BATCH_UNIPROT_GROUP_SIZE. Returns a dict mapping each
+    query to its UniProtRecord; queries that are not found, are free text,
+    or whose group failed are left out so the caller can fall back to
+    search_uniprot for them.
+    """
+    accessions = {}
+    genes = {}
+    for query in queries:
+        key = normalize_query(query)
+        if is_accession(key):
+            accessions.setdefault(key.split("-", 1)[0], []).append(query)
+        elif GENE_SYMBOL_RE.match(key):
+            genes.setdefault(key, []).append(query)
+
+    found = {}
+    group_size = Config.BATCH_UNIPROT_GROUP_SIZE
+
+    accession_keys = list(accessions)
+    for i in range(0, len(accession_keys), group_size):
+        group = accession_keys[i:i + group_size]
+        try:
+            # sec_acc lets queries by a secondary (merged or demerged) accession find their entry
+            entries = _search_group(
+                " OR ".join(f"accession:{a}" for a in group), len(group), f"{UniProtRecord.ENTRY_FIELDS},sec_acc"
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"UniProt batch accession lookup error: {str(e)}")
+            continue
+        for entry in entries:
+            record = UniProtRecord.from_json(entry)
+            for accession in [record.accession] + entry.get("secondaryAccessions", []):
+                for query in accessions.get(accession, []):
+                    found.setdefault(query, record)
+
+    gene_keys = list(genes)
+    for i in range(0, len(gene_keys), group_size):
+        group = gene_keys[i:i + group_size]
+        or_query = " OR ".join(f"gene_exact:{gene}" for gene in group)
+        try:
+            # Several entries can share a symbol, so leave room for more than one each
+            entries = _search_group(f"({or_query}) AND organism_id:9606", min(500, 10 * len(group)))
+        except requests.exceptions.RequestException as e:
+            print(f"UniProt batch gene lookup error: {str(e)}")
+            continue
+        best = {}
+        for rank, entry in enumerate(entries):
+            record = UniProtRecord.from_json(entry)
+            # Reviewed (Swiss-Prot) entries win, then UniProt's own ranking
+            score = (not record.reviewed, rank)
+            for gene in record.gene_symbols() & set(group):
+                if gene not in best or score < best[gene][0]:
+                    best[gene] = (score, record)
+        for gene, (_, record) in best.items():
+            for query in genes[gene]:
+                found[query] = record
+
+    return found
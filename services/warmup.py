@@ -0,0 +1,193 @@
+"""
+Precompute data for popular proteins so cold instances serve them from cache.
+
+    python -m services.warmup TP53 BRCA1 P00533
+    python -m services.warmup --top 100 --snapshot data/snapshot.json.gz
+    python -m services.warmup --file proteins.txt --sources function,structure
+
+Each protein is resolved in UniProt, then its AlphaFold model, ChEMBL
+compound table and Gemini analysis are fetched through the normal service
+functions, several proteins at a time and rate limited per upstream. That
+fills the persistent caches (the structure store and, with
+LLM_CACHE_BACKEND=sqlite, the Gemini cache); --snapshot also writes a bundle
+that create_app() loads at startup.
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from services import http_client, query_log, structure_store
+from services.alphafold_service import get_alphafold_structure, get_alphafold_pdb
+from services.chembl_service import search_chembl, select_target, get_compound_table
+from services.gemini_service import build_protein_analysis_prompt, cached_query_gemini
+from services.protein_resolver import resolve_protein
+from services.snapshot import write_snapshot
+from utils.query import normalize_query
+
+SOURCES = ("function", "structure", "drugs", "analysis")
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads; rate <= 0 means unlimited."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def warm_protein(query, sources, limiters):
+    """
+    Fetch the requested sources for one protein and return its snapshot entry.
+
+    UniProt, AlphaFold and ChEMBL requests are paced by http_client with the
+    limiters run_warmup installs; only Gemini is paced here.
+    """
+    entry = {"query": normalize_query(query)}
+    errors = {}
+
+    resolved = resolve_protein(query)
+    if resolved.get("error"):
+        entry["error"] = resolved["error"]
+        return entry
+    record = resolved["entry"]
+    accession = resolved["accession"]
+    entry["record"] = record.to_dict()
+
+    if "structure" in sources:
+        alphafold_data = get_alphafold_structure(accession)
+        if isinstance(alphafold_data, dict) and alphafold_data.get("error"):
+            errors["structure"] = alphafold_data["error"]
+        else:
+            entry["alphafold"] = alphafold_data
+            stored = structure_store.get_metadata_entry(accession)
+            if stored is not None:
+                entry["alphafold_validators"] = stored[1]
+            # Downloads the model into the structure store
+            pdb_data = get_alphafold_pdb(alphafold_data)
+            if pdb_data.get("error"):
+                errors["structure"] = pdb_data["error"]
+
+    if "drugs" in sources:
+        chembl_data = search_chembl(query)
+        if chembl_data.get("error"):
+            errors["drugs"] = chembl_data["error"]
+        elif chembl_data.get("targets"):
+            entry["chembl_targets"] = chembl_data
+            target_chembl_id = select_target(chembl_data["targets"]).get("target_chembl_id")
+            if target_chembl_id:
+                try:
+                    entry["compound_table"] = {
+                        "target_chembl_id": target_chembl_id,
+                        "table": get_compound_table(target_chembl_id)
+                    }
+                except requests.exceptions.RequestException as e:
+                    errors["drugs"] = f"Error querying ChEMBL API: {str(e)}"
+
+    if "analysis" in sources:
+        # Same prompt the analysis and full endpoints build, so they hit this cache entry
+        prompt = build_protein_analysis_prompt(record.protein_name or query, accession)
+        limiters["gemini"].acquire()
+        text = cached_query_gemini(prompt)
+        if text is None:
+            errors["analysis"] = "Gemini did not return an analysis"
+        else:
+            entry["analysis"] = {"prompt": prompt, "text": text}
+
+    if errors:
+        entry["errors"] = errors
+    return entry
+
+
+def run_warmup(queries, sources=SOURCES, workers=4, rate=5.0, gemini_rate=1.0):
+    """Warm every query, workers at a time, and return their snapshot entries in input order."""
+    limiters = {
+        "uniprot": RateLimiter(rate),
+        "alphafold": RateLimiter(rate),
+        "chembl": RateLimiter(rate),
+        "gemini": RateLimiter(gemini_rate)
+    }
+
+    def warm(query):
+        started = time.monotonic()
+        try:
+            entry = warm_protein(query, sources, limiters)
+        except Exception as e:
+            entry = {"query": normalize_query(query), "error": str(e)}
+        status = entry.get("error") or ", ".join(f"{k}: {v}" for k, v in entry.get("errors", {}).items()) or "ok"
+        print(f"{query}: {status} ({time.monotonic() - started:.1f}s)")
+        return entry
+
+    # Every upstream request counts, including hedged UniProt lookups and ChEMBL pages
+    http_client.set_rate_limiters({name: limiters[name] for name in ("uniprot", "alphafold", "chembl")})
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup") as executor:
+            return list(executor.map(warm, queries))
+    finally:
+        http_client.set_rate_limiters({})
+
+
+def collect_queries(args):
+    """Queries from the command line, --file and --top, de-duplicated in that order."""
+    queries = list(args.queries)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            queries += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if args.top:
+        since = time.time() - args.days * 24 * 3600 if args.days else None
+        queries += query_log.top_queries(args.top, since=since)
+
+    seen = set()
+    unique = []
+    for query in queries:
+        key = normalize_query(query)
+        if key not in seen:
+            seen.add(key)
+            unique.append(query)
+    return unique
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute data for popular proteins.")
+    parser.add_argument("queries", nargs="*", help="Gene names or UniProt accessions")
+    parser.add_argument("--file", help="File with one query per line")
+    parser.add_argument("--top", type=int, default=0, help="Also warm the N most frequent queries in the query log")
+    parser.add_argument("--days", type=float, default=0, help="Only count query log entries from the last N days")
+    parser.add_argument("--sources", default=",".join(SOURCES), help=f"Comma-separated subset of: {', '.join(SOURCES)}")
+    parser.add_argument("--workers", type=int, default=4, help="Proteins warmed in parallel")
+    parser.add_argument("--rate", type=float, default=5.0, help="Requests per second to each of UniProt, AlphaFold and ChEMBL")
+    parser.add_argument("--gemini-rate", type=float, default=1.0, help="Gemini requests per second")
+    parser.add_argument("--snapshot", nargs="?", const="", default=None,
+                        help="Write a snapshot bundle (to Config.SNAPSHOT_PATH if no path is given)")
+    args = parser.parse_args()
+
+    sources = {source.strip() for source in args.sources.split(",") if source.strip()}
+    unknown = sources - set(SOURCES)
+    if unknown:
+        parser.error(f"Unknown sources: {', '.join(sorted(unknown))}")
+
+    queries = collect_queries(args)
+    if not queries:
+        parser.error("No queries given (pass names, --file or --top)")
+
+    started = time.monotonic()
+    entries = run_warmup(queries, sources, args.workers, args.rate, args.gemini_rate)
+    warmed = sum(1 for entry in entries if "record" in entry)
+    print(f"Warmed {warmed} of {len(entries)} proteins in {time.monotonic() - started:.1f}s")
+
+    if args.snapshot is not None:
+        path = write_snapshot([entry for entry in entries if "record" in entry], args.snapshot or None)
+        print(f"Wrote snapshot to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -63,10 +63,17 @@ def get_drug_associations(protein_name):
         st.error(f"Error getting drug associations: {e}")
         return {"error": str(e)}
 
-def send_chat_message(messages):
-    """Send a chat message to the backend conversation API."""
+def send_chat_message(message, session_id=None, protein=None, history=None):
+    """
+    Send a chat message to the backend conversation API, which keeps the history under session_id.
+
+    When the server no longer knows the session (it expired, or another
+    instance served it) the message is resent with history to start a new one.
+    """
     try:
-        response = requests.post(f"{API_BASE_URL}/conversation", json={"messages": messages})
+        response = requests.post(f"{API_BASE_URL}/conversation", json={"session_id": session_id, "message": message, "protein": protein})
+        if response.status_code == 409 and response.json().get("session_restarted"):
+            response = requests.post(f"{API_BASE_URL}/conversation", json={"message": message, "protein": protein, "history": history or []})
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -90,6 +97,9 @@ def display_protein_structure(pdb_data):
 if "chat_messages" not in st.session_state:
     st.session_state.chat_messages = []
     
+if "session_id" not in st.session_state:
+    st.session_state.session_id = None
+
 if "current_protein" not in st.session_state:
     st.session_state.current_protein = None
 
@@ -248,12 +258,17 @@ with tab2:
         # Add to chat history
         st.session_state.chat_messages.append({"role": "user", "content": prompt})
         
-        # Prepare messages for API - just the content
-        messages_content = [msg["content"] for msg in st.session_state.chat_messages]
-        
-        # Get response from backend
+        # Get response from backend; only the new message is sent
         with st.spinner("Thinking..."):
-            response = send_chat_message(messages_content)
+            # Completed turns only, in case the server needs them to start a new session
+            earlier = st.session_state.chat_messages[:-1]
+            history = []
+            for asked, answered in zip(earlier, earlier[1:]):
+                if asked["role"] == "user" and answered["role"] == "assistant":
+                    history += [asked["content"], answered["content"]]
+            response = send_chat_message(prompt, st.session_state.session_id, st.session_state.current_protein, history)
+            if response.get("session_id"):
+                st.session_state.session_id = response["session_id"]
             
             if "response" in response:
                 # Display assistant response
@@ -0,0 +1,108 @@
+import unittest
+from unittest import mock
+import requests
+from config import Config
+from services import circuit_breaker, http_client
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class ProbeTokenTest(unittest.TestCase):
+    def setUp(self):
+        self.now = [1000.0]
+        patch = mock.patch.object(circuit_breaker.time, "monotonic", side_effect=lambda: self.now[0])
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.breaker = CircuitBreaker("test", slow_call_seconds=10)
+
+    def trip(self):
+        for _ in range(Config.CIRCUIT_MIN_CALLS):
+            self.breaker.record(False, 0, self.breaker.before_call())
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def half_open(self):
+        self.now[0] += Config.CIRCUIT_RESET_TIMEOUT
+        return self.breaker.before_call()
+
+    def test_closed_calls_get_no_token(self):
+        self.assertIsNone(self.breaker.before_call())
+
+    def test_open_breaker_rejects_until_reset_timeout(self):
+        self.trip()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.assertIsNotNone(self.half_open())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+    def test_only_admitted_probes_go_through(self):
+        self.trip()
+        self.half_open()
+        for _ in range(Config.CIRCUIT_HALF_OPEN_PROBES - 1):
+            self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_call_admitted_before_opening_cannot_close(self):
+        earlier = self.breaker.before_call()
+        self.trip()
+        probe = self.half_open()
+        self.breaker.record(True, 0, earlier)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.record(True, 0, probe)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_probe_reopens(self):
+        self.trip()
+        probe = self.half_open()
+        self.breaker.record(False, 0, probe)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_probe_from_an_earlier_half_open_period_is_ignored(self):
+        self.trip()
+        old_probe = self.half_open()
+        self.breaker.record(False, 0, old_probe)
+        probe = self.half_open()
+        self.breaker.record(True, 0, old_probe)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.record(True, 0, probe)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+class HttpClientProbeTest(unittest.TestCase):
+    URL = f"{Config.UNIPROT_BASE_URL}/search"
+
+    def setUp(self):
+        self.breaker = CircuitBreaker("uniprot", slow_call_seconds=10)
+        patch = mock.patch.object(http_client, "breaker_for_url", return_value=self.breaker)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.addCleanup(http_client.set_rate_limiters, {})
+        # Open, then past the reset timeout so the next call is the probe
+        for _ in range(Config.CIRCUIT_MIN_CALLS):
+            self.breaker.record(False, 0, self.breaker.before_call())
+        self.breaker.opened_at -= Config.CIRCUIT_RESET_TIMEOUT
+
+    def test_limiter_failure_does_not_take_the_probe(self):
+        limiter = mock.Mock()
+        limiter.acquire.side_effect = RuntimeError("limiter")
+        http_client.set_rate_limiters({"uniprot": limiter})
+        with self.assertRaises(RuntimeError):
+            http_client.get(self.URL)
+        http_client.set_rate_limiters({})
+
+        session = mock.Mock()
+        session.get.return_value = mock.Mock(status_code=200, content=b"{}")
+        with mock.patch.object(http_client, "get_session", return_value=session):
+            http_client.get(self.URL)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_request_records_the_probe(self):
+        session = mock.Mock()
+        session.get.side_effect = requests.exceptions.ConnectionError("down")
+        with mock.patch.object(http_client, "get_session", return_value=session):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                http_client.get(self.URL)
+        self.assertEqual(self.breaker.state, OPEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
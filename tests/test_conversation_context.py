@@ -0,0 +1,144 @@
+import unittest
+from unittest import mock
+from config import Config
+from models.uniprot_record import UniProtRecord
+from services import conversation_context, protein_resolver
+from services.conversation_context import build_context_prompt, protein_facts
+
+
+class ImmediateExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def history(count, size=10):
+    return [f"m{i}:" + "x" * size for i in range(count)]
+
+
+class ContextTestCase(unittest.TestCase):
+    def setUp(self):
+        conversation_context._summaries.clear()
+        self.addCleanup(conversation_context._summaries.clear)
+        protein_resolver.clear_cache()
+        self.addCleanup(protein_resolver.clear_cache)
+
+    def configure(self, **settings):
+        for name, value in settings.items():
+            patch = mock.patch.object(Config, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+
+class BudgetTest(ContextTestCase):
+    def test_oldest_messages_are_dropped_past_the_budget(self):
+        # Four 100-character messages cost 26 tokens each; 60 tokens keeps two
+        self.configure(CONVERSATION_RECENT_MESSAGES=100, CONVERSATION_HISTORY_TOKENS=60)
+        messages = history(4, size=97) + ["question"]
+        prompt, stats = build_context_prompt(messages)
+        self.assertEqual(stats["verbatim_messages"], 2)
+        self.assertEqual(stats["dropped_messages"], 2)
+        self.assertNotIn("m1:", prompt)
+        self.assertIn("m2:", prompt)
+        self.assertIn("m3:", prompt)
+
+    def test_latest_message_is_kept_even_over_budget(self):
+        self.configure(CONVERSATION_RECENT_MESSAGES=100, CONVERSATION_HISTORY_TOKENS=1)
+        prompt, stats = build_context_prompt(history(2) + ["question"])
+        self.assertEqual(stats["verbatim_messages"], 1)
+
+    def test_long_messages_are_truncated(self):
+        self.configure(CONVERSATION_MESSAGE_MAX_CHARS=20)
+        prompt, stats = build_context_prompt(["y" * 100, "answer", "question"])
+        self.assertIn("y" * 20 + " [...]", prompt)
+        self.assertNotIn("y" * 21, prompt)
+
+
+class SummaryTest(ContextTestCase):
+    def setUp(self):
+        super().setUp()
+        self.configure(CONVERSATION_RECENT_MESSAGES=2, CONVERSATION_SUMMARY_BATCH=2)
+        patches = [
+            mock.patch.object(conversation_context, "_executor", ImmediateExecutor()),
+            mock.patch.object(conversation_context, "query_gemini", return_value="the summary")
+        ]
+        self.gemini = patches[1].start()
+        patches[0].start()
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def test_older_turns_are_folded_into_a_summary(self):
+        messages = history(4) + ["question"]
+        build_context_prompt(messages, "session")
+        self.gemini.assert_called_once()
+
+        prompt, stats = build_context_prompt(messages, "session")
+        self.assertEqual(stats["summarized_messages"], 2)
+        self.assertEqual(stats["verbatim_messages"], 2)
+        self.assertIn("the summary", prompt)
+        self.assertNotIn("m0:", prompt)
+        self.assertEqual(self.gemini.call_count, 1)
+
+    def test_summary_is_not_reused_for_an_edited_history(self):
+        messages = history(4) + ["question"]
+        build_context_prompt(messages, "session")
+        edited = ["changed"] + messages[1:]
+        with mock.patch.object(conversation_context, "schedule_summary"):
+            prompt, stats = build_context_prompt(edited, "session")
+        self.assertEqual(stats["summarized_messages"], 0)
+        self.assertNotIn("the summary", prompt)
+
+    def test_summaries_are_kept_per_conversation(self):
+        messages = history(4) + ["question"]
+        build_context_prompt(messages, "session")
+        with mock.patch.object(conversation_context, "schedule_summary"):
+            prompt, stats = build_context_prompt(messages, "other")
+        self.assertEqual(stats["summarized_messages"], 0)
+
+
+class ProteinFactsTest(ContextTestCase):
+    def test_cached_protein_adds_its_facts(self):
+        protein_resolver.prime("p53", UniProtRecord.from_json({
+            "primaryAccession": "P04637",
+            "proteinDescription": {"recommendedName": {"fullName": {"value": "Cellular tumor antigen p53"}}},
+            "genes": [{"geneName": {"value": "TP53"}}]
+        }))
+        facts = protein_facts("p53")
+        self.assertIn("UniProt P04637", facts)
+        self.assertIn("gene TP53", facts)
+
+    def test_uncached_protein_falls_back_to_its_name(self):
+        self.assertEqual(protein_facts("p53"), "p53")
+        prompt, stats = build_context_prompt(["question"], protein="p53")
+        self.assertIn("Protein the user is exploring: p53", prompt)
+
+    def test_no_protein(self):
+        self.assertIsNone(protein_facts(None))
+
+
+class ConversationValidationTest(unittest.TestCase):
+    def setUp(self):
+        from app import app
+        self.client = app.test_client()
+        patch = mock.patch("routes.api.query_gemini", return_value="reply")
+        self.gemini = patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_empty_message_is_rejected(self):
+        for message in ("", "   ", None, 3):
+            with self.subTest(message=message):
+                response = self.client.post("/api/conversation", json={"message": message, "messages": ["hi"]})
+                self.assertEqual(response.status_code, 400)
+        self.gemini.assert_not_called()
+
+    def test_missing_message_is_rejected(self):
+        self.assertEqual(self.client.post("/api/conversation", json={}).status_code, 400)
+        self.assertEqual(self.client.post("/api/conversation", json=["hi"]).status_code, 400)
+
+    def test_legacy_messages_form(self):
+        data = self.client.post("/api/conversation", json={"messages": ["hi"]}).get_json()
+        self.assertEqual(data["response"], "reply")
+        self.assertNotIn("session_id", data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import gzip
+import json
+import unittest
+from unittest import mock
+from werkzeug.datastructures import Headers
+from config import Config
+from utils import http_cache
+from utils.http_cache import DEGRADED_HEADER, cache_response, is_degraded
+
+ROUTE = "/api/protein/<protein_name>"
+BODY = json.dumps({"protein": "p53", "function": {"function": "x" * 2000}}).encode("utf-8")
+
+
+def respond(body=BODY, headers=None, if_none_match="", accept_encoding="", route=ROUTE):
+    headers = Headers(headers or {})
+    status, body = cache_response("GET", route, 200, body, "application/json", headers, if_none_match, accept_encoding)
+    return status, body, headers
+
+
+class CacheResponseTest(unittest.TestCase):
+    def setUp(self):
+        http_cache._compressed.clear()
+
+    def test_matching_etag_gets_304(self):
+        status, body, headers = respond()
+        self.assertEqual(status, 200)
+        status, body, _ = respond(if_none_match=headers["ETag"])
+        self.assertEqual((status, body), (304, b""))
+        # If-None-Match uses the weak comparison
+        status, _, _ = respond(if_none_match=f"W/{headers['ETag']}")
+        self.assertEqual(status, 304)
+
+    def test_each_encoding_gets_its_own_etag(self):
+        _, plain, plain_headers = respond()
+        _, zipped, gzip_headers = respond(accept_encoding="gzip")
+        self.assertEqual(gzip_headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(zipped), plain)
+        self.assertNotEqual(plain_headers["ETag"], gzip_headers["ETag"])
+        self.assertEqual(gzip_headers["Vary"], "Accept-Encoding")
+        # A cached plain copy does not validate a gzip'd request
+        status, _, _ = respond(if_none_match=plain_headers["ETag"], accept_encoding="gzip")
+        self.assertEqual(status, 200)
+        status, _, _ = respond(if_none_match=gzip_headers["ETag"], accept_encoding="gzip")
+        self.assertEqual(status, 304)
+
+    def test_successful_response_gets_the_route_policy(self):
+        _, _, headers = respond()
+        self.assertEqual(headers["Cache-Control"], f"public, max-age={Config.HTTP_CACHE_PROTEIN_MAX_AGE}")
+
+    def test_degraded_response_is_no_cache_and_marker_removed(self):
+        _, _, headers = respond(headers={DEGRADED_HEADER: "1"})
+        self.assertEqual(headers["Cache-Control"], "no-cache")
+        self.assertNotIn(DEGRADED_HEADER, headers)
+
+    def test_error_text_in_a_body_does_not_disable_caching(self):
+        body = json.dumps({"analysis": {"text": 'Responses look like {"error": "..."}'}}).encode("utf-8")
+        _, _, headers = respond(body=body, route="/api/protein/<protein_name>/analysis")
+        self.assertEqual(headers["Cache-Control"], f"public, max-age={Config.HTTP_CACHE_ANALYSIS_MAX_AGE}")
+
+    def test_compressed_bodies_are_reused(self):
+        with mock.patch.object(http_cache.gzip, "compress", wraps=gzip.compress) as compress:
+            respond(accept_encoding="gzip")
+            respond(accept_encoding="gzip")
+        self.assertEqual(compress.call_count, 1)
+
+
+class IsDegradedTest(unittest.TestCase):
+    def test_payloads(self):
+        self.assertFalse(is_degraded({"protein": "p53", "function": {"function": "..."}}))
+        self.assertFalse(is_degraded({"protein": "p53", "errors": {}}))
+        self.assertTrue(is_degraded({"protein": "p53", "function": {"error": "UniProt is down"}}))
+        self.assertTrue(is_degraded({"protein": "p53", "errors": {"drugs": "Timed out after 10s"}}))
+        self.assertTrue(is_degraded({"protein_name": "p53", "error": "No AlphaFold model"}))
+
+
+class RouteMarkerTest(unittest.TestCase):
+    def setUp(self):
+        from app import app
+        self.client = app.test_client()
+
+    def get(self, function_data):
+        with mock.patch("routes.api.get_protein_function", return_value=function_data):
+            return self.client.get("/api/protein/p53")
+
+    def test_degraded_route_is_no_cache(self):
+        response = self.get({"error": "UniProt is down"})
+        self.assertEqual(response.headers["Cache-Control"], "no-cache")
+        self.assertNotIn(DEGRADED_HEADER, response.headers)
+
+    def test_healthy_route_is_cached(self):
+        response = self.get({"function": "Acts as a tumor suppressor."})
+        self.assertEqual(response.headers["Cache-Control"], f"public, max-age={Config.HTTP_CACHE_PROTEIN_MAX_AGE}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from services.protein_index import ProteinIndex, build_index, split_protein_names
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "uniprot_human_sample.tsv")
+
+
+class ProteinIndexTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.tmp.name, "protein_index.bin")
+        cls.count = build_index(FIXTURE, path)
+        cls.index = ProteinIndex(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.index.close()
+        cls.tmp.cleanup()
+
+    def test_every_row_is_indexed(self):
+        self.assertEqual(self.count, 5)
+        self.assertEqual(len(self.index), 5)
+
+    def test_accession_gene_and_name_lookups(self):
+        self.assertEqual(self.index.lookup("p04637").accession, "P04637")
+        self.assertEqual(self.index.lookup(" tp53 ").accession, "P04637")
+        self.assertEqual(self.index.lookup("p53_human").accession, "P04637")
+        self.assertEqual(self.index.lookup("Double minute 2 protein").accession, "Q00987")
+        self.assertIsNone(self.index.lookup("not a protein"))
+
+    def test_isoform_resolves_to_canonical_entry(self):
+        self.assertEqual(self.index.lookup("P04637-2").accession, "P04637")
+
+    def test_gene_symbol_ranks_above_names(self):
+        # INS is insulin's gene symbol and an alternative name of IRS1, whose annotation score is higher
+        self.assertEqual(self.index.lookup("INS").accession, "P01308")
+
+    def test_ec_numbers_are_dropped(self):
+        entry = self.index.lookup("P00734")
+        self.assertEqual(entry.alternative_names, ["Coagulation factor II"])
+        self.assertIsNone(self.index.lookup("EC 3.4.21.5"))
+        self.assertIsNone(self.index.lookup("EC 2.3.2.27"))
+
+    def test_cleaved_chains_are_dropped(self):
+        entry = self.index.lookup("P01308")
+        self.assertEqual(entry.protein_name, "Insulin")
+        self.assertEqual(entry.alternative_names, [])
+
+
+class SplitProteinNamesTest(unittest.TestCase):
+    def test_parenthesized_word_stays_in_the_name(self):
+        self.assertEqual(
+            split_protein_names("Sodium/potassium-transporting ATPase Na(+) pump (EC 7.2.2.13) (Na(+)/K(+) ATPase)"),
+            ("Sodium/potassium-transporting ATPase Na(+) pump", ["Na(+)/K(+) ATPase"])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+from config import Config
+from models.uniprot_record import UniProtRecord
+from services import protein_resolver, revalidation
+from services.revalidation import EXPIRED, FRESH, NOT_MODIFIED, STALE, RevalidatingCache, freshness
+
+TTL = 60
+
+
+def wait_for_revalidation():
+    deadline = time.monotonic() + 5
+    while revalidation._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class FreshnessTest(unittest.TestCase):
+    def test_states(self):
+        now = time.time()
+        self.assertEqual(freshness(now - TTL + 1, TTL), FRESH)
+        self.assertEqual(freshness(now - TTL - 1, TTL), STALE)
+        self.assertEqual(freshness(now - TTL - Config.REVALIDATE_MAX_STALE - 1, TTL), EXPIRED)
+
+
+class RevalidatingCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = RevalidatingCache("test", 16, TTL)
+
+    def store(self, age, value="old", validators=None):
+        self.cache.store("key", value, validators or {"etag": '"v1"'}, fetched_at=time.time() - age)
+
+    def test_miss_loads_unconditionally(self):
+        load = mock.Mock(return_value=("new", {"etag": '"v2"'}))
+        self.assertEqual(self.cache.get("key", load), "new")
+        load.assert_called_once_with(None)
+        self.assertEqual(self.cache.lookup("key"), ("new", {"etag": '"v2"'}, FRESH))
+
+    def test_fresh_entry_is_served_without_loading(self):
+        self.store(age=0)
+        load = mock.Mock()
+        self.assertEqual(self.cache.get("key", load), "old")
+        load.assert_not_called()
+
+    def test_stale_entry_is_served_and_revalidated_in_background(self):
+        self.store(age=TTL + 1)
+        load = mock.Mock(return_value=("new", {"etag": '"v2"'}))
+        self.assertEqual(self.cache.get("key", load), "old")
+        wait_for_revalidation()
+        load.assert_called_once_with({"etag": '"v1"'})
+        self.assertEqual(self.cache.lookup("key"), ("new", {"etag": '"v2"'}, FRESH))
+
+    def test_not_modified_keeps_the_value_and_renews_it(self):
+        self.store(age=TTL + 1)
+        self.assertEqual(self.cache.get("key", lambda validators: NOT_MODIFIED), "old")
+        wait_for_revalidation()
+        self.assertEqual(self.cache.lookup("key"), ("old", {"etag": '"v1"'}, FRESH))
+
+    def test_failed_revalidation_keeps_serving_the_stale_value(self):
+        self.store(age=TTL + 1)
+        self.cache.get("key", lambda validators: {"error": "UniProt is down"})
+        wait_for_revalidation()
+        self.assertEqual(self.cache.lookup("key")[::2], ("old", STALE))
+
+    def test_expired_entry_waits_on_a_conditional_load(self):
+        self.store(age=TTL + Config.REVALIDATE_MAX_STALE + 1)
+        load = mock.Mock(return_value=NOT_MODIFIED)
+        self.assertEqual(self.cache.get("key", load), "old")
+        load.assert_called_once_with({"etag": '"v1"'})
+        self.assertEqual(self.cache.lookup("key")[2], FRESH)
+
+    def test_expired_entry_error_is_returned_and_not_cached(self):
+        self.store(age=TTL + Config.REVALIDATE_MAX_STALE + 1)
+        error = {"error": "UniProt is down"}
+        self.assertEqual(self.cache.get("key", lambda validators: error), error)
+        self.assertEqual(self.cache.lookup("key")[::2], ("old", EXPIRED))
+
+    def test_one_background_revalidation_per_key(self):
+        self.store(age=TTL + 1)
+        release = threading.Event()
+        calls = []
+
+        def load(validators):
+            calls.append(validators)
+            release.wait(5)
+            return NOT_MODIFIED
+
+        for _ in range(3):
+            self.assertEqual(self.cache.get("key", load), "old")
+        release.set()
+        wait_for_revalidation()
+        self.assertEqual(len(calls), 1)
+
+    def test_async_get_loads_expired_entries_with_the_async_loader(self):
+        self.store(age=TTL + Config.REVALIDATE_MAX_STALE + 1)
+        load = mock.Mock()
+
+        async def async_load(validators):
+            return "new", {}
+
+        self.assertEqual(asyncio.run(self.cache.async_get("key", async_load, load)), "new")
+        load.assert_not_called()
+
+
+class ResolverCacheTest(unittest.TestCase):
+    ENTRY = {"primaryAccession": "P04637", "uniProtkbId": "P53_HUMAN"}
+
+    def setUp(self):
+        protein_resolver.clear_cache()
+        self.addCleanup(protein_resolver.clear_cache)
+
+    def test_single_lookups_defer_to_the_search_cache(self):
+        with mock.patch.object(Config, "RESOLVER_CACHE_TTL", 0), \
+                mock.patch.object(protein_resolver, "search_uniprot", return_value={"results": [self.ENTRY]}) as search:
+            protein_resolver.resolve_protein("p53")
+            protein_resolver.resolve_protein("p53")
+        # Every call reaches search_uniprot, whose cache decides freshness
+        self.assertEqual(search.call_count, 2)
+
+    def test_primed_entries_are_kept_for_the_cache_expiry(self):
+        protein_resolver.prime("p53", UniProtRecord.from_json(self.ENTRY))
+        with mock.patch.object(protein_resolver, "search_uniprot") as search:
+            self.assertEqual(protein_resolver.resolve_protein("p53")["accession"], "P04637")
+        search.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from config import Config
+from services import session_store
+from services.session_store import MemoryBackend, SQLiteBackend
+
+
+class MemoryBackendTest(unittest.TestCase):
+    def test_sessions_expire_after_ttl(self):
+        store = MemoryBackend(1024 ** 2, ttl=0.05)
+        store.append("a", ["hi", "hello"])
+        self.assertEqual(store.get("a"), ["hi", "hello"])
+        time.sleep(0.1)
+        self.assertIsNone(store.get("a"))
+
+    def test_least_recently_used_sessions_go_past_max_bytes(self):
+        # Each session holds 200 characters plus 64 bytes of overhead
+        store = MemoryBackend(600, ttl=60)
+        store.append("a", ["x" * 100, "y" * 100])
+        store.append("b", ["x" * 100, "y" * 100])
+        store.append("c", ["x" * 100, "y" * 100])
+        self.assertIsNone(store.get("a"))
+        self.assertIsNotNone(store.get("b"))
+        self.assertIsNotNone(store.get("c"))
+
+    def test_oldest_turns_are_dropped_past_max_messages(self):
+        store = MemoryBackend(1024 ** 2, ttl=60)
+        with mock.patch.object(Config, "SESSION_MAX_MESSAGES", 4):
+            for turn in range(3):
+                store.append("a", [f"q{turn}", f"a{turn}"])
+        self.assertEqual(store.get("a"), ["q1", "a1", "q2", "a2"])
+
+
+class SQLiteBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sessions.sqlite3")
+        self.now = [1000.0]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def clock(self):
+        return mock.patch.object(session_store.time, "time", side_effect=lambda: self.now[0])
+
+    def test_sessions_expire_after_ttl(self):
+        store = SQLiteBackend(self.path, 1024 ** 2, ttl=60)
+        with self.clock():
+            store.append("a", ["hi", "hello"])
+            self.now[0] += 59
+            self.assertEqual(store.get("a"), ["hi", "hello"])
+            self.now[0] += 2
+            self.assertIsNone(store.get("a"))
+            self.assertEqual(len(store), 0)
+
+    def test_least_recently_used_sessions_go_past_max_bytes(self):
+        store = SQLiteBackend(self.path, 600, ttl=60)
+        with self.clock():
+            for session_id in ("a", "b", "c"):
+                store.append(session_id, ["x" * 100, "y" * 100])
+                self.now[0] += 1
+            self.assertIsNone(store.get("a"))
+            self.assertIsNotNone(store.get("b"))
+            self.assertIsNotNone(store.get("c"))
+
+    def test_oldest_turns_are_dropped_past_max_messages(self):
+        store = SQLiteBackend(self.path, 1024 ** 2, ttl=60)
+        with mock.patch.object(Config, "SESSION_MAX_MESSAGES", 4):
+            for turn in range(3):
+                store.append("a", [f"q{turn}", f"a{turn}"])
+        self.assertEqual(store.get("a"), ["q1", "a1", "q2", "a2"])
+
+    def test_concurrent_appends_keep_every_turn(self):
+        store = SQLiteBackend(self.path, 1024 ** 2, ttl=60)
+
+        def worker(number):
+            for turn in range(5):
+                store.append("a", [f"q{number}.{turn}", f"a{number}.{turn}"])
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        messages = store.get("a")
+        self.assertEqual(len(messages), 80)
+        self.assertEqual(len(set(messages)), 80)
+
+
+class ConversationRouteTest(unittest.TestCase):
+    def setUp(self):
+        from app import app
+        self.client = app.test_client()
+        self.store = MemoryBackend(1024 ** 2, ttl=60)
+        patches = [
+            mock.patch("routes.api.get_session_store", return_value=self.store),
+            mock.patch("routes.api.query_gemini", return_value="reply")
+        ]
+        self.gemini = patches[1].start()
+        patches[0].start()
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def test_new_session_stores_the_turn(self):
+        data = self.client.post("/api/conversation", json={"message": "hi"}).get_json()
+        self.assertFalse(data["session_restarted"])
+        self.assertEqual(self.store.get(data["session_id"]), ["hi", "reply"])
+
+    def test_unknown_session_asks_for_history(self):
+        response = self.client.post("/api/conversation", json={"session_id": "gone", "message": "next"})
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.get_json()["session_restarted"])
+        self.gemini.assert_not_called()
+
+    def test_history_seeds_a_new_session(self):
+        response = self.client.post(
+            "/api/conversation", json={"session_id": "gone", "message": "next", "history": ["hi", "hello"]}
+        )
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data["session_restarted"])
+        self.assertNotEqual(data["session_id"], "gone")
+        self.assertEqual(self.store.get(data["session_id"]), ["hi", "hello", "next", "reply"])
+        self.assertIn("hello", self.gemini.call_args.args[0])
+
+    def test_unpaired_history_is_rejected(self):
+        response = self.client.post("/api/conversation", json={"message": "next", "history": ["hi"]})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from config import Config
+from services import single_flight
+from services.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def run_concurrently(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def run(number):
+        try:
+            results[number] = target()
+        except Exception as e:
+            errors[number] = e
+
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+        assert not thread.is_alive(), "a caller is still waiting"
+    return results, errors
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch.object(Config, "SINGLE_FLIGHT_DIR", "")
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_followers_share_the_leader_result(self):
+        group = SingleFlight("test")
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"value": 1}
+
+        leader = threading.Thread(target=group.do, args=("key", fetch))
+        leader.start()
+        started.wait(5)
+        # Followers join while the leader is still in flight
+        threading.Timer(0.1, release.set).start()
+        results, errors = run_concurrently(4, lambda: group.do("key", fetch))
+        leader.join(5)
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [{"value": 1}] * 4)
+        self.assertEqual(errors, [None] * 4)
+        self.assertEqual(group.shared, 4)
+        # Followers get copies, not the leader's object
+        self.assertIsNot(results[0], results[1])
+
+    def test_leader_error_reaches_followers(self):
+        group = SingleFlight("test")
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch():
+            started.set()
+            release.wait(5)
+            raise ValueError("upstream failed")
+
+        leader = threading.Thread(target=lambda: self.assertRaises(ValueError, group.do, "key", fetch))
+        leader.start()
+        started.wait(5)
+        threading.Timer(0.1, release.set).start()
+        results, errors = run_concurrently(3, lambda: group.do("key", fetch))
+        leader.join(5)
+
+        self.assertEqual(results, [None] * 3)
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+        # The failed call is not reused by the next caller
+        self.assertEqual(group.do("key", lambda: "fresh"), "fresh")
+
+    def test_follower_calls_upstream_after_timeout(self):
+        group = SingleFlight("test", timeout=0.05)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "leader"
+
+        leader = threading.Thread(target=group.do, args=("key", slow))
+        leader.start()
+        started.wait(5)
+        try:
+            self.assertEqual(group.do("key", lambda: "follower"), "follower")
+        finally:
+            release.set()
+            leader.join(5)
+        self.assertEqual(group.shared, 0)
+
+
+@unittest.skipIf(single_flight.fcntl is None, "cross-process coalescing needs fcntl")
+class CrossProcessTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patch = mock.patch.object(Config, "SINGLE_FLIGHT_DIR", self.tmp.name)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_published_result_is_reused_by_another_process(self):
+        # Two groups with the same name stand in for two worker processes
+        first, second = SingleFlight("test"), SingleFlight("test")
+        self.assertEqual(first.do("key", lambda: {"value": 1}), {"value": 1})
+        fetch = mock.Mock(return_value={"value": 2})
+        self.assertEqual(second.do("key", fetch), {"value": 1})
+        fetch.assert_not_called()
+        self.assertEqual(second.shared, 1)
+
+    def test_expired_result_is_not_reused(self):
+        first, second = SingleFlight("test"), SingleFlight("test")
+        first.do("key", lambda: {"value": 1})
+        later = time.time() + Config.SINGLE_FLIGHT_RESULT_TTL + 1
+        with mock.patch.object(single_flight.time, "time", return_value=later):
+            self.assertEqual(second.do("key", lambda: {"value": 2}), {"value": 2})
+
+    def test_errors_are_not_published(self):
+        first, second = SingleFlight("test"), SingleFlight("test")
+        first.do("key", lambda: {"error": "UniProt is down"})
+        self.assertEqual(second.do("key", lambda: {"value": 2}), {"value": 2})
+
+
+class AsyncSingleFlightTest(unittest.TestCase):
+    def test_followers_share_the_leader_result(self):
+        group = AsyncSingleFlight("test")
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"value": 1}
+
+        async def main():
+            return await asyncio.gather(*(group.do("key", fetch) for _ in range(4)))
+
+        self.assertEqual(asyncio.run(main()), [{"value": 1}] * 4)
+        self.assertEqual(calls, [1])
+        self.assertEqual(group.shared, 3)
+
+    def test_leader_error_reaches_followers(self):
+        group = AsyncSingleFlight("test")
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            raise ValueError("upstream failed")
+
+        async def main():
+            return await asyncio.gather(*(group.do("key", fetch) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(group._calls, {})
+
+    def test_follower_calls_upstream_after_timeout(self):
+        group = AsyncSingleFlight("test", timeout=0.05)
+
+        async def slow():
+            await asyncio.sleep(0.5)
+            return "leader"
+
+        async def fast():
+            return "follower"
+
+        async def main():
+            leader = asyncio.ensure_future(group.do("key", slow))
+            await asyncio.sleep(0)
+            follower = await group.do("key", fast)
+            leader.cancel()
+            return follower
+
+        self.assertEqual(asyncio.run(main()), "follower")
+
+
+if __name__ == "__main__":
+    unittest.main()
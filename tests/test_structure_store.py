@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from config import Config
+from services import structure_store
+
+
+class StructureStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.addCleanup(setattr, structure_store, "_store_dir", (None, None))
+
+    def use(self, directory, temp_dir=None):
+        patches = [
+            mock.patch.object(Config, "STRUCTURE_STORE_DIR", directory),
+            mock.patch.object(structure_store.tempfile, "gettempdir", return_value=temp_dir or self.tmp)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_model_round_trip(self):
+        self.use(os.path.join(self.tmp, "structures"))
+        structure_store.put_model("P04637", 4, "ATOM\nEND\n")
+        self.assertEqual(structure_store.read_model("P04637", 4), "ATOM\nEND\n")
+        self.assertIsNone(structure_store.read_model("P04637", 3))
+
+    def test_unwritable_directory_falls_back_to_temp_dir(self):
+        blocker = os.path.join(self.tmp, "file")
+        open(blocker, "w").close()
+        self.use(os.path.join(blocker, "structures"))
+        self.assertTrue(structure_store.is_enabled())
+        structure_store.put_model("P04637", 4, "ATOM\nEND\n")
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, "aminoverse-structures", "AF-P04637-v4.pdb.gz")))
+
+    def test_store_is_disabled_when_no_directory_is_writable(self):
+        blocker = os.path.join(self.tmp, "file")
+        open(blocker, "w").close()
+        self.use(os.path.join(blocker, "structures"), temp_dir=blocker)
+        self.assertFalse(structure_store.is_enabled())
+        structure_store.put_model("P04637", 4, "ATOM\nEND\n")
+        self.assertIsNone(structure_store.read_model("P04637", 4))
+        self.assertIsNone(structure_store.get_metadata("P04637"))
+
+
+if __name__ == "__main__":
+    unittest.main()
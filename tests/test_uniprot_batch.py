@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+from services import uniprot_service
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+        self.status_code = 200
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+ENTRY = {
+    "primaryAccession": "P04637",
+    "uniProtkbId": "P53_HUMAN",
+    "secondaryAccessions": ["Q15086", "Q15087"],
+    "proteinDescription": {"recommendedName": {"fullName": {"value": "Cellular tumor antigen p53"}}},
+    "genes": [{"geneName": {"value": "TP53"}}],
+    "organism": {"scientificName": "Homo sapiens"},
+    "entryType": "UniProtKB reviewed (Swiss-Prot)"
+}
+
+
+class SearchUniprotBatchTest(unittest.TestCase):
+    def test_resolves_secondary_accession(self):
+        with mock.patch.object(uniprot_service.http_client, "get", return_value=FakeResponse({"results": [ENTRY]})) as get:
+            found = uniprot_service.search_uniprot_batch(["q15086"])
+
+        self.assertEqual(found["q15086"].accession, "P04637")
+        params = get.call_args.kwargs["params"]
+        self.assertIn("sec_acc", params["fields"].split(","))
+        self.assertEqual(params["query"], "accession:Q15086")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+import requests
+from config import Config
+from services import uniprot_service
+
+try:
+    import httpx
+except ImportError:  # Only installed with requirements-asgi.txt
+    httpx = None
+
+QUERY = "tumor suppressor p53"
+ENTRY = {"primaryAccession": "P04637", "uniProtkbId": "P53_HUMAN"}
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+        self.status_code = 200
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeUniProt:
+    """Answers the full-text search after search_delay and the gene fallback at once."""
+
+    def __init__(self, search_delay=0.0, search_results=(), error=None):
+        self.search_delay = search_delay
+        self.search_results = list(search_results)
+        self.error = error
+        self.calls = []
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def strategy(self, params):
+        return "gene_fallback" if params["query"].startswith("gene:") else "search"
+
+    def respond(self, name):
+        if self.error is not None:
+            raise self.error
+        if name == "search":
+            return FakeResponse({"results": self.search_results})
+        return FakeResponse({"results": [ENTRY]})
+
+    def get(self, url, params=None, **kwargs):
+        name = self.strategy(params)
+        with self.lock:
+            self.calls.append((name, time.monotonic() - self.started))
+        if name == "search":
+            time.sleep(self.search_delay)
+        return self.respond(name)
+
+    async def async_get(self, url, params=None, **kwargs):
+        name = self.strategy(params)
+        self.calls.append((name, time.monotonic() - self.started))
+        if name == "search":
+            await asyncio.sleep(self.search_delay)
+        return self.respond(name)
+
+
+class SearchStrategyTest(unittest.TestCase):
+    def use(self, strategy, upstream, delay=0.05):
+        patches = [
+            mock.patch.object(Config, "UNIPROT_SEARCH_STRATEGY", strategy),
+            mock.patch.object(Config, "UNIPROT_HEDGE_DELAY", delay),
+            mock.patch.object(uniprot_service.http_client, "get", side_effect=upstream.get),
+            mock.patch.object(uniprot_service.http_client, "async_get", side_effect=upstream.async_get)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_sequential_waits_for_each_strategy(self):
+        upstream = FakeUniProt(search_delay=0.15)
+        self.use("sequential", upstream)
+        data, validators = uniprot_service._search(QUERY)
+        self.assertEqual(data["results"], [ENTRY])
+        self.assertEqual([name for name, _ in upstream.calls], ["search", "gene_fallback"])
+        self.assertGreaterEqual(upstream.calls[1][1], 0.15)
+
+    def test_hedge_starts_after_the_delay(self):
+        upstream = FakeUniProt(search_delay=0.3)
+        self.use("hedged", upstream, delay=0.05)
+        data, validators = uniprot_service._search(QUERY)
+        self.assertEqual(validators["strategy"], "gene_fallback")
+        (_, first), (name, hedged_at) = upstream.calls
+        self.assertEqual(name, "gene_fallback")
+        self.assertGreaterEqual(hedged_at - first, 0.05)
+        self.assertLess(hedged_at - first, 0.3)
+
+    def test_no_hedge_when_the_first_strategy_answers_in_time(self):
+        upstream = FakeUniProt(search_results=[ENTRY])
+        self.use("hedged", upstream, delay=0.5)
+        data, validators = uniprot_service._search(QUERY)
+        self.assertEqual(validators["strategy"], "search")
+        self.assertEqual(len(upstream.calls), 1)
+
+    def test_outage_stops_the_fallbacks(self):
+        for strategy in ("sequential", "hedged"):
+            with self.subTest(strategy=strategy):
+                upstream = FakeUniProt(error=requests.exceptions.ConnectionError("down"))
+                self.use(strategy, upstream, delay=0.5)
+                result = uniprot_service._search(QUERY)
+                self.assertIn("error", result)
+                self.assertEqual(len(upstream.calls), 1)
+
+    @unittest.skipIf(httpx is None, "the async path needs httpx")
+    def test_async_hedge_starts_after_the_delay(self):
+        upstream = FakeUniProt(search_delay=0.3)
+        self.use("hedged", upstream, delay=0.05)
+        data, validators = asyncio.run(uniprot_service._async_search(QUERY))
+        self.assertEqual(validators["strategy"], "gene_fallback")
+        self.assertGreaterEqual(upstream.calls[1][1] - upstream.calls[0][1], 0.05)
+
+    @unittest.skipIf(httpx is None, "the async path needs httpx")
+    def test_async_outage_stops_the_fallbacks(self):
+        upstream = FakeUniProt(error=httpx.ConnectError("down"))
+        self.use("hedged", upstream, delay=0.5)
+        result = asyncio.run(uniprot_service._async_search(QUERY))
+        self.assertIn("error", result)
+        self.assertEqual(len(upstream.calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,16 @@
+import sqlite3
+from contextlib import closing, contextmanager
+
+
+@contextmanager
+def connect(path, timeout=5):
+    """
+    Open a short-lived SQLite connection to path.
+
+    The transaction is committed (or rolled back on error) and the
+    connection closed on exit. A connection per call keeps callers safe to
+    share across threads and processes.
+    """
+    with closing(sqlite3.connect(path, timeout=timeout)) as conn:
+        with conn:
+            yield conn
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import threading
+from cachetools import LRUCache
+from werkzeug.http import parse_accept_header, parse_etags
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # Optional; without it responses are only gzip'd
+    brotli = None
+
+# HTTP validators, cache headers and compression for API responses, shared
+# by the Flask app (create_app) and the native routes in asgi.py. GET
+# responses get a strong ETag from a hash of their body and a 304 when the
+# client already has it; bodies over Config.HTTP_COMPRESS_MIN_BYTES are
+# sent gzip'd or brotli'd when the client accepts it, with a per-encoding
+# ETag so caches never confuse the variants.
+
+# Internal header routes set on degraded answers (an upstream failed but the
+# route still answered); cache_response reads and removes it
+DEGRADED_HEADER = "X-AminoVerse-Degraded"
+
+# Cache-Control per route; routes not listed get none
+CACHE_POLICIES = {
+    # AlphaFold models only change with a new database release
+    "/api/protein/<protein_name>/structure": Config.HTTP_CACHE_STRUCTURE_MAX_AGE,
+    "/api/protein/<protein_name>/structure.bin": Config.HTTP_CACHE_STRUCTURE_MAX_AGE,
+    "/api/protein/<protein_name>/structure.pdb": Config.HTTP_CACHE_STRUCTURE_MAX_AGE,
+    "/api/protein/<protein_name>": Config.HTTP_CACHE_PROTEIN_MAX_AGE,
+    "/api/protein/<protein_name>/drugs": Config.HTTP_CACHE_PROTEIN_MAX_AGE,
+    # Gemini output
+    "/api/protein/<protein_name>/analysis": Config.HTTP_CACHE_ANALYSIS_MAX_AGE,
+    "/api/protein/<protein_name>/full": Config.HTTP_CACHE_ANALYSIS_MAX_AGE,
+    "/api/suggest": Config.HTTP_CACHE_SUGGEST_MAX_AGE,
+    "/api/metrics": None
+}
+
+COMPRESSIBLE_TYPES = ("application/json", "chemical/x-pdb", "text/")
+
+# Compressed bodies by (ETag, encoding), so repeat downloads of a large
+# structure are compressed once
+_compressed = LRUCache(maxsize=Config.HTTP_COMPRESSED_CACHE_BYTES, getsizeof=len)
+_compressed_lock = threading.Lock()
+
+
+def is_degraded(data):
+    """Whether a response payload, or one of its per-source parts, reports an upstream error."""
+    if not isinstance(data, dict):
+        return False
+    parts = [data] + [value for value in data.values() if isinstance(value, dict)]
+    return any(part.get("error") or part.get("errors") for part in parts)
+
+
+def mark_degraded(response, data):
+    """Flag a Flask or Starlette response built from data as degraded if data is; returns the response."""
+    if is_degraded(data):
+        response.headers[DEGRADED_HEADER] = "1"
+    return response
+
+
+def cache_control(route, degraded=False):
+    """Cache-Control value for a successful response on route (Flask or Starlette syntax), or None."""
+    route = route.replace("{", "<").replace("}", ">")
+    if route not in CACHE_POLICIES:
+        return None
+    max_age = CACHE_POLICIES[route]
+    # Degraded responses must be revalidated
+    if not max_age or degraded:
+        return "no-cache"
+    return f"public, max-age={max_age}"
+
+
+def choose_encoding(accept_encoding, mimetype, size):
+    """Best content coding the client accepts for this body, or None to send it as-is."""
+    if size < Config.HTTP_COMPRESS_MIN_BYTES or not mimetype.startswith(COMPRESSIBLE_TYPES):
+        return None
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return parse_accept_header(accept_encoding).best_match(offered)
+
+
+def compress(body, encoding, etag=None):
+    """Encode body with "br" or "gzip"; results for an ETag are kept for the next request."""
+    key = (etag, encoding)
+    if etag is not None:
+        with _compressed_lock:
+            cached = _compressed.get(key)
+        if cached is not None:
+            return cached
+    if encoding == "br":
+        data = brotli.compress(body, quality=Config.HTTP_BROTLI_QUALITY)
+    else:
+        data = gzip.compress(body, compresslevel=Config.HTTP_GZIP_LEVEL, mtime=0)
+    if etag is not None and len(data) <= _compressed.maxsize:
+        with _compressed_lock:
+            _compressed[key] = data
+    return data
+
+
+def cache_response(method, route, status, body, mimetype, headers, if_none_match="", accept_encoding=""):
+    """
+    Apply ETag, Cache-Control and compression to a buffered response.
+
+    headers is the response's header mapping and is updated in place.
+    Returns (status, body): 304 with an empty body when the client's
+    If-None-Match matches, otherwise the original status with the body
+    compressed if an encoding was chosen.
+    """
+    degraded = DEGRADED_HEADER in headers
+    if degraded:
+        del headers[DEGRADED_HEADER]
+    if "Content-Encoding" in headers:
+        return status, body
+
+    encoding = choose_encoding(accept_encoding, mimetype or "", len(body))
+    if mimetype and mimetype.startswith(COMPRESSIBLE_TYPES) and len(body) >= Config.HTTP_COMPRESS_MIN_BYTES:
+        vary = headers.get("Vary")
+        if not vary:
+            headers["Vary"] = "Accept-Encoding"
+        elif "accept-encoding" not in vary.lower():
+            headers["Vary"] = f"{vary}, Accept-Encoding"
+
+    if method in ("GET", "HEAD") and status == 200:
+        if "Cache-Control" not in headers:
+            policy = cache_control(route, degraded)
+            if policy:
+                headers["Cache-Control"] = policy
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        tag = f"{etag}-{encoding}" if encoding else etag
+        headers["ETag"] = f'"{tag}"'
+        # If-None-Match uses the weak comparison
+        if parse_etags(if_none_match).contains_weak(tag):
+            return 304, b""
+        if encoding:
+            body = compress(body, encoding, etag)
+    elif encoding:
+        body = compress(body, encoding)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return status, body
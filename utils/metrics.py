@@ -0,0 +1,220 @@
+"""
+In-process metrics rendered in the Prometheus text format at /api/metrics.
+
+Each worker process keeps its own counters, so scrape every worker (or run
+a single one) when aggregating.
+"""
+import asyncio
+import bisect
+import functools
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count per label set."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label set, with their sum."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        # Index of the first bucket the value fits in; len(buckets) is +Inf
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, (None, 0.0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = sorted((key, list(counts), total) for key, (counts, total) in self._values.items())
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                samples.append((f"{self.name}_bucket", labels, cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, key), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, key), cumulative))
+        return samples
+
+
+class Gauge:
+    """A value read from a callback at scrape time, one sample per label set it returns."""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames, callback, type="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.type = type
+
+    def samples(self):
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(self.callback().items())]
+
+
+_metrics = []
+
+
+def register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def render():
+    """Render every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        try:
+            samples = metric.samples()
+        except Exception as e:
+            print(f"Error collecting metric {metric.name}: {e}")
+            continue
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, value in samples:
+            lines.append(f"{name}{labels} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+SERVICE_SECONDS = register(Histogram(
+    "aminoverse_service_call_seconds", "Time spent in service calls, cache hits included.", ["service"]))
+SERVICE_ERRORS = register(Counter(
+    "aminoverse_service_errors_total", "Service calls that raised or returned an error.", ["service"]))
+UPSTREAM_SECONDS = register(Histogram(
+    "aminoverse_upstream_request_seconds", "Latency of HTTP requests to upstream APIs, retries included.", ["upstream"]))
+UPSTREAM_REQUESTS = register(Counter(
+    "aminoverse_upstream_requests_total", "HTTP requests to upstream APIs by response status class.", ["upstream", "status"]))
+UPSTREAM_BYTES = register(Histogram(
+    "aminoverse_upstream_response_bytes", "Size of upstream response bodies.", ["upstream"], SIZE_BUCKETS))
+HTTP_SECONDS = register(Histogram(
+    "aminoverse_http_request_seconds", "Time to produce API responses (until the first byte for streams).", ["route", "method"]))
+HTTP_REQUESTS = register(Counter(
+    "aminoverse_http_requests_total", "API responses by route, method and status.", ["route", "method", "status"]))
+HTTP_BYTES = register(Histogram(
+    "aminoverse_http_response_bytes", "Size of non-streamed API response bodies.", ["route"], SIZE_BUCKETS))
+CACHE_REQUESTS = register(Counter(
+    "aminoverse_cache_requests_total", "Cache lookups by cache and result (hit or miss).", ["cache", "result"]))
+CACHE_REVALIDATIONS = register(Counter(
+    "aminoverse_cache_revalidations_total", "Background revalidations of stale entries by result (not_modified, changed or error).", ["cache", "result"]))
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_revalidation(cache, result):
+    CACHE_REVALIDATIONS.inc(cache=cache, result=result)
+
+
+def record_upstream(upstream, elapsed, status=None, size=None):
+    """Record one upstream HTTP request; status None means it failed without a response."""
+    UPSTREAM_SECONDS.observe(elapsed, upstream=upstream)
+    UPSTREAM_REQUESTS.inc(upstream=upstream, status=f"{status // 100}xx" if status else "error")
+    if size is not None:
+        UPSTREAM_BYTES.observe(size, upstream=upstream)
+
+
+def record_request(route, method, status, elapsed, size=None):
+    HTTP_SECONDS.observe(elapsed, route=route, method=method)
+    HTTP_REQUESTS.inc(route=route, method=method, status=status)
+    if size is not None:
+        HTTP_BYTES.observe(size, route=route)
+
+
+def is_error_result(result):
+    """Services signal failure by returning None or a dict with an "error" key."""
+    return result is None or (isinstance(result, dict) and bool(result.get("error")))
+
+
+def timed(service=None):
+    """Decorator recording the latency and errors of a service function (sync or async)."""
+    def decorator(fn):
+        name = service or fn.__name__
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                failed = True
+                try:
+                    result = await fn(*args, **kwargs)
+                    failed = is_error_result(result)
+                    return result
+                finally:
+                    SERVICE_SECONDS.observe(time.perf_counter() - started, service=name)
+                    if failed:
+                        SERVICE_ERRORS.inc(service=name)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = is_error_result(result)
+                return result
+            finally:
+                SERVICE_SECONDS.observe(time.perf_counter() - started, service=name)
+                if failed:
+                    SERVICE_ERRORS.inc(service=name)
+        return wrapper
+    return decorator
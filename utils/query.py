@@ -0,0 +1,9 @@
+def normalize_query(query):
+    """
+    Normalize a protein query (collapse whitespace, upper-case).
+
+    The one normalization behind resolver, search and drug cache keys,
+    single-flight keys, the protein index and the query log, so equivalent
+    spellings always share an entry.
+    """
+    return " ".join(str(query).split()).upper()
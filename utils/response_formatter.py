@@ -1,4 +1,6 @@
-def format_protein_response(protein_name, function_data=None, structure_data=None, drug_data=None, interaction_data=None):
+import json
+
+def format_protein_response(protein_name, function_data=None, structure_data=None, drug_data=None, interaction_data=None, analysis_data=None):
     """
     Format the combined protein data response
     """
@@ -26,4 +28,22 @@ def format_protein_response(protein_name, function_data=None, structure_data=Non
         interaction_error = interaction_data.get('error')
         response["interactions"] = interaction_data if not interaction_error else {"status": "error", "message": interaction_error}
     
-    return response
\ No newline at end of file
+    # Add AI analysis if available
+    if analysis_data:
+        analysis_error = analysis_data.get('error')
+        response["analysis"] = analysis_data if not analysis_error else {"status": "error", "message": analysis_error}
+    
+    return response
+
+def format_sse_event(data, event=None):
+    """
+    Format a Server-Sent Events message with a JSON payload
+    """
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+def format_ndjson_line(data):
+    """
+    Format one newline-delimited JSON record
+    """
+    return json.dumps(data) + "\n"